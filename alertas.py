@@ -0,0 +1,296 @@
+import argparse
+import importlib
+import os
+import smtplib
+import sqlite3
+import time
+from datetime import date
+from email.message import EmailMessage
+
+from banco import get_db_connection
+from compliance import atualizar_status_compliance
+from datas import de_dias, para_dias
+
+
+# --- ALERTAS DE VENCIMENTO (AGENDADOR + CAIXA DE SAÍDA) ---
+# Um processo separado da interface (python alertas.py --daemon) varre uma vez por dia os documentos
+# de compliance_status que entraram em algum horizonte de aviso (ex.: 30 e 7 dias antes e no dia do
+# vencimento) e grava um alerta por documento e horizonte em alertas_saida. A chave única da tabela
+# impede alertas repetidos: rodar de novo, reiniciar o processo ou ter o mesmo documento em duas
+# varreduras não gera mensagem duplicada. A varredura é um intervalo no índice de validade, a partir
+# do dia da última execução (alertas_execucoes), então o custo depende dos documentos que vencem nos
+# próximos dias, não do total de funcionários.
+#
+# A entrega é separada da geração: os alertas pendentes saem em lotes (um resumo por lote) pelo envio
+# configurado. Se o envio falhar, o lote continua pendente e é tentado de novo no próximo ciclo.
+
+# Dias de antecedência em que o aviso é gerado; o dia do vencimento (0) sempre entra
+HORIZONTES = sorted({0, *(int(dias) for dias in os.environ.get('PAINEL_ALERTA_HORIZONTES', '30,7').split(',') if dias.strip())})
+
+INTERVALO_SEGUNDOS = int(os.environ.get('PAINEL_ALERTA_INTERVALO', 3600))
+TAMANHO_LOTE = int(os.environ.get('PAINEL_ALERTA_LOTE', 200))
+MAX_TENTATIVAS = int(os.environ.get('PAINEL_ALERTA_TENTATIVAS', 5))
+
+DDL_ALERTAS = [
+    """
+    CREATE TABLE IF NOT EXISTS alertas_saida
+    (
+        id             INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        tipo_documento TEXT    NOT NULL,
+        documento      TEXT    NOT NULL,
+        validade       DATE    NOT NULL,
+        horizonte      INTEGER NOT NULL,
+        criado_em      DATE    NOT NULL,
+        enviado_em     TEXT,
+        tentativas     INTEGER NOT NULL DEFAULT 0,
+        erro           TEXT,
+        UNIQUE (funcionario_id, tipo_documento, documento, validade, horizonte),
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios (id) ON DELETE CASCADE
+    )
+    """,
+    # Só os pendentes ficam no índice: a fila de entrega não cresce com o histórico de enviados
+    "CREATE INDEX IF NOT EXISTS idx_alertas_pendentes ON alertas_saida (id) WHERE enviado_em IS NULL",
+    """
+    CREATE TABLE IF NOT EXISTS alertas_execucoes
+    (
+        id           INTEGER PRIMARY KEY AUTOINCREMENT,
+        dia          DATE    NOT NULL,
+        executado_em TEXT    NOT NULL,
+        gerados      INTEGER NOT NULL
+    )
+    """,
+    # A varredura diária é um intervalo de validade (o índice de compliance começa pelo tipo e situação)
+    "CREATE INDEX IF NOT EXISTS idx_compliance_validade ON compliance_status (validade)",
+]
+
+# Cada documento recebe o menor horizonte que já alcançou: quem entra na fila a 5 dias do vencimento
+# recebe só o aviso de 7 dias, não o de 30 também.
+SQL_GERAR_ALERTAS = """
+    INSERT OR IGNORE INTO alertas_saida (funcionario_id, tipo_documento, documento, validade, horizonte, criado_em)
+    WITH horizontes(dias) AS (VALUES {horizontes})
+    SELECT c.funcionario_id, c.tipo_documento, c.documento, c.validade,
+           (SELECT MIN(h.dias) FROM horizontes h WHERE h.dias >= c.validade - :hoje),
+           :hoje
+    FROM compliance_status c
+    WHERE c.validade BETWEEN :inicio AND :fim
+""".format(horizontes=", ".join(f"({dias})" for dias in HORIZONTES))
+
+SQL_ALERTAS_PENDENTES = """
+    SELECT a.id, a.tipo_documento, a.documento, a.validade, a.horizonte, f.nome, f.matricula, f.cargo
+    FROM alertas_saida a
+             JOIN funcionarios f ON f.id = a.funcionario_id
+    WHERE a.enviado_em IS NULL
+      AND a.tentativas < :max_tentativas
+    ORDER BY a.id
+    LIMIT :lote
+"""
+
+
+def criar_alertas(cursor):
+    """Cria a caixa de saída, o registro de execuções e o índice de validade (passo 3 de migracoes.py)."""
+    for ddl in DDL_ALERTAS:
+        cursor.execute(ddl)
+
+
+def gerar_alertas(conn=None, hoje=None):
+    """Grava na caixa de saída os alertas dos documentos que alcançaram um horizonte. Retorna quantos entraram.
+
+    Roda uma vez por dia: se já houve execução em `hoje`, não faz nada e retorna None. A varredura começa
+    no dia da última execução (os vencidos desde então recebem o aviso do dia 0) e vai até o maior
+    horizonte. Na primeira execução, documentos vencidos antes de hoje não geram aviso.
+    """
+    fechar = conn is None
+    conn = conn or get_db_connection()
+    hoje = para_dias(hoje or date.today())
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        ultimo = conn.execute("SELECT MAX(dia) FROM alertas_execucoes").fetchone()[0]
+        if ultimo is not None and ultimo >= hoje:
+            conn.rollback()
+            return None
+        inicio = hoje if ultimo is None else ultimo
+        gerados = conn.execute(SQL_GERAR_ALERTAS,
+                               {'hoje': hoje, 'inicio': inicio, 'fim': hoje + HORIZONTES[-1]}).rowcount
+        conn.execute("INSERT INTO alertas_execucoes (dia, executado_em, gerados) "
+                     "VALUES (?, datetime('now', 'localtime'), ?)", (hoje, gerados))
+        conn.commit()
+        return gerados
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if fechar:
+            conn.close()
+
+
+# --- ENVIO ---
+# Cada envio recebe um lote de alertas (dicionários com nome, matricula, cargo, documento, validade,
+# horizonte, ...) e levanta uma exceção se não conseguir entregar. Para outro canal (Teams, WhatsApp,
+# fila), basta uma classe com `enviar(alertas)` registrada em ENVIOS ou indicada como 'modulo:Classe'.
+
+def descrever_alerta(alerta):
+    dias = (alerta['validade'] - date.today()).days
+    prazo = f"venceu em {alerta['validade']:%d/%m/%Y}" if dias < 0 else (
+        "vence hoje" if dias == 0 else f"vence em {alerta['validade']:%d/%m/%Y} ({dias} dias)")
+    return f"{alerta['nome']} (Mat: {alerta['matricula']}, {alerta['cargo'] or 'sem cargo'}): {alerta['documento']} {prazo}"
+
+
+def montar_mensagem(alertas):
+    """Retorna (assunto, corpo) do resumo de um lote de alertas."""
+    assunto = f"[Painel SST] {len(alertas)} documento(s) vencendo ou vencido(s)"
+    linhas = [f"- {descrever_alerta(alerta)}" for alerta in alertas]
+    return assunto, "Documentos que precisam de renovação:\n\n" + "\n".join(linhas) + "\n"
+
+
+class EnvioConsole:
+    """Imprime cada lote no terminal (padrão; útil para conferir o agendador sem servidor de e-mail)."""
+
+    nome = 'console'
+
+    def enviar(self, alertas):
+        assunto, corpo = montar_mensagem(alertas)
+        print(f"{assunto}\n{corpo}", flush=True)
+
+
+class EnvioSMTP:
+    """Um e-mail por lote para os destinatários configurados.
+
+    Para testar sem servidor de e-mail, rode um SMTP local que só imprime as mensagens, por exemplo
+    `python -m aiosmtpd -n -l localhost:1025` (pip install aiosmtpd).
+    """
+
+    nome = 'smtp'
+    host = os.environ.get('PAINEL_SMTP_HOST', 'localhost')
+    porta = int(os.environ.get('PAINEL_SMTP_PORTA', 1025))
+    remetente = os.environ.get('PAINEL_SMTP_REMETENTE', 'painel-sst@localhost')
+    destinatarios = [email.strip() for email in os.environ.get('PAINEL_ALERTA_DESTINATARIOS', '').split(',')
+                     if email.strip()]
+
+    def __init__(self):
+        if not self.destinatarios:
+            raise RuntimeError("Defina PAINEL_ALERTA_DESTINATARIOS (e-mails separados por vírgula) para usar o envio SMTP.")
+
+    def enviar(self, alertas):
+        assunto, corpo = montar_mensagem(alertas)
+        mensagem = EmailMessage()
+        mensagem['Subject'] = assunto
+        mensagem['From'] = self.remetente
+        mensagem['To'] = ", ".join(self.destinatarios)
+        mensagem.set_content(corpo)
+        with smtplib.SMTP(self.host, self.porta, timeout=30) as smtp:
+            smtp.send_message(mensagem)
+
+
+ENVIOS = {'console': EnvioConsole, 'smtp': EnvioSMTP}
+
+
+def carregar_envio(nome):
+    """Instancia o envio `nome`: um dos ENVIOS ou uma classe externa no formato 'modulo:Classe'."""
+    if nome in ENVIOS:
+        return ENVIOS[nome]()
+    modulo, _, classe = nome.partition(':')
+    if not classe:
+        raise ValueError(f"Envio desconhecido: {nome}. Use um de {sorted(ENVIOS)} ou 'modulo:Classe'.")
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+def entregar_alertas(envio, conn=None, lote=TAMANHO_LOTE):
+    """Entrega os alertas pendentes em lotes pelo `envio`. Retorna quantos foram entregues.
+
+    Um lote que falha fica pendente (com a tentativa e o erro registrados) e a entrega para até o
+    próximo ciclo; depois de MAX_TENTATIVAS falhas o alerta deixa de ser tentado.
+    """
+    fechar = conn is None
+    conn = conn or get_db_connection()
+    entregues = 0
+    try:
+        while True:
+            alertas = [dict(linha) for linha in conn.execute(
+                SQL_ALERTAS_PENDENTES, {'max_tentativas': MAX_TENTATIVAS, 'lote': lote})]
+            if not alertas:
+                break
+            ids = [(alerta['id'],) for alerta in alertas]
+            try:
+                envio.enviar(alertas)
+            except Exception as e:
+                conn.executemany("UPDATE alertas_saida SET tentativas = tentativas + 1, erro = ? WHERE id = ?",
+                                 [(str(e), id_alerta) for (id_alerta,) in ids])
+                conn.commit()
+                print(f"Falha no envio de {len(alertas)} alerta(s): {e}", flush=True)
+                break
+            conn.executemany("UPDATE alertas_saida SET enviado_em = datetime('now', 'localtime'), erro = NULL "
+                             "WHERE id = ?", ids)
+            conn.commit()
+            entregues += len(alertas)
+    finally:
+        if fechar:
+            conn.close()
+    return entregues
+
+
+# --- AGENDADOR ---
+
+def executar_ciclo(envio=None):
+    """Reclassifica compliance_status, gera os alertas do dia (se ainda não gerados) e entrega os pendentes.
+
+    Retorna (gerados, entregues).
+    """
+    atualizar_status_compliance()
+    gerados = gerar_alertas()
+    entregues = entregar_alertas(envio) if envio is not None else 0
+    return gerados, entregues
+
+
+def agendar(envio, intervalo=INTERVALO_SEGUNDOS):
+    """Executa um ciclo a cada `intervalo` segundos até ser interrompido (Ctrl+C)."""
+    while True:
+        try:
+            gerados, entregues = executar_ciclo(envio)
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} alertas gerados: "
+                  f"{'já gerados hoje' if gerados is None else gerados}, entregues: {entregues}", flush=True)
+        except sqlite3.OperationalError as e:
+            # Banco ocupado por uma carga longa: o próximo ciclo tenta de novo
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} ciclo adiado: {e}", flush=True)
+        time.sleep(intervalo)
+
+
+def resumo_caixa_saida():
+    conn = get_db_connection()
+    pendentes, com_falha = conn.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM(tentativas >= {MAX_TENTATIVAS}), 0)
+        FROM alertas_saida WHERE enviado_em IS NULL
+    """).fetchone()
+    ultimo = conn.execute("SELECT MAX(dia) FROM alertas_execucoes").fetchone()[0]
+    conn.close()
+    return pendentes, com_falha, de_dias(ultimo) if ultimo is not None else None
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Gera e entrega os alertas de vencimento de treinamentos, ASOs e CNHs.")
+    parser.add_argument('--daemon', action='store_true',
+                        help=f"repete o ciclo a cada --intervalo segundos (padrão: {INTERVALO_SEGUNDOS})")
+    parser.add_argument('--intervalo', type=int, default=INTERVALO_SEGUNDOS)
+    parser.add_argument('--envio', default=os.environ.get('PAINEL_ALERTA_ENVIO', 'console'),
+                        help=f"{' ou '.join(sorted(ENVIOS))} ou 'modulo:Classe' (padrão: console)")
+    parser.add_argument('--sem-envio', action='store_true', help="só grava os alertas na caixa de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python alertas.py [--daemon] [--envio smtp] [--sem-envio]
+    from migracoes import garantir_schema
+
+    args = ler_argumentos()
+    garantir_schema()
+    envio = None if args.sem_envio else carregar_envio(args.envio)
+    if args.daemon:
+        try:
+            agendar(envio, args.intervalo)
+        except KeyboardInterrupt:
+            pass
+    else:
+        gerados, entregues = executar_ciclo(envio)
+        pendentes, com_falha, ultimo = resumo_caixa_saida()
+        print(f"Alertas gerados: {'já gerados hoje' if gerados is None else gerados}. Entregues: {entregues}. "
+              f"Pendentes: {pendentes} ({com_falha} sem novas tentativas). Última varredura: {ultimo:%d/%m/%Y}.")
@@ -1,8 +1,21 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
-from datetime import date, timedelta
+from datetime import date
 from incidentes import show_incidentes_page
+from dados_cadastro import (SQL_LISTA_FUNCIONARIOS, SQL_LISTA_TREINAMENTOS, SQL_LISTA_ASOS, adicionar_funcionario,
+                            atualizar_funcionario, deletar_funcionario, buscar_funcionario, buscar_cargos,
+                            adicionar_treinamento, buscar_treinamentos_por_funcionario, deletar_treinamento,
+                            adicionar_aso, buscar_asos_por_funcionario, deletar_aso, existem_funcionarios)
+from dados_dashboard import buscar_dados_dashboard, buscar_detalhes_pendencias
+from ingestao import ler_previa_planilha, COLUNAS_OBRIGATORIAS
+from importacao import LAYOUTS, ler_arquivo, sugerir_mapeamento
+from tabela_paginada import mostrar_tabela_paginada
+from busca_funcionarios import seletor_funcionario
+from indicadores import buscar_taxas
+from migracoes import garantir_schema
+from tarefas import enfileirar, iniciar_workers
+from painel_tarefas import mostrar_tarefas
+import instrumentacao
 import base64 # <-- 1. Importação necessária
 
 # --- FUNÇÃO AUXILIAR PARA PROCESSAR A IMAGEM ---
@@ -17,361 +30,10 @@ def get_image_as_base64(file):
 
 
 # --- CONFIGURAÇÃO DO BANCO DE DADOS (BACK-END) ---
-
-def get_db_connection():
-    """Cria e retorna uma conexão com o banco de dados SQLite."""
-    conn = sqlite3.connect('controle_empresa.db', check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
-
-
-def init_db():
-    """Inicializa o banco de dados e cria as tabelas se não existirem."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS funcionarios
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       nome
-                       TEXT
-                       NOT
-                       NULL,
-                       matricula
-                       TEXT
-                       UNIQUE,
-                       cargo
-                       TEXT,
-                       cnh_tipo
-                       TEXT,
-                       cnh_validade
-                       DATE
-                   )
-                   ''')
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS treinamentos
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       funcionario_id
-                       INTEGER
-                       NOT
-                       NULL,
-                       nome_treinamento
-                       TEXT
-                       NOT
-                       NULL,
-                       data_realizacao
-                       DATE,
-                       validade
-                       DATE,
-                       FOREIGN
-                       KEY
-                   (
-                       funcionario_id
-                   ) REFERENCES funcionarios
-                   (
-                       id
-                   ) ON DELETE CASCADE
-                       )
-                   ''')
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS asos
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       funcionario_id
-                       INTEGER
-                       NOT
-                       NULL,
-                       tipo_exame
-                       TEXT
-                       NOT
-                       NULL,
-                       data_exame
-                       DATE,
-                       resultado
-                       TEXT,
-                       validade_aso
-                       DATE,
-                       FOREIGN
-                       KEY
-                   (
-                       funcionario_id
-                   ) REFERENCES funcionarios
-                   (
-                       id
-                   ) ON DELETE CASCADE
-                       )
-                   ''')
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS incidentes
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       funcionario_id
-                       INTEGER,
-                       data_ocorrencia
-                       DATE
-                       NOT
-                       NULL,
-                       gravidade
-                       TEXT
-                       NOT
-                       NULL,
-                       tipo_incidente
-                       TEXT
-                       NOT
-                       NULL,
-                       local_ocorrencia
-                       TEXT,
-                       causa_raiz
-                       TEXT,
-                       partes_corpo_atingidas
-                       TEXT,
-                       dias_perdidos
-                       INTEGER
-                       DEFAULT
-                       0,
-                       FOREIGN
-                       KEY
-                   (
-                       funcionario_id
-                   ) REFERENCES funcionarios
-                   (
-                       id
-                   ) ON DELETE SET NULL
-                       )
-                   ''')
-    conn.commit()
-    conn.close()
-
-
-# --- FUNÇÕES CRUD (Create, Read, Update, Delete) ---
-
-# --- Funcionários ---
-def adicionar_funcionario(nome, matricula, cargo, cnh_tipo, cnh_validade):
-    conn = get_db_connection()
-    try:
-        conn.execute("INSERT INTO funcionarios (nome, matricula, cargo, cnh_tipo, cnh_validade) VALUES (?, ?, ?, ?, ?)",
-                     (nome, matricula, cargo, cnh_tipo, cnh_validade))
-        conn.commit()
-        st.success("✅ Funcionário adicionado com sucesso!")
-    except sqlite3.IntegrityError:
-        st.error("⚠️ Erro: A matrícula fornecida já existe.")
-    finally:
-        conn.close()
-
-
-def buscar_funcionarios():
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM funcionarios", conn)
-    conn.close()
-    return df
-
-
-def atualizar_funcionario(id, nome, matricula, cargo, cnh_tipo, cnh_validade):
-    conn = get_db_connection()
-    try:
-        conn.execute(
-            "UPDATE funcionarios SET nome = ?, matricula = ?, cargo = ?, cnh_tipo = ?, cnh_validade = ? WHERE id = ?",
-            (nome, matricula, cargo, cnh_tipo, cnh_validade, id))
-        conn.commit()
-        st.success("✅ Dados do funcionário atualizados com sucesso!")
-    except sqlite3.IntegrityError:
-        st.error("⚠️ Erro: A matrícula informada já pertence a outro funcionário.")
-    finally:
-        conn.close()
-
-
-def deletar_funcionario(id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM funcionarios WHERE id = ?", (id,))
-    conn.commit()
-    conn.close()
-    st.success("🗑️ Funcionário deletado com sucesso.")
-
-
-# --- Treinamentos ---
-def adicionar_treinamento(funcionario_id, nome_treinamento, data_realizacao, validade):
-    conn = get_db_connection()
-    conn.execute(
-        "INSERT INTO treinamentos (funcionario_id, nome_treinamento, data_realizacao, validade) VALUES (?, ?, ?, ?)",
-        (funcionario_id, nome_treinamento, data_realizacao, validade))
-    conn.commit()
-    conn.close()
-    st.success("✅ Treinamento registrado com sucesso!")
-
-
-def buscar_treinamentos():
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        "SELECT t.id, f.nome as nome_funcionario, t.nome_treinamento, t.data_realizacao, t.validade FROM treinamentos t JOIN funcionarios f ON t.funcionario_id = f.id",
-        conn)
-    conn.close()
-    return df
-
-
-def buscar_treinamentos_por_funcionario(funcionario_id):
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        "SELECT id, nome_treinamento, data_realizacao, validade FROM treinamentos WHERE funcionario_id = ?", conn,
-        params=(funcionario_id,))
-    conn.close()
-    return df
-
-
-def deletar_treinamento(id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM treinamentos WHERE id = ?", (id,))
-    conn.commit()
-    conn.close()
-    st.success("🗑️ Treinamento deletado com sucesso.")
-
-
-# --- ASOs ---
-def adicionar_aso(funcionario_id, tipo_exame, data_exame, resultado, validade_aso):
-    conn = get_db_connection()
-    conn.execute(
-        "INSERT INTO asos (funcionario_id, tipo_exame, data_exame, resultado, validade_aso) VALUES (?, ?, ?, ?, ?)",
-        (funcionario_id, tipo_exame, data_exame, resultado, validade_aso))
-    conn.commit()
-    conn.close()
-    st.success("✅ ASO registrado com sucesso!")
-
-
-def buscar_asos():
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        "SELECT a.id, f.nome as nome_funcionario, a.tipo_exame, a.data_exame, a.resultado, a.validade_aso FROM asos a JOIN funcionarios f ON a.funcionario_id = f.id",
-        conn)
-    conn.close()
-    return df
-
-
-def buscar_asos_por_funcionario(funcionario_id):
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        "SELECT id, tipo_exame, data_exame, resultado, validade_aso FROM asos WHERE funcionario_id = ?", conn,
-        params=(funcionario_id,))
-    conn.close()
-    return df
-
-
-def deletar_aso(id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM asos WHERE id = ?", (id,))
-    conn.commit()
-    conn.close()
-    st.success("🗑️ ASO deletado com sucesso.")
-
-
-# --- FUNÇÃO DE DASHBOARD UNIFICADA ---
-def buscar_dados_dashboard(cargo=None):
-    """Busca todos os dados para o dashboard, com filtro opcional por cargo."""
-    conn = get_db_connection()
-    hoje = date.today()
-    data_limite = hoje + timedelta(days=30)
-
-    # Cláusula WHERE para o filtro de cargo
-    where_clause = ""
-    params = {}
-    if cargo:
-        where_clause = "WHERE f.cargo = :cargo"
-        params['cargo'] = cargo
-
-    # Consultas
-    query_trein_venc = f"SELECT f.nome as nome_funcionario, t.nome_treinamento, t.validade FROM treinamentos t JOIN funcionarios f ON t.funcionario_id = f.id WHERE t.validade < :hoje {'AND f.cargo = :cargo' if cargo else ''}"
-    query_asos_venc = f"SELECT f.nome as nome_funcionario, a.tipo_exame, a.validade_aso FROM asos a JOIN funcionarios f ON a.funcionario_id = f.id WHERE a.validade_aso < :hoje {'AND f.cargo = :cargo' if cargo else ''}"
-    query_cnh_venc = f"SELECT nome, matricula, cnh_tipo, cnh_validade FROM funcionarios f WHERE cnh_validade < :hoje {'AND f.cargo = :cargo' if cargo else ''}"
-
-    query_trein_prox = f"SELECT f.nome as nome_funcionario, t.nome_treinamento, t.validade FROM treinamentos t JOIN funcionarios f ON t.funcionario_id = f.id WHERE t.validade BETWEEN :hoje AND :data_limite {'AND f.cargo = :cargo' if cargo else ''}"
-    query_asos_prox = f"SELECT f.nome as nome_funcionario, a.tipo_exame, a.validade_aso FROM asos a JOIN funcionarios f ON a.funcionario_id = f.id WHERE a.validade_aso BETWEEN :hoje AND :data_limite {'AND f.cargo = :cargo' if cargo else ''}"
-    query_cnh_prox = f"SELECT nome, matricula, cnh_tipo, cnh_validade FROM funcionarios f WHERE cnh_validade BETWEEN :hoje AND :data_limite {'AND f.cargo = :cargo' if cargo else ''}"
-
-    query_incidentes = f"SELECT i.gravidade, i.tipo_incidente FROM incidentes i LEFT JOIN funcionarios f ON i.funcionario_id = f.id {where_clause}"
-
-    # Parâmetros para as consultas
-    base_params = {'hoje': hoje, 'data_limite': data_limite}
-    if cargo:
-        base_params['cargo'] = cargo
-
-    # Execução das consultas
-    df_treinamentos_vencidos = pd.read_sql_query(query_trein_venc, conn, params=base_params)
-    df_asos_vencidos = pd.read_sql_query(query_asos_venc, conn, params=base_params)
-    df_cnh_vencidas = pd.read_sql_query(query_cnh_venc, conn, params=base_params)
-
-    df_treinamentos_prox = pd.read_sql_query(query_trein_prox, conn, params=base_params)
-    df_asos_prox = pd.read_sql_query(query_asos_prox, conn, params=base_params)
-    df_cnh_prox = pd.read_sql_query(query_cnh_prox, conn, params=base_params)
-
-    df_incidentes = pd.read_sql_query(query_incidentes, conn, params={'cargo': cargo} if cargo else {})
-
-    conn.close()
-
-    return {
-        "trein_venc": df_treinamentos_vencidos, "asos_venc": df_asos_vencidos, "cnh_venc": df_cnh_vencidas,
-        "trein_prox": df_treinamentos_prox, "asos_prox": df_asos_prox, "cnh_prox": df_cnh_prox,
-        "incidentes": df_incidentes
-    }
-
-
-# --- FUNÇÃO PARA UPLOAD DE ARQUIVO ---
-def processar_upload_excel(df):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    registros_adicionados = 0
-    registros_erros = 0
-    with st.spinner("Processando arquivo... Isso pode levar alguns instantes."):
-        for index, row in df.iterrows():
-            try:
-                matricula = str(row['MATRICULA'])
-                cursor.execute("SELECT id FROM funcionarios WHERE matricula = ?", (matricula,))
-                funcionario_existente = cursor.fetchone()
-                if not funcionario_existente:
-                    nome = row['NOME']
-                    cargo = row['FUNÇÃO']
-                    cnh_validade_raw = row.get('CNH')
-                    cnh_validade = pd.to_datetime(cnh_validade_raw).date() if pd.notna(cnh_validade_raw) else None
-                    cnh_tipo = 'N/A'
-                    cursor.execute(
-                        "INSERT INTO funcionarios (nome, matricula, cargo, cnh_tipo, cnh_validade) VALUES (?, ?, ?, ?, ?)",
-                        (nome, matricula, cargo, cnh_tipo, cnh_validade))
-                    funcionario_id = cursor.lastrowid
-                else:
-                    funcionario_id = funcionario_existente['id']
-                if 'ASO' in df.columns and 'VALIDADE DO ASO' in df.columns and pd.notna(row['ASO']):
-                    data_exame = pd.to_datetime(row['ASO']).date()
-                    cursor.execute("SELECT id FROM asos WHERE funcionario_id = ? AND data_exame = ?",
-                                   (funcionario_id, data_exame))
-                    if not cursor.fetchone():
-                        validade_aso = pd.to_datetime(row['VALIDADE DO ASO']).date()
-                        cursor.execute(
-                            "INSERT INTO asos (funcionario_id, tipo_exame, data_exame, resultado, validade_aso) VALUES (?, ?, ?, ?, ?)",
-                            (funcionario_id, 'Periódico', 'Apto', data_exame, validade_aso))
-                registros_adicionados += 1
-            except Exception as e:
-                st.warning(f"Erro ao processar a linha {index + 2} (Matrícula: {row.get('MATRICULA', 'N/A')}): {e}")
-                registros_erros += 1
-        conn.commit()
-        conn.close()
-    st.success(f"Processamento concluído! {registros_adicionados} linhas da planilha processadas.")
-    if registros_erros > 0:
-        st.error(f"{registros_erros} linhas não puderam ser processadas.")
+# A conexão (pool, WAL e PRAGMAs) fica em banco.py, compartilhada por todos os módulos, e o schema
+# (tabelas, índices, busca e resumos) em migracoes.py, aplicado uma vez por processo. As consultas e o
+# CRUD ficam em dados_cadastro.py e dados_dashboard.py, sem dependência do Streamlit; este arquivo só
+# monta as telas e mostra as mensagens.
 
 
 # --- PÁGINAS DA APLICAÇÃO ---
@@ -381,7 +43,7 @@ def show_dashboard():
     st.write("Visão geral das pendências e incidentes, com filtro por função.")
 
     # Filtro por Função
-    lista_cargos = ["Todos os Cargos"] + buscar_funcionarios()['cargo'].unique().tolist()
+    lista_cargos = ["Todos os Cargos"] + buscar_cargos()
     cargo_selecionado = st.selectbox("Filtrar por Função (Cargo):", options=lista_cargos)
 
     # Lógica de filtro
@@ -393,15 +55,15 @@ def show_dashboard():
     # KPIs
     st.subheader("Resumo de Pendências")
     col1, col2, col3 = st.columns(3)
-    col1.metric(label="Treinamentos Vencidos", value=len(dados["trein_venc"]), delta_color="inverse")
-    col2.metric(label="ASOs Vencidos", value=len(dados["asos_venc"]), delta_color="inverse")
-    col3.metric(label="CNHs Vencidas", value=len(dados["cnh_venc"]), delta_color="inverse")
+    col1.metric(label="Treinamentos Vencidos", value=dados["trein_venc"], delta_color="inverse")
+    col2.metric(label="ASOs Vencidos", value=dados["asos_venc"], delta_color="inverse")
+    col3.metric(label="CNHs Vencidas", value=dados["cnh_venc"], delta_color="inverse")
 
     st.subheader("Alertas de Vencimento (Próximos 30 dias)")
     col1_prox, col2_prox, col3_prox = st.columns(3)
-    col1_prox.metric(label="Treinamentos a Vencer", value=len(dados["trein_prox"]))
-    col2_prox.metric(label="ASOs a Vencer", value=len(dados["asos_prox"]))
-    col3_prox.metric(label="CNHs a Vencer", value=len(dados["cnh_prox"]))
+    col1_prox.metric(label="Treinamentos a Vencer", value=dados["trein_prox"])
+    col2_prox.metric(label="ASOs a Vencer", value=dados["asos_prox"])
+    col3_prox.metric(label="CNHs a Vencer", value=dados["cnh_prox"])
 
     st.divider()
 
@@ -411,39 +73,77 @@ def show_dashboard():
 
     with col_graf1:
         st.write("**Incidentes por Gravidade**")
-        if not dados["incidentes"].empty:
-            chart_data = dados["incidentes"]['gravidade'].value_counts()
-            st.bar_chart(chart_data)
+        if not dados["incidentes_gravidade"].empty:
+            st.bar_chart(dados["incidentes_gravidade"])
         else:
             st.info("Nenhum incidente registrado para a seleção atual.")
 
     with col_graf2:
         st.write("**Incidentes por Tipo**")
-        if not dados["incidentes"].empty:
-            chart_data = dados["incidentes"]['tipo_incidente'].value_counts()
-            st.bar_chart(chart_data)
+        if not dados["incidentes_tipo"].empty:
+            st.bar_chart(dados["incidentes_tipo"])
         else:
             st.info("Nenhum incidente registrado para a seleção atual.")
 
+    if st.toggle("Ver Taxas de Frequência e Gravidade", key="dashboard_ver_taxas"):
+        show_taxas_incidentes(filtro_cargo)
+
     st.divider()
 
-    # Tabelas de Detalhes
-    with st.expander("Ver Detalhes das Pendências"):
+    # Tabelas de Detalhes (carregadas sob demanda: o conteúdo de um st.expander é executado mesmo fechado)
+    if st.toggle("Ver Detalhes das Pendências", key="dashboard_ver_detalhes"):
+        detalhes = buscar_detalhes_pendencias(cargo=filtro_cargo)
         st.error("Lista de Itens Vencidos")
         st.write("**Treinamentos Vencidos**")
-        st.dataframe(dados["trein_venc"], use_container_width=True)
+        st.dataframe(detalhes["trein_venc"], use_container_width=True)
         st.write("**ASOs Vencidos**")
-        st.dataframe(dados["asos_venc"], use_container_width=True)
+        st.dataframe(detalhes["asos_venc"], use_container_width=True)
         st.write("**CNHs Vencidas**")
-        st.dataframe(dados["cnh_venc"], use_container_width=True)
+        st.dataframe(detalhes["cnh_venc"], use_container_width=True)
 
         st.warning("Lista de Itens Próximos do Vencimento")
         st.write("**Treinamentos a Vencer**")
-        st.dataframe(dados["trein_prox"], use_container_width=True)
+        st.dataframe(detalhes["trein_prox"], use_container_width=True)
         st.write("**ASOs a Vencer**")
-        st.dataframe(dados["asos_prox"], use_container_width=True)
+        st.dataframe(detalhes["asos_prox"], use_container_width=True)
         st.write("**CNHs a Vencer**")
-        st.dataframe(dados["cnh_prox"], use_container_width=True)
+        st.dataframe(detalhes["cnh_prox"], use_container_width=True)
+
+
+PERIODOS_TAXAS = {"Últimos 12 meses": 12, "Últimos 24 meses": 24, "Últimos 5 anos": 60, "Últimos 10 anos": 120}
+
+
+def show_taxas_incidentes(cargo=None, maximo_grupos=8):
+    """Taxas de frequência (TF) e gravidade (TG) por cargo ou local, mensais e acumuladas em 12 meses."""
+    col_dimensao, col_periodo = st.columns(2)
+    dimensao = col_dimensao.radio("Agrupar por", ["cargo", "local_ocorrencia"], horizontal=True,
+                                  format_func=lambda d: "Cargo" if d == "cargo" else "Local da ocorrência",
+                                  key="taxas_dimensao")
+    periodo = col_periodo.selectbox("Período", list(PERIODOS_TAXAS), key="taxas_periodo")
+
+    fim = date.today()
+    inicio = (pd.Timestamp(fim) - pd.DateOffset(months=PERIODOS_TAXAS[periodo] - 1)).date()
+    taxas = buscar_taxas(dimensao, inicio, fim)
+    if cargo and dimensao == "cargo":
+        taxas = taxas[taxas['grupo'] == cargo]
+    if taxas.empty:
+        st.info("Sem dados para calcular as taxas no período.")
+        return
+
+    # Os gráficos mostram os grupos com mais incidentes nos últimos 12 meses
+    ultimo_mes = taxas[taxas['mes'] == taxas['mes'].max()].sort_values('incidentes_12m', ascending=False)
+    principais = ultimo_mes['grupo'].head(maximo_grupos)
+    serie = taxas[taxas['grupo'].isin(principais)]
+    st.caption("Por milhão de horas-homem trabalhadas (estimadas pelo efetivo atual); acumulado dos últimos 12 meses.")
+    col_tf, col_tg = st.columns(2)
+    col_tf.write("**Taxa de Frequência (12 meses)**")
+    col_tf.line_chart(serie.pivot(index='mes', columns='grupo', values='tf_12m'))
+    col_tg.write("**Taxa de Gravidade (12 meses)**")
+    col_tg.line_chart(serie.pivot(index='mes', columns='grupo', values='tg_12m'))
+
+    st.write(f"**Taxas de {ultimo_mes['mes'].iloc[0]}**")
+    st.dataframe(ultimo_mes[['grupo', 'incidentes', 'dias_perdidos', 'tf', 'tg', 'incidentes_12m', 'tf_12m', 'tg_12m']]
+                 .round(2), use_container_width=True, hide_index=True)
 
 
 def show_funcionarios():
@@ -461,26 +161,29 @@ def show_funcionarios():
                 if not nome or not matricula or not cargo:
                     st.warning("Nome, Matrícula e Cargo são obrigatórios.")
                 else:
-                    adicionar_funcionario(nome, matricula, cargo, cnh_tipo, cnh_validade)
+                    try:
+                        adicionar_funcionario(nome, matricula, cargo, cnh_tipo, cnh_validade)
+                        st.success("✅ Funcionário adicionado com sucesso!")
+                    except ValueError as e:
+                        st.error(f"⚠️ Erro: {e}")
 
     st.divider()
     st.subheader("Lista de Funcionários Cadastrados")
-    st.dataframe(buscar_funcionarios(), use_container_width=True)
+    mostrar_tabela_paginada("lista_funcionarios", SQL_LISTA_FUNCIONARIOS,
+                            ['id', 'nome', 'matricula', 'cargo', 'cnh_tipo', 'cnh_validade'], ordenar_por='nome')
 
 
 def show_treinamentos():
     st.title("🎓 Gestão de Treinamentos")
 
-    funcionarios_df = buscar_funcionarios()
-    map_nome_id = {f"{row['nome']} (Mat: {row['matricula']})": row['id'] for index, row in funcionarios_df.iterrows()}
-
-    if not map_nome_id:
+    id_selecionado = None
+    if not existem_funcionarios():
         st.warning("Cadastre um funcionário primeiro para poder registrar um treinamento.")
     else:
         st.subheader("Registrar Novo Treinamento")
-        nome_selecionado = st.selectbox("Selecione o Funcionário", options=map_nome_id.keys(), key="trein_func_select")
-        id_selecionado = map_nome_id[nome_selecionado]
+        id_selecionado = seletor_funcionario("Selecione o Funcionário", "trein_func")
 
+    if id_selecionado is not None:
         with st.expander("Ver Histórico de Treinamentos deste Funcionário"):
             st.dataframe(buscar_treinamentos_por_funcionario(id_selecionado), use_container_width=True)
 
@@ -494,25 +197,26 @@ def show_treinamentos():
                     st.warning("O nome do treinamento é obrigatório.")
                 else:
                     adicionar_treinamento(id_selecionado, nome_treinamento, data_realizacao, validade)
+                    st.success("✅ Treinamento registrado com sucesso!")
 
     st.divider()
     st.subheader("Todos os Treinamentos Registrados")
-    st.dataframe(buscar_treinamentos(), use_container_width=True)
+    mostrar_tabela_paginada("lista_treinamentos", SQL_LISTA_TREINAMENTOS,
+                            ['id', 'nome_funcionario', 'nome_treinamento', 'data_realizacao', 'validade'],
+                            ordenar_por='validade')
 
 
 def show_asos():
     st.title("⚕️ Gestão de ASOs")
 
-    funcionarios_df = buscar_funcionarios()
-    map_nome_id = {f"{row['nome']} (Mat: {row['matricula']})": row['id'] for index, row in funcionarios_df.iterrows()}
-
-    if not map_nome_id:
+    id_selecionado_aso = None
+    if not existem_funcionarios():
         st.warning("Cadastre um funcionário primeiro.")
     else:
         st.subheader("Registrar Novo ASO")
-        nome_selecionado_aso = st.selectbox("Selecione o Funcionário", options=map_nome_id.keys(),
-                                            key="aso_func_select")
-        id_selecionado_aso = map_nome_id[nome_selecionado_aso]
+        id_selecionado_aso = seletor_funcionario("Selecione o Funcionário", "aso_func")
+
+    if id_selecionado_aso is not None:
         with st.form("form_asos", clear_on_submit=True):
             tipo_exame = st.selectbox("Tipo de Exame", ["Admissional", "Periódico", "Demissional", "Mudança de Risco",
                                                         "Retorno ao Trabalho"])
@@ -521,28 +225,29 @@ def show_asos():
             data_exame = col1.date_input("Data do Exame", value=date.today())
             validade_aso = col2.date_input("Validade do ASO", min_value=date.today())
             if st.form_submit_button("Registrar ASO", use_container_width=True):
-                adicionar_aso(id_selecionado_aso, tipo_exame, data_exame, resultado, validade_aso)
+                try:
+                    adicionar_aso(id_selecionado_aso, tipo_exame, data_exame, resultado, validade_aso)
+                    st.success("✅ ASO registrado com sucesso!")
+                except ValueError as e:
+                    st.error(f"⚠️ Erro: {e}")
 
     st.divider()
     st.subheader("Todos os ASOs Registrados")
-    st.dataframe(buscar_asos(), use_container_width=True)
+    mostrar_tabela_paginada("lista_asos", SQL_LISTA_ASOS,
+                            ['id', 'nome_funcionario', 'tipo_exame', 'data_exame', 'resultado', 'validade_aso'],
+                            ordenar_por='validade_aso')
 
 
 def show_editar_deletar():
     st.title("✏️ Editar ou Deletar Registros")
 
-    funcionarios_para_editar_df = buscar_funcionarios()
-    map_nome_id_edit = {f"{row['nome']} (Mat: {row['matricula']})": row['id'] for index, row in
-                        funcionarios_para_editar_df.iterrows()}
-
-    if not map_nome_id_edit:
+    if not existem_funcionarios():
         st.warning("Nenhum funcionário cadastrado para editar.")
-    else:
-        selecao_funcionario_edit = st.selectbox("Selecione um funcionário para ver/editar seus dados",
-                                                options=map_nome_id_edit.keys())
-        id_func_edit = map_nome_id_edit[selecao_funcionario_edit]
-        dados_atuais = funcionarios_para_editar_df.loc[funcionarios_para_editar_df['id'] == id_func_edit].iloc[0]
+        return
 
+    id_func_edit = seletor_funcionario("Selecione um funcionário para ver/editar seus dados", "edit_func")
+    dados_atuais = buscar_funcionario(id_func_edit) if id_func_edit is not None else None
+    if dados_atuais is not None:
         with st.container(border=True):
             st.subheader(f"Editando: {dados_atuais['nome']}")
             with st.form("form_edit_funcionario"):
@@ -557,12 +262,17 @@ def show_editar_deletar():
 
                 col_save, col_delete = st.columns([3, 1])
                 if col_save.form_submit_button("Salvar Alterações", use_container_width=True):
-                    atualizar_funcionario(id_func_edit, nome_edit, matricula_edit, cargo_edit, cnh_tipo_edit,
-                                          cnh_validade_edit)
-                    st.rerun()
+                    try:
+                        atualizar_funcionario(id_func_edit, nome_edit, matricula_edit, cargo_edit, cnh_tipo_edit,
+                                              cnh_validade_edit)
+                        st.success("✅ Dados do funcionário atualizados com sucesso!")
+                        st.rerun()
+                    except ValueError as e:
+                        st.error(f"⚠️ Erro: {e}")
 
                 if col_delete.form_submit_button("🚨 Deletar"):
                     deletar_funcionario(id_func_edit)
+                    st.success("🗑️ Funcionário deletado com sucesso.")
                     st.rerun()
 
         st.divider()
@@ -578,6 +288,7 @@ def show_editar_deletar():
                     trein_a_deletar = st.selectbox("Selecione um treinamento para deletar", options=map_trein_id.keys())
                     if st.button("Deletar Treinamento Selecionado", use_container_width=True):
                         deletar_treinamento(map_trein_id[trein_a_deletar])
+                        st.success("🗑️ Treinamento deletado com sucesso.")
                         st.rerun()
                 else:
                     st.info("Este funcionário não possui treinamentos.")
@@ -592,6 +303,7 @@ def show_editar_deletar():
                     aso_a_deletar = st.selectbox("Selecione um ASO para deletar", options=map_aso_id.keys())
                     if st.button("Deletar ASO Selecionado", use_container_width=True):
                         deletar_aso(map_aso_id[aso_a_deletar])
+                        st.success("🗑️ ASO deletado com sucesso.")
                         st.rerun()
                 else:
                     st.info("Este funcionário não possui ASOs.")
@@ -601,29 +313,110 @@ def show_upload():
     st.title("⬆️ Upload de Planilha Excel")
     st.write("Faça o upload de um arquivo Excel para adicionar múltiplos registros de uma vez.")
 
+    tipo_carga = st.radio("Tipo de carga", ["Funcionários e ASOs", "Treinamentos", "Incidentes"], horizontal=True)
+    if tipo_carga != "Funcionários e ASOs":
+        mostrar_importacao_registros(tipo_carga.lower())
+        return
+
     with st.container(border=True):
         st.info(
             "O arquivo deve conter as colunas: 'NOME', 'FUNÇÃO', 'MATRICULA'. Colunas opcionais: 'ASO' (data do exame), 'VALIDADE DO ASO', 'CNH' (validade).")
         uploaded_file = st.file_uploader("Escolha um arquivo Excel (.xlsx)", type="xlsx")
         if uploaded_file is not None:
             try:
-                df_upload = pd.read_excel(uploaded_file)
+                # Só as primeiras linhas: a planilha inteira é lida em blocos pela tarefa em segundo plano
+                previa = ler_previa_planilha(uploaded_file)
                 st.write("### Pré-visualização dos Dados")
-                st.dataframe(df_upload.head())
+                st.dataframe(previa)
+                atualizar = st.toggle("Atualizar nome, função e CNH de quem já está cadastrado",
+                                      help="Para a planilha completa do RH: só as linhas que mudaram desde a última "
+                                           "carga são gravadas.")
                 if st.button("Processar e Salvar no Banco de Dados", use_container_width=True):
-                    required_cols = ['NOME', 'FUNÇÃO', 'MATRICULA']
-                    if all(col in df_upload.columns for col in df_upload.columns):
-                        processar_upload_excel(df_upload)
+                    if all(col in previa.columns for col in COLUNAS_OBRIGATORIAS):
+                        id_tarefa = enfileirar('upload_planilha', uploaded_file.name,
+                                               {'modo': 'atualizar' if atualizar else 'inserir'},
+                                               conteudo=uploaded_file.getvalue(), extensao='.xlsx')
+                        st.success(f"Planilha enviada para processamento (tarefa #{id_tarefa}). "
+                                   "Você pode continuar usando o painel enquanto ela é gravada.")
                     else:
-                        st.error(f"Erro: O arquivo precisa conter as colunas {required_cols}.")
+                        st.error(f"Erro: O arquivo precisa conter as colunas {COLUNAS_OBRIGATORIAS}.")
             except Exception as e:
                 st.error(f"Ocorreu um erro ao ler o arquivo: {e}")
 
+    st.subheader("Uploads Recentes")
+    mostrar_tarefas('upload_planilha')
+
+
+def mostrar_importacao_registros(destino):
+    """Carga em massa de treinamentos ou incidentes (importacao.py), com a escolha das colunas do arquivo."""
+    with st.container(border=True):
+        st.info("Envie um CSV (separado por ';' ou ',') ou um Excel. O CSV é lido bem mais rápido. "
+                "Linhas iguais a registros já cadastrados são ignoradas.")
+        uploaded_file = st.file_uploader("Escolha um arquivo (.csv ou .xlsx)", type=["csv", "xlsx"],
+                                         key=f"arquivo_{destino}")
+        if uploaded_file is not None:
+            try:
+                previa = ler_arquivo(uploaded_file, linhas=5)
+                st.write("### Pré-visualização dos Dados")
+                st.dataframe(previa)
+
+                st.write("### Colunas do Arquivo")
+                sugerido = sugerir_mapeamento(destino, previa.columns)
+                opcoes = ["(não informado)"] + list(previa.columns)
+                mapeamento = {}
+                colunas = st.columns(4)
+                for i, (campo, (_, obrigatorio, _)) in enumerate(LAYOUTS[destino].items()):
+                    escolhida = colunas[i % 4].selectbox(
+                        f"{campo}{' *' if obrigatorio else ''}", opcoes, key=f"coluna_{destino}_{campo}",
+                        index=opcoes.index(sugerido[campo]) if campo in sugerido else 0)
+                    # None: o campo fica em branco mesmo que o arquivo tenha a coluna com o nome padrão
+                    mapeamento[campo] = escolhida if escolhida != opcoes[0] else None
+
+                if st.button("Importar", use_container_width=True):
+                    faltando = [campo for campo, (_, obrigatorio, _) in LAYOUTS[destino].items()
+                                if obrigatorio and mapeamento[campo] is None]
+                    if faltando:
+                        st.error(f"Erro: Escolha a coluna do arquivo para {faltando}.")
+                    else:
+                        extensao = '.csv' if uploaded_file.name.lower().endswith('.csv') else '.xlsx'
+                        id_tarefa = enfileirar('importacao_registros', f"{uploaded_file.name} ({destino})",
+                                               {'destino': destino, 'mapeamento': mapeamento},
+                                               conteudo=uploaded_file.getvalue(), extensao=extensao)
+                        st.success(f"Arquivo enviado para importação (tarefa #{id_tarefa}).")
+            except Exception as e:
+                st.error(f"Ocorreu um erro ao ler o arquivo: {e}")
+
+    st.subheader("Importações Recentes")
+    mostrar_tarefas('importacao_registros')
+
+
+def show_tarefas():
+    st.title("⏳ Tarefas em Segundo Plano")
+
+    with st.form("form_exportacao_bi"):
+        st.subheader("Exportar para BI")
+        col1, col2 = st.columns(2)
+        formato = col1.selectbox("Formato", ["csv", "parquet"])
+        incremental = col2.toggle("Só o que mudou desde a última exportação")
+        if st.form_submit_button("Exportar", use_container_width=True):
+            id_tarefa = enfileirar('exportacao_bi', f"Exportação para BI ({formato}{', incremental' if incremental else ''})",
+                                   {'formato': formato, 'incremental': incremental})
+            st.success(f"Exportação enviada (tarefa #{id_tarefa}).")
+
+    st.subheader("Todas as Tarefas")
+    mostrar_tarefas(limite=20)
+
 
 # --- ESTRUTURA PRINCIPAL DA APLICAÇÃO ---
 
 def main():
-    init_db()
+    # Com PAINEL_DEBUG_SQL=1, mede as consultas deste rerun para o painel de depuração da sidebar
+    if instrumentacao.ATIVA:
+        instrumentacao.iniciar_coleta()
+    # Aplica as migrações pendentes no primeiro rerun do processo; nos demais não toca no banco
+    garantir_schema()
+    # Threads que executam uploads e exportações; sobem uma vez por processo (PAINEL_TAREFAS_WORKERS=0 desliga)
+    iniciar_workers()
 
     st.set_page_config(page_title="Segurança do Trabalho", layout="wide", page_icon="🛡️")
 
@@ -650,7 +443,7 @@ def main():
         page = st.radio(
             "Menu Principal",
             ("📊 Dashboard", "🚨 Incidentes", "👥 Funcionários", "🎓 Treinamentos", "⚕️ ASOs", "✏️ Editar / Deletar",
-             "⬆️ Upload de Arquivo"),
+             "⬆️ Upload de Arquivo", "⏳ Tarefas"),
             label_visibility="collapsed"
         )
 
@@ -668,6 +461,11 @@ def main():
         show_editar_deletar()
     elif page == "⬆️ Upload de Arquivo":
         show_upload()
+    elif page == "⏳ Tarefas":
+        show_tarefas()
+
+    if instrumentacao.ATIVA:
+        instrumentacao.mostrar_painel_depuracao()
 
 
 if __name__ == "__main__":
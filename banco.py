@@ -0,0 +1,260 @@
+import functools
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import datas
+import instrumentacao
+
+
+# --- CONFIGURAÇÃO DA CONEXÃO COM O BANCO DE DADOS ---
+# Todos os valores podem ser ajustados por variáveis de ambiente, sem mexer no código.
+
+DB_FILE = os.environ.get('PAINEL_DB_FILE', 'controle_empresa.db')
+
+PRAGMAS = {
+    # WAL permite leituras concorrentes enquanto outra sessão escreve
+    'journal_mode': os.environ.get('PAINEL_DB_JOURNAL_MODE', 'WAL'),
+    # NORMAL é seguro com WAL e evita um fsync a cada commit
+    'synchronous': os.environ.get('PAINEL_DB_SYNCHRONOUS', 'NORMAL'),
+    # Valor negativo = tamanho em KiB (padrão: 64 MiB de cache por conexão)
+    'cache_size': int(os.environ.get('PAINEL_DB_CACHE_SIZE', -64 * 1024)),
+    # Leitura via mmap (padrão: 256 MiB; 0 desativa)
+    'mmap_size': int(os.environ.get('PAINEL_DB_MMAP_SIZE', 256 * 1024 * 1024)),
+    # Tempo (ms) que uma conexão espera por um lock antes de falhar com "database is locked"
+    'busy_timeout': int(os.environ.get('PAINEL_DB_BUSY_TIMEOUT', 5000)),
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+POOL_SIZE = int(os.environ.get('PAINEL_DB_POOL_SIZE', 8))
+
+# Quantidade máxima de resultados mantidos no cache de consultas (0 desativa o cache)
+CACHE_MAX_ITENS = int(os.environ.get('PAINEL_CACHE_MAX_ITENS', 256))
+
+# Datas vão para o banco como número de dias e voltam como `date` nas colunas declaradas DATE (ver datas.py).
+# Substituem o adaptador/conversor padrão do sqlite3 (texto ISO), obsoletos desde o Python 3.12.
+sqlite3.register_adapter(date, datas.para_dias)
+sqlite3.register_converter('DATE', datas.de_dias)
+
+
+class ConexaoPool(sqlite3.Connection):
+    """Conexão SQLite que volta para o pool quando `close()` é chamado.
+
+    Continua sendo um `sqlite3.Connection` de verdade, então funciona direto com `pd.read_sql_query`.
+    """
+
+    pool = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.devolver(self)
+
+    def fechar_definitivamente(self):
+        super().close()
+
+
+class ConexaoInstrumentada(ConexaoPool):
+    """Conexão do pool cujos cursores medem cada comando (ativada por PAINEL_DEBUG_SQL, ver instrumentacao.py)."""
+
+    def cursor(self, factory=instrumentacao.CursorInstrumentado):
+        return super().cursor(factory)
+
+    # O execute do sqlite3.Connection cria um cursor comum por dentro, sem passar por cursor()
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self.cursor().executemany(sql, seq_params)
+
+
+class PoolConexoes:
+    """Pool de conexões por processo, reaproveitado entre os reruns do Streamlit."""
+
+    def __init__(self, db_file, pragmas, tamanho):
+        self.db_file = db_file
+        self.pragmas = dict(pragmas)
+        self.tamanho = tamanho
+        self.pid = os.getpid()
+        self.livres = queue.LifoQueue(maxsize=tamanho)
+
+    def criar_conexao(self):
+        fabrica = ConexaoInstrumentada if instrumentacao.ATIVA else ConexaoPool
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, factory=fabrica,
+                               detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.row_factory = sqlite3.Row
+        for nome, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nome} = {valor};")
+        conn.pool = self
+        return conn
+
+    def obter(self):
+        try:
+            return self.livres.get_nowait()
+        except queue.Empty:
+            return self.criar_conexao()
+
+    def devolver(self, conn):
+        # Uma transação esquecida aberta não pode vazar para o próximo usuário da conexão
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self.livres.put_nowait(conn)
+        except queue.Full:
+            conn.fechar_definitivamente()
+
+    def fechar(self):
+        while True:
+            try:
+                self.livres.get_nowait().fechar_definitivamente()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool():
+    """Retorna o pool do processo atual, criando-o na primeira chamada (ou após um fork)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = PoolConexoes(DB_FILE, PRAGMAS, POOL_SIZE)
+        return _pool
+
+
+def configurar_banco(db_file=None, pool_size=None, **pragmas):
+    """Altera o arquivo do banco, o tamanho do pool e/ou os PRAGMAs e recria o pool."""
+    global DB_FILE, POOL_SIZE, _pool
+    with _pool_lock:
+        if db_file is not None:
+            DB_FILE = db_file
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+        PRAGMAS.update(pragmas)
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
+    invalidar_cache()
+
+
+def get_db_connection():
+    """Retorna uma conexão do pool. Chamar `conn.close()` devolve a conexão ao pool."""
+    return obter_pool().obter()
+
+
+def ler_dataframe(query, params=()):
+    """Executa a consulta em uma conexão do pool e retorna um DataFrame.
+
+    O pandas só é importado aqui: scripts que não montam DataFrames (ex.: a CLI de KPIs) não pagam o import.
+    """
+    import pandas as pd
+
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+
+# --- CACHE DE CONSULTAS ---
+
+class CacheConsultas:
+    """Cache LRU de resultados de leitura, invalidado por qualquer escrita no banco.
+
+    A validade é controlada por `PRAGMA data_version` lido em uma conexão "sentinela" que nunca
+    escreve: o valor muda sempre que outra conexão (deste ou de outro processo) faz commit. Assim,
+    escritas feitas pela aplicação, pelo upload, pelo gerador de dados ou por qualquer script
+    invalidam o cache, e enquanto ninguém escreve as leituras não tocam nas tabelas.
+    """
+
+    def __init__(self, max_itens):
+        self.max_itens = max_itens
+        self.itens = OrderedDict()
+        self.lock = threading.Lock()
+        self.sentinela = None
+        self.pid = None
+        self.versao = None
+        self.acertos = 0
+        self.falhas = 0
+
+    def versao_banco(self):
+        # Chamado com self.lock adquirido
+        if self.sentinela is None or self.pid != os.getpid():
+            self.sentinela = sqlite3.connect(DB_FILE, check_same_thread=False)
+            self.pid = os.getpid()
+        versao = self.sentinela.execute("PRAGMA data_version;").fetchone()[0]
+        if versao != self.versao:
+            self.itens.clear()
+            self.versao = versao
+        return versao
+
+    def obter(self, chave):
+        """Retorna (encontrado, valor, versão atual do banco)."""
+        with self.lock:
+            versao = self.versao_banco()
+            if chave in self.itens:
+                self.itens.move_to_end(chave)
+                self.acertos += 1
+                return True, self.itens[chave], versao
+            self.falhas += 1
+            return False, None, versao
+
+    def guardar(self, chave, valor, versao):
+        with self.lock:
+            # Se houve escrita durante a consulta, o resultado pode já estar velho: não guarda
+            if versao != self.versao:
+                return
+            self.itens[chave] = valor
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.max_itens:
+                self.itens.popitem(last=False)
+
+    def limpar(self):
+        with self.lock:
+            self.itens.clear()
+            if self.sentinela is not None:
+                self.sentinela.close()
+            self.sentinela = None
+            self.versao = None
+
+
+_cache = CacheConsultas(CACHE_MAX_ITENS)
+
+
+def invalidar_cache():
+    """Descarta todos os resultados em cache (ex.: após trocar o arquivo do banco)."""
+    _cache.limpar()
+
+
+def estatisticas_cache():
+    """Retorna acertos, falhas e quantidade de itens do cache de consultas."""
+    return {'acertos': _cache.acertos, 'falhas': _cache.falhas, 'itens': len(_cache.itens)}
+
+
+def cache_consulta(func):
+    """Decorador para funções de leitura (buscar_*): reaproveita o resultado enquanto o banco não muda.
+
+    A chave é a função mais seus argumentos e a data de hoje (as consultas de vencimento usam
+    `date.today()`). Os resultados são compartilhados entre chamadas e não devem ser alterados in-place.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _cache.max_itens <= 0:
+            return func(*args, **kwargs)
+        chave = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())), date.today())
+        encontrado, valor, versao = _cache.obter(chave)
+        if encontrado:
+            return valor
+        valor = func(*args, **kwargs)
+        _cache.guardar(chave, valor, versao)
+        return valor
+
+    return wrapper
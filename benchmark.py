@@ -0,0 +1,212 @@
+import argparse
+import contextlib
+import io
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+import pandas as pd
+
+import exportar_bi
+import gerarador_de_dados
+from banco import configurar_banco, get_db_connection, invalidar_cache
+from migracoes import aplicar_migracoes
+from dados_cadastro import buscar_funcionarios, buscar_funcionarios_por_texto
+from dados_dashboard import buscar_dados_dashboard
+from dados_incidentes import buscar_incidentes
+from ingestao import ingerir_planilha
+
+
+# --- BENCHMARK DOS CAMINHOS CRÍTICOS EM VÁRIOS VOLUMES ---
+# Para cada tamanho, cria (uma vez) um banco com o gerador de dados e semente fixa, e mede as
+# leituras do dashboard e das listagens, o upload de planilha e a exportação para CSV. O cache de
+# consultas é limpo antes de cada repetição, então os tempos são sempre da consulta "fria".
+# Os resultados saem em JSON e podem ser comparados com uma baseline salva.
+
+TAMANHOS = [1_000, 10_000, 100_000, 1_000_000]
+SEED = 42
+PASTA_BANCOS = 'benchmark_dbs'
+ARQUIVO_BASELINE = 'benchmark_baseline.json'
+LINHAS_PLANILHA = 5_000
+
+# Uma medição só conta como regressão se piorar mais que a tolerância E mais que este tempo absoluto
+# (consultas de poucos milissegundos variam muito de uma execução para outra)
+FOLGA_MINIMA_S = 0.005
+
+
+def preparar_banco(tamanho, pasta, recriar=False):
+    """Aponta a aplicação para o banco de `tamanho` funcionários, gerando-o se ainda não existir."""
+    caminho = os.path.join(pasta, f"bench_{tamanho}.db")
+    if recriar:
+        for sufixo in ('', '-wal', '-shm'):
+            if os.path.exists(caminho + sufixo):
+                os.remove(caminho + sufixo)
+    novo = not os.path.exists(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    configurar_banco(db_file=caminho)
+    # Também atualiza bancos gerados por versões anteriores do benchmark
+    aplicar_migracoes()
+    if novo:
+        print(f"Gerando banco com {tamanho:,} funcionários em {caminho}...")
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            gerarador_de_dados.criar_dados_em_massa(tamanho, seed=SEED)
+        print(f"  gerado em {time.perf_counter() - inicio:.1f} s")
+    return caminho
+
+
+def montar_planilha(conn, linhas=LINHAS_PLANILHA, seed=SEED):
+    """Planilha sintética no formato do upload: metade matrículas existentes, metade novas."""
+    existentes = [row[0] for row in conn.execute("SELECT matricula FROM funcionarios ORDER BY id LIMIT ?",
+                                                 (linhas // 2,))]
+    novas = [f"BENCH{seed}{i:07d}" for i in range(linhas - len(existentes))]
+    matriculas = existentes + novas
+    datas_exame = pd.date_range('2024-01-01', periods=len(matriculas), freq='h').normalize()
+    return pd.DataFrame({
+        'NOME': [f"Funcionário Benchmark {i}" for i in range(len(matriculas))],
+        'FUNÇÃO': 'Operador de Empilhadeira',
+        'MATRICULA': matriculas,
+        'CNH': pd.Timestamp('2027-06-30'),
+        'ASO': datas_exame,
+        'VALIDADE DO ASO': datas_exame + pd.DateOffset(years=1),
+    })
+
+
+def medir(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes, limpando o cache antes de cada uma. Retorna os tempos (s)."""
+    tempos = []
+    for _ in range(repeticoes):
+        invalidar_cache()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def listar_caminhos(pasta_exportacao):
+    """Retorna {nome: (função sem argumentos, repetições máximas)} dos caminhos medidos."""
+    conn = get_db_connection()
+    cargo = conn.execute("SELECT cargo FROM funcionarios WHERE cargo IS NOT NULL LIMIT 1").fetchone()[0]
+    planilha = montar_planilha(conn)
+    conn.close()
+
+    def mapa_funcionarios():
+        # Mesmo padrão das telas antes da busca indexada: todos os funcionários em um dicionário
+        df = buscar_funcionarios()
+        return {f"{row['nome']} (Mat: {row['matricula']})": row['id'] for index, row in df.iterrows()}
+
+    def upload_planilha():
+        # Mesmo trabalho do processar_upload_excel, mas desfeito no fim para não alterar o banco medido
+        conn = get_db_connection()
+        try:
+            ingerir_planilha(conn, planilha)
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def exportacao_csv():
+        exportar_bi.OUTPUT_FOLDER = pasta_exportacao
+        exportar_bi.PASTA_DELTAS = os.path.join(pasta_exportacao, 'deltas')
+        with contextlib.redirect_stdout(io.StringIO()):
+            exportar_bi.exportar_tabelas_para_csv()
+
+    return {
+        'dashboard_todos_cargos': (lambda: buscar_dados_dashboard(), None),
+        'dashboard_com_cargo': (lambda: buscar_dados_dashboard(cargo=cargo), None),
+        'buscar_incidentes': (buscar_incidentes, None),
+        'buscar_funcionarios_mapa': (mapa_funcionarios, None),
+        'busca_funcionarios_indexada': (lambda: buscar_funcionarios_por_texto("silva jo"), None),
+        'upload_planilha': (upload_planilha, None),
+        # A exportação grava tudo em disco: uma execução basta
+        'exportar_tabelas_para_csv': (exportacao_csv, 1),
+    }
+
+
+def executar(tamanhos, repeticoes, pasta, recriar=False, caminhos=None):
+    """Roda o benchmark e retorna o dicionário de resultados (o mesmo formato do JSON)."""
+    resultados = {}
+    for tamanho in tamanhos:
+        caminho_banco = preparar_banco(tamanho, pasta, recriar)
+        pasta_exportacao = os.path.join(pasta, f"exportacao_{tamanho}")
+        medidos = {}
+        for nome, (funcao, maximo) in listar_caminhos(pasta_exportacao).items():
+            if caminhos and nome not in caminhos:
+                continue
+            tempos = medir(funcao, min(repeticoes, maximo or repeticoes))
+            medidos[nome] = {
+                'mediana_s': round(statistics.median(tempos), 6),
+                'min_s': round(min(tempos), 6),
+                'max_s': round(max(tempos), 6),
+                'repeticoes': len(tempos),
+            }
+            print(f"  {tamanho:>9,} | {nome:<28} {medidos[nome]['mediana_s'] * 1000:>10.1f} ms")
+        resultados[str(tamanho)] = {'banco_bytes': os.path.getsize(caminho_banco), 'caminhos': medidos}
+
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'data_referencia': date.today().isoformat(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'seed': SEED,
+        'resultados': resultados,
+    }
+
+
+def comparar(atual, baseline, tolerancia):
+    """Compara as medianas com a baseline. Retorna a lista de regressões (tamanho, caminho, base, atual)."""
+    regressoes = []
+    print(f"\n{'Tamanho':>9} | {'Caminho':<28} {'Baseline (ms)':>14} {'Atual (ms)':>11} {'Variação':>9}")
+    for tamanho, dados in atual['resultados'].items():
+        base_tamanho = baseline.get('resultados', {}).get(tamanho, {}).get('caminhos', {})
+        for nome, medida in dados['caminhos'].items():
+            if nome not in base_tamanho:
+                continue
+            base, agora = base_tamanho[nome]['mediana_s'], medida['mediana_s']
+            variacao = (agora - base) / base if base else 0.0
+            regrediu = variacao > tolerancia and agora - base > FOLGA_MINIMA_S
+            if regrediu:
+                regressoes.append((tamanho, nome, base, agora))
+            print(f"{int(tamanho):>9,} | {nome:<28} {base * 1000:>14.1f} {agora * 1000:>11.1f} "
+                  f"{variacao:>+8.0%}{'  ⚠️ REGRESSÃO' if regrediu else ''}")
+    return regressoes
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Mede os caminhos críticos do painel em bancos de vários tamanhos.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS,
+                        help=f"quantidades de funcionários (padrão: {' '.join(map(str, TAMANHOS))})")
+    parser.add_argument('--repeticoes', type=int, default=3, help="execuções por caminho; vale a mediana (padrão: 3)")
+    parser.add_argument('--caminhos', nargs='+', default=None, help="mede só estes caminhos")
+    parser.add_argument('--pasta', default=PASTA_BANCOS, help=f"onde ficam os bancos gerados (padrão: {PASTA_BANCOS})")
+    parser.add_argument('--recriar', action='store_true', help="gera os bancos de novo mesmo que já existam")
+    parser.add_argument('--saida', default=None, help="grava os resultados neste arquivo JSON")
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE,
+                        help=f"arquivo da baseline para comparação (padrão: {ARQUIVO_BASELINE})")
+    parser.add_argument('--salvar-baseline', action='store_true', help="grava os resultados como a nova baseline")
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help="piora relativa aceita antes de apontar regressão (padrão: 0.25 = 25%%)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = ler_argumentos()
+    resultado = executar(args.tamanhos, args.repeticoes, args.pasta, args.recriar, args.caminhos)
+
+    if args.saida:
+        exportar_bi.salvar_json(args.saida, resultado)
+        print(f"\nResultados gravados em {args.saida}")
+
+    if args.salvar_baseline:
+        exportar_bi.salvar_json(args.baseline, resultado)
+        print(f"Baseline gravada em {args.baseline}")
+    elif os.path.exists(args.baseline):
+        regressoes = comparar(resultado, exportar_bi.carregar_json(args.baseline, {}), args.tolerancia)
+        print(f"\n{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}.")
+        sys.exit(1 if regressoes else 0)
+    else:
+        print(f"\nSem baseline em {args.baseline}: use --salvar-baseline para criar uma.")
@@ -0,0 +1,29 @@
+import streamlit as st
+from dados_cadastro import LIMITE_RESULTADOS, buscar_funcionarios_por_texto
+
+
+# --- BUSCA DE FUNCIONÁRIOS POR NOME OU MATRÍCULA ---
+# Em vez de carregar todos os funcionários em um selectbox, o usuário digita parte do nome ou da
+# matrícula e só os primeiros resultados são buscados, pelo índice FTS5 de dados_cadastro.py.
+
+
+def seletor_funcionario(rotulo, chave, opcao_nenhum=None, limite=LIMITE_RESULTADOS):
+    """Campo de busca + selectbox com os funcionários encontrados. Retorna o id escolhido.
+
+    Com `opcao_nenhum`, a primeira opção é esse texto e escolhê-la retorna None. Também retorna
+    None quando a busca não encontra ninguém.
+    """
+    texto = st.text_input(f"{rotulo} — buscar por nome ou matrícula", key=f"{chave}_busca",
+                          placeholder="Digite parte do nome ou a matrícula")
+    resultados = buscar_funcionarios_por_texto(texto.strip(), limite)
+    rotulos = dict(resultados)
+    opcoes = ([None] if opcao_nenhum else []) + list(rotulos)
+    if not opcoes:
+        st.info("Nenhum funcionário encontrado para essa busca.")
+        return None
+
+    escolhido = st.selectbox(rotulo, opcoes, key=f"{chave}_select",
+                             format_func=lambda id: opcao_nenhum if id is None else rotulos[id])
+    if len(resultados) == limite:
+        st.caption(f"Mostrando os {limite} primeiros resultados. Digite mais para refinar a busca.")
+    return escolhido
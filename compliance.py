@@ -0,0 +1,204 @@
+from banco import get_db_connection
+from datas import HOJE_SQL
+
+
+# --- SITUAÇÃO DE CONFORMIDADE POR FUNCIONÁRIO (compliance_status) ---
+# Uma linha por funcionário e documento: cada treinamento (pelo nome), o ASO e a CNH, com a validade
+# mais recente e a situação ('valido', 'a_vencer', 'vencido' ou 'sem_validade'). Um treinamento
+# renovado substitui o anterior, então o dashboard conta pessoas com pendência e não linhas de
+# histórico, e o custo das contagens depende do número de funcionários, não do histórico.
+#
+# Os triggers de treinamentos, asos e funcionarios mantêm a tabela. Como a situação também muda com
+# a passagem dos dias, as leituras do dashboard a calculam da validade na hora (expressao_status) e
+# nunca escrevem; a coluna `status` é reclassificada pelo agendador de alertas a cada ciclo
+# (`atualizar_status_compliance`, barato: só olha as linhas 'valido'/'a_vencer' com validade próxima).
+
+DIAS_ALERTA = 30
+
+DDL_COMPLIANCE = [
+    """
+    CREATE TABLE IF NOT EXISTS compliance_status
+    (
+        id             INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        tipo_documento TEXT    NOT NULL,
+        documento      TEXT    NOT NULL,
+        validade       DATE,
+        status         TEXT    NOT NULL,
+        UNIQUE (funcionario_id, tipo_documento, documento)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_compliance_status ON compliance_status (tipo_documento, status, validade)",
+]
+
+
+def expressao_status(validade):
+    """Expressão SQL que classifica uma data de validade (em dias, ver datas.py) em relação a hoje."""
+    return f"""CASE
+                   WHEN {validade} IS NULL THEN 'sem_validade'
+                   WHEN {validade} < {HOJE_SQL} THEN 'vencido'
+                   WHEN {validade} <= {HOJE_SQL} + {DIAS_ALERTA} THEN 'a_vencer'
+                   ELSE 'valido'
+               END"""
+
+
+# Para cada tipo de documento: de onde vêm as linhas, qual coluna identifica o documento e qual é a validade
+ORIGENS = {
+    'treinamento': ("treinamentos", "nome_treinamento", "validade", "funcionario_id"),
+    'aso': ("asos", "'ASO'", "validade_aso", "funcionario_id"),
+    'cnh': ("funcionarios", "'CNH'", "cnh_validade", "id"),
+}
+
+
+def selecionar_situacao(tipo, filtro=""):
+    """SELECT com a situação de `tipo` calculada a partir da tabela de origem (opcionalmente filtrada)."""
+    tabela, documento, validade, funcionario = ORIGENS[tipo]
+    condicao = "" if tipo != 'cnh' else "WHERE cnh_validade IS NOT NULL"
+    if filtro:
+        condicao = f"{condicao} AND {filtro}" if condicao else f"WHERE {filtro}"
+    return f"""
+        SELECT {funcionario}, '{tipo}', {documento}, MAX({validade}), {expressao_status(f'MAX({validade})')}
+        FROM {tabela}
+        {condicao}
+        GROUP BY {funcionario}, {documento}
+    """
+
+
+def recalcular_documento(tipo, registro):
+    """Corpo de trigger que recalcula a linha do documento de `registro` (old/new) a partir da origem."""
+    tabela, documento, validade, funcionario = ORIGENS[tipo]
+    doc_registro = f"{registro}.{documento}" if tipo == 'treinamento' else documento
+    filtro = f"{funcionario} = {registro}.{funcionario}"
+    if tipo == 'treinamento':
+        filtro += f" AND nome_treinamento = {registro}.nome_treinamento"
+    # O UPSERT atualiza a linha existente em vez de apagar e recriar (o id continua o mesmo)
+    return f"""
+        INSERT INTO compliance_status (funcionario_id, tipo_documento, documento, validade, status)
+        {selecionar_situacao(tipo, filtro)}
+        ON CONFLICT (funcionario_id, tipo_documento, documento) DO UPDATE
+            SET validade = excluded.validade,
+                status   = excluded.status
+            WHERE validade IS NOT excluded.validade OR status IS NOT excluded.status;
+        DELETE FROM compliance_status
+        WHERE funcionario_id = {registro}.{funcionario}
+          AND tipo_documento = '{tipo}'
+          AND documento = {doc_registro}
+          AND NOT EXISTS (SELECT 1 FROM {tabela} WHERE {filtro}{' AND cnh_validade IS NOT NULL' if tipo == 'cnh' else ''});
+    """
+
+
+TRIGGERS_COMPLIANCE = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_treinamentos_insert AFTER INSERT ON treinamentos BEGIN
+        {recalcular_documento('treinamento', 'new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_treinamentos_update
+        AFTER UPDATE OF funcionario_id, nome_treinamento, validade ON treinamentos BEGIN
+        {recalcular_documento('treinamento', 'old')}
+        {recalcular_documento('treinamento', 'new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_treinamentos_delete AFTER DELETE ON treinamentos BEGIN
+        {recalcular_documento('treinamento', 'old')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_asos_insert AFTER INSERT ON asos BEGIN
+        {recalcular_documento('aso', 'new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_asos_update
+        AFTER UPDATE OF funcionario_id, validade_aso ON asos BEGIN
+        {recalcular_documento('aso', 'old')}
+        {recalcular_documento('aso', 'new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_asos_delete AFTER DELETE ON asos BEGIN
+        {recalcular_documento('aso', 'old')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_funcionarios_insert AFTER INSERT ON funcionarios BEGIN
+        {recalcular_documento('cnh', 'new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_funcionarios_update AFTER UPDATE OF cnh_validade ON funcionarios BEGIN
+        {recalcular_documento('cnh', 'new')}
+    END
+    """,
+    # Os treinamentos e ASOs do funcionário saem pelo ON DELETE CASCADE (e seus triggers), mas a CNH
+    # e qualquer sobra de quando as chaves estrangeiras estavam desligadas saem aqui
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_compliance_funcionarios_delete AFTER DELETE ON funcionarios BEGIN
+        DELETE FROM compliance_status WHERE funcionario_id = old.id;
+    END
+    """,
+]
+
+
+def criar_compliance_status(cursor):
+    """Cria a tabela, o índice e os triggers. Na primeira vez, calcula a situação de todos os funcionários."""
+    ja_existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'compliance_status'").fetchone()
+    for ddl in DDL_COMPLIANCE + TRIGGERS_COMPLIANCE:
+        cursor.execute(ddl)
+    if not ja_existe:
+        reconstruir_compliance_status(cursor)
+
+
+def reconstruir_compliance_status(cursor):
+    """Recalcula a tabela do zero a partir de treinamentos, asos e funcionarios (não faz commit)."""
+    cursor.execute("DELETE FROM compliance_status")
+    for tipo in ORIGENS:
+        cursor.execute(f"""
+            INSERT INTO compliance_status (funcionario_id, tipo_documento, documento, validade, status)
+            {selecionar_situacao(tipo)}
+        """)
+
+
+def atualizar_status_compliance(conn=None):
+    """Reclassifica as linhas cuja situação mudou com a passagem do tempo. Retorna quantas mudaram.
+
+    Chamada pelo agendador de alertas (alertas.py), não pelas leituras: precisa do lock de escrita e,
+    durante uma carga longa, esperaria o busy_timeout. Só toca nas linhas que cruzaram um limite desde
+    a última execução, então na maior parte das vezes não altera nada.
+    """
+    fechar = conn is None
+    conn = conn or get_db_connection()
+    alteradas = 0
+    try:
+        for status in ('valido', 'a_vencer'):
+            alteradas += conn.execute(f"""
+                UPDATE compliance_status
+                SET status = {expressao_status('validade')}
+                WHERE tipo_documento IN ('treinamento', 'aso', 'cnh')
+                  AND status = ?
+                  AND validade <= {HOJE_SQL} + {DIAS_ALERTA}
+                  AND status <> {expressao_status('validade')}
+            """, (status,)).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if fechar:
+            conn.close()
+    return alteradas
+
+
+if __name__ == "__main__":
+    # python compliance.py  -> recalcula compliance_status a partir dos registros
+    conn = get_db_connection()
+    criar_compliance_status(conn)
+    reconstruir_compliance_status(conn)
+    conn.commit()
+    resumo = conn.execute(
+        "SELECT status, COUNT(*) FROM compliance_status GROUP BY status ORDER BY status").fetchall()
+    conn.close()
+    print("compliance_status reconstruída: " + ", ".join(f"{status}: {total}" for status, total in resumo))
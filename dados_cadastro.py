@@ -0,0 +1,232 @@
+import re
+import sqlite3
+
+from banco import get_db_connection, cache_consulta, ler_dataframe
+
+
+# --- FUNCIONÁRIOS, TREINAMENTOS E ASOs: CONSULTAS E CRUD ---
+# Sem nenhuma dependência de interface: o app.py, o uploader, scripts e testes usam as mesmas funções.
+# Erros de regra (ex.: matrícula repetida) saem como ValueError com a mensagem para o usuário; quem
+# chama decide como mostrar. O pandas só é importado pelas funções que retornam DataFrame.
+
+
+# --- Funcionários ---
+SQL_LISTA_FUNCIONARIOS = "SELECT id, nome, matricula, cargo, cnh_tipo, cnh_validade FROM funcionarios"
+
+
+def adicionar_funcionario(nome, matricula, cargo, cnh_tipo, cnh_validade):
+    conn = get_db_connection()
+    try:
+        conn.execute("INSERT INTO funcionarios (nome, matricula, cargo, cnh_tipo, cnh_validade) VALUES (?, ?, ?, ?, ?)",
+                     (nome, matricula, cargo, cnh_tipo, cnh_validade))
+        conn.commit()
+    except sqlite3.IntegrityError:
+        raise ValueError("A matrícula fornecida já existe.")
+    finally:
+        conn.close()
+
+
+@cache_consulta
+def buscar_funcionarios():
+    return ler_dataframe(SQL_LISTA_FUNCIONARIOS)
+
+
+@cache_consulta
+def buscar_funcionario(id):
+    conn = get_db_connection()
+    row = conn.execute("SELECT * FROM funcionarios WHERE id = ?", (id,)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+@cache_consulta
+def buscar_cargos():
+    conn = get_db_connection()
+    cargos = [row['cargo'] for row in conn.execute("SELECT DISTINCT cargo FROM funcionarios WHERE cargo IS NOT NULL")]
+    conn.close()
+    return cargos
+
+
+def atualizar_funcionario(id, nome, matricula, cargo, cnh_tipo, cnh_validade):
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "UPDATE funcionarios SET nome = ?, matricula = ?, cargo = ?, cnh_tipo = ?, cnh_validade = ? WHERE id = ?",
+            (nome, matricula, cargo, cnh_tipo, cnh_validade, id))
+        conn.commit()
+    except sqlite3.IntegrityError:
+        raise ValueError("A matrícula informada já pertence a outro funcionário.")
+    finally:
+        conn.close()
+
+
+def deletar_funcionario(id):
+    conn = get_db_connection()
+    conn.execute("DELETE FROM funcionarios WHERE id = ?", (id,))
+    conn.commit()
+    conn.close()
+
+
+# --- Treinamentos ---
+SQL_LISTA_TREINAMENTOS = """
+    SELECT t.id, f.nome as nome_funcionario, t.nome_treinamento, t.data_realizacao, t.validade
+    FROM treinamentos t
+             JOIN funcionarios f ON t.funcionario_id = f.id
+"""
+
+
+def adicionar_treinamento(funcionario_id, nome_treinamento, data_realizacao, validade):
+    conn = get_db_connection()
+    conn.execute(
+        "INSERT INTO treinamentos (funcionario_id, nome_treinamento, data_realizacao, validade) VALUES (?, ?, ?, ?)",
+        (funcionario_id, nome_treinamento, data_realizacao, validade))
+    conn.commit()
+    conn.close()
+
+
+@cache_consulta
+def buscar_treinamentos():
+    return ler_dataframe(SQL_LISTA_TREINAMENTOS)
+
+
+@cache_consulta
+def buscar_treinamentos_por_funcionario(funcionario_id):
+    return ler_dataframe(
+        "SELECT id, nome_treinamento, data_realizacao, validade FROM treinamentos WHERE funcionario_id = ?",
+        (funcionario_id,))
+
+
+def deletar_treinamento(id):
+    conn = get_db_connection()
+    conn.execute("DELETE FROM treinamentos WHERE id = ?", (id,))
+    conn.commit()
+    conn.close()
+
+
+# --- ASOs ---
+SQL_LISTA_ASOS = """
+    SELECT a.id, f.nome as nome_funcionario, a.tipo_exame, a.data_exame, a.resultado, a.validade_aso
+    FROM asos a
+             JOIN funcionarios f ON a.funcionario_id = f.id
+"""
+
+
+def adicionar_aso(funcionario_id, tipo_exame, data_exame, resultado, validade_aso):
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "INSERT INTO asos (funcionario_id, tipo_exame, data_exame, resultado, validade_aso) VALUES (?, ?, ?, ?, ?)",
+            (funcionario_id, tipo_exame, data_exame, resultado, validade_aso))
+        conn.commit()
+    except sqlite3.IntegrityError:
+        raise ValueError("Já existe um ASO deste tipo para este funcionário nesta data.")
+    finally:
+        conn.close()
+
+
+@cache_consulta
+def buscar_asos():
+    return ler_dataframe(SQL_LISTA_ASOS)
+
+
+@cache_consulta
+def buscar_asos_por_funcionario(funcionario_id):
+    return ler_dataframe(
+        "SELECT id, tipo_exame, data_exame, resultado, validade_aso FROM asos WHERE funcionario_id = ?",
+        (funcionario_id,))
+
+
+def deletar_aso(id):
+    conn = get_db_connection()
+    conn.execute("DELETE FROM asos WHERE id = ?", (id,))
+    conn.commit()
+    conn.close()
+
+
+# --- BUSCA DE FUNCIONÁRIOS POR NOME OU MATRÍCULA ---
+# Índice FTS5 sobre funcionarios (nome, matricula) que ignora acentos e maiúsculas ("joao" encontra
+# "João") e aceita prefixos ("mar sil" encontra "Maria da Silva"). Os triggers mantêm o índice em dia.
+# O campo de busca da interface fica em busca_funcionarios.py.
+
+LIMITE_RESULTADOS = 20
+
+DDL_BUSCA_FUNCIONARIOS = [
+    # Tabela de conteúdo externo: o texto fica só em funcionarios, o FTS guarda apenas o índice
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS funcionarios_busca USING fts5(
+        nome, matricula,
+        content = 'funcionarios', content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_funcionarios_busca_insert AFTER INSERT ON funcionarios BEGIN
+        INSERT INTO funcionarios_busca (rowid, nome, matricula) VALUES (new.id, new.nome, new.matricula);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_funcionarios_busca_delete AFTER DELETE ON funcionarios BEGIN
+        INSERT INTO funcionarios_busca (funcionarios_busca, rowid, nome, matricula)
+        VALUES ('delete', old.id, old.nome, old.matricula);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_funcionarios_busca_update AFTER UPDATE OF nome, matricula ON funcionarios BEGIN
+        INSERT INTO funcionarios_busca (funcionarios_busca, rowid, nome, matricula)
+        VALUES ('delete', old.id, old.nome, old.matricula);
+        INSERT INTO funcionarios_busca (rowid, nome, matricula) VALUES (new.id, new.nome, new.matricula);
+    END
+    """,
+]
+
+
+def criar_indice_busca(cursor):
+    """Cria o índice de busca e seus triggers. Na primeira vez, indexa os funcionários já cadastrados."""
+    ja_existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'funcionarios_busca'").fetchone()
+    for ddl in DDL_BUSCA_FUNCIONARIOS:
+        cursor.execute(ddl)
+    if not ja_existe:
+        cursor.execute("INSERT INTO funcionarios_busca (funcionarios_busca) VALUES ('rebuild')")
+
+
+def montar_consulta_fts(texto):
+    """Converte o texto digitado em uma consulta FTS5: cada palavra vira um prefixo e todas precisam casar."""
+    palavras = re.findall(r"\w+", texto)
+    return " ".join(f'"{palavra}"*' for palavra in palavras)
+
+
+def rotulo_funcionario(nome, matricula):
+    return f"{nome} (Mat: {matricula})"
+
+
+@cache_consulta
+def buscar_funcionarios_por_texto(texto, limite=LIMITE_RESULTADOS):
+    """Retorna até `limite` funcionários como lista de (id, rótulo), os mais relevantes primeiro.
+
+    Sem texto, retorna os cadastrados mais recentemente.
+    """
+    consulta = montar_consulta_fts(texto)
+    conn = get_db_connection()
+    if consulta:
+        linhas = conn.execute("""
+                              SELECT f.id, f.nome, f.matricula
+                              FROM funcionarios_busca b
+                                       JOIN funcionarios f ON f.id = b.rowid
+                              WHERE funcionarios_busca MATCH ?
+                              ORDER BY b.rank
+                              LIMIT ?
+                              """, (consulta, limite)).fetchall()
+    else:
+        linhas = conn.execute("SELECT id, nome, matricula FROM funcionarios ORDER BY id DESC LIMIT ?",
+                              (limite,)).fetchall()
+    conn.close()
+    return [(linha['id'], rotulo_funcionario(linha['nome'], linha['matricula'])) for linha in linhas]
+
+
+@cache_consulta
+def existem_funcionarios():
+    conn = get_db_connection()
+    existe = conn.execute("SELECT 1 FROM funcionarios LIMIT 1").fetchone() is not None
+    conn.close()
+    return existe
@@ -0,0 +1,161 @@
+import argparse
+import json
+import sys
+from datetime import date
+
+from banco import get_db_connection, cache_consulta
+from compliance import DIAS_ALERTA, expressao_status
+from datas import HOJE_SQL
+
+
+# --- KPIs DO DASHBOARD ---
+# Contagens de pendências (vencidos e a vencer) e de incidentes, sem interface e sem pandas: o
+# dashboard do Streamlit monta os gráficos a partir daqui e a CLI no fim do arquivo imprime os
+# mesmos números para monitoramento (python dados_dashboard.py --json).
+
+# A situação é calculada na leitura a partir da validade, e não lida da coluna `status`: a coluna só é
+# reclassificada pela passagem dos dias uma vez por dia (alertas.py), e uma leitura nunca escreve no
+# banco (nem espera o lock de escrita durante uma carga em segundo plano).
+SITUACAO = expressao_status('c.validade')
+FILTRO_PENDENTES = f"c.validade <= {HOJE_SQL} + {DIAS_ALERTA}"
+
+
+def montar_consulta_kpis(cargo=None):
+    """Monta a consulta agregada dos KPIs do dashboard e seus parâmetros."""
+    filtro_cargo = "AND f.cargo = :cargo" if cargo else ""
+    filtro_resumo = "AND r.cargo = :cargo" if cargo else ""
+    params = {'cargo': cargo} if cargo else {}
+
+    # Cada bloco devolve linhas no formato (grupo, chave, vencidos, a_vencer); os incidentes usam
+    # apenas a coluna 'vencidos' como contagem. Tudo volta em um único round-trip ao banco.
+    # As pendências vêm da validade mais recente de cada documento (compliance.py) e as contagens de
+    # incidentes do resumo mantido por triggers (resumo_incidentes.py).
+    pendencias = " UNION ALL ".join(f"""
+        SELECT 'pendencias' AS grupo, '{chave}' AS chave,
+               COALESCE(SUM({SITUACAO} = 'vencido'), 0) AS vencidos,
+               COALESCE(SUM({SITUACAO} = 'a_vencer'), 0) AS a_vencer
+        FROM compliance_status c JOIN funcionarios f ON c.funcionario_id = f.id
+        WHERE c.tipo_documento = '{tipo}' AND {FILTRO_PENDENTES} {filtro_cargo}
+    """ for chave, tipo in (('trein', 'treinamento'), ('asos', 'aso'), ('cnh', 'cnh')))
+
+    query_kpis = f"""
+        {pendencias}
+        UNION ALL
+        SELECT 'gravidade', r.gravidade, SUM(r.quantidade), NULL
+        FROM incidentes_resumo r
+        WHERE 1 = 1 {filtro_resumo}
+        GROUP BY r.gravidade
+        UNION ALL
+        SELECT 'tipo', r.tipo_incidente, SUM(r.quantidade), NULL
+        FROM incidentes_resumo r
+        WHERE 1 = 1 {filtro_resumo}
+        GROUP BY r.tipo_incidente
+    """
+    return query_kpis, params
+
+
+@cache_consulta
+def calcular_kpis(cargo=None):
+    """KPIs do dashboard em uma única consulta agregada, com filtro opcional por cargo.
+
+    Retorna um dicionário com as contagens de pendências ('trein_venc', 'asos_prox', ...) e, em
+    'incidentes_gravidade' e 'incidentes_tipo', dicionários {categoria: quantidade} do maior para o menor.
+    """
+    query_kpis, params = montar_consulta_kpis(cargo)
+    conn = get_db_connection()
+    linhas = conn.execute(query_kpis, params).fetchall()
+    conn.close()
+
+    kpis = {}
+    incidentes = {'gravidade': [], 'tipo': []}
+    for grupo, chave, vencidos, a_vencer in linhas:
+        if grupo == 'pendencias':
+            kpis[f"{chave}_venc"] = vencidos
+            kpis[f"{chave}_prox"] = a_vencer
+        else:
+            incidentes[grupo].append((chave, vencidos))
+    for grupo, contagens in incidentes.items():
+        kpis[f"incidentes_{grupo}"] = dict(sorted(contagens, key=lambda item: item[1], reverse=True))
+    return kpis
+
+
+def buscar_dados_dashboard(cargo=None):
+    """KPIs de `calcular_kpis` com as contagens de incidentes como Series (formato dos gráficos do dashboard).
+
+    Retorna apenas contagens: as linhas de detalhe ficam em `buscar_detalhes_pendencias`.
+    """
+    import pandas as pd
+
+    dados = dict(calcular_kpis(cargo))
+    for grupo in ('gravidade', 'tipo'):
+        contagens = dados[f"incidentes_{grupo}"]
+        dados[f"incidentes_{grupo}"] = pd.Series(contagens, dtype=int, name='count').rename_axis(grupo)
+    return dados
+
+
+def montar_consultas_detalhes(cargo=None):
+    """Monta as consultas de detalhe das pendências (vencidos e a vencer) e seus parâmetros."""
+    filtro_cargo = "AND f.cargo = :cargo" if cargo else ""
+    base = (f"FROM compliance_status c JOIN funcionarios f ON c.funcionario_id = f.id "
+            f"WHERE c.tipo_documento = '{{}}' AND {FILTRO_PENDENTES} AND {SITUACAO} = '{{}}' {filtro_cargo}")
+
+    consultas = {
+        "trein_venc": "SELECT f.nome as nome_funcionario, c.documento as nome_treinamento, c.validade " + base.format('treinamento', 'vencido'),
+        "asos_venc": "SELECT f.nome as nome_funcionario, c.validade as validade_aso " + base.format('aso', 'vencido'),
+        "cnh_venc": "SELECT f.nome, f.matricula, f.cnh_tipo, c.validade as cnh_validade " + base.format('cnh', 'vencido'),
+        "trein_prox": "SELECT f.nome as nome_funcionario, c.documento as nome_treinamento, c.validade " + base.format('treinamento', 'a_vencer'),
+        "asos_prox": "SELECT f.nome as nome_funcionario, c.validade as validade_aso " + base.format('aso', 'a_vencer'),
+        "cnh_prox": "SELECT f.nome, f.matricula, f.cnh_tipo, c.validade as cnh_validade " + base.format('cnh', 'a_vencer'),
+    }
+
+    # Parâmetros para as consultas
+    params = {'cargo': cargo} if cargo else {}
+    return consultas, params
+
+
+@cache_consulta
+def buscar_detalhes_pendencias(cargo=None):
+    """Busca as linhas de detalhe dos itens vencidos e a vencer (usado apenas quando o usuário pede os detalhes)."""
+    import pandas as pd
+
+    consultas, params = montar_consultas_detalhes(cargo)
+    conn = get_db_connection()
+    detalhes = {chave: pd.read_sql_query(query, conn, params=params) for chave, query in consultas.items()}
+    conn.close()
+    return detalhes
+
+
+# --- CLI DE MONITORAMENTO ---
+
+ROTULOS = {'trein': "Treinamentos", 'asos': "ASOs", 'cnh': "CNHs"}
+
+
+def imprimir_kpis(kpis, cargo=None):
+    print(f"KPIs de {date.today():%d/%m/%Y} ({cargo or 'todos os cargos'})")
+    for chave, rotulo in ROTULOS.items():
+        print(f"  {rotulo:<13} {kpis[f'{chave}_venc']:>7} vencidos  {kpis[f'{chave}_prox']:>7} a vencer")
+    for grupo in ('gravidade', 'tipo'):
+        contagens = kpis[f"incidentes_{grupo}"]
+        print(f"  Incidentes por {grupo}: " + (", ".join(f"{chave} {total}" for chave, total in contagens.items())
+                                              or "nenhum"))
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Imprime os KPIs do dashboard sem abrir a interface.")
+    parser.add_argument('--cargo', default=None, help="filtra pelos funcionários deste cargo")
+    parser.add_argument('--json', action='store_true', help="saída em JSON (uma linha), para monitoramento")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python dados_dashboard.py [--cargo CARGO] [--json]
+    from migracoes import garantir_schema
+
+    args = ler_argumentos()
+    garantir_schema()
+    kpis = calcular_kpis(args.cargo)
+    if args.json:
+        json.dump({'data': date.today().isoformat(), 'cargo': args.cargo, **kpis}, sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        imprimir_kpis(kpis, args.cargo)
@@ -0,0 +1,141 @@
+import sqlite3
+
+from banco import get_db_connection, cache_consulta, ler_dataframe
+
+
+# --- INCIDENTES: CONSULTAS, BUSCA TEXTUAL E REGISTRO ---
+# Sem dependência de interface (a página fica em incidentes.py). O pandas só é importado pelas
+# funções que retornam DataFrame.
+
+SQL_LISTA_INCIDENTES = """
+    SELECT i.id,
+           COALESCE(f.nome, 'Não se aplica / Terceiro') as nome_funcionario,
+           i.data_ocorrencia,
+           i.gravidade,
+           i.tipo_incidente,
+           i.local_ocorrencia,
+           i.causa_raiz,
+           i.partes_corpo_atingidas,
+           i.dias_perdidos
+    FROM incidentes i
+             LEFT JOIN funcionarios f ON i.funcionario_id = f.id
+"""
+
+GRAVIDADES = ["Leve", "Moderado", "Grave", "Fatal", "Quase Acidente"]
+
+# Índice FTS5 sobre os textos livres do incidente. Ignora acentos e maiúsculas, e é mantido pelos
+# triggers abaixo, então a busca nunca precisa de LIKE '%...%' varrendo a tabela inteira.
+DDL_BUSCA_INCIDENTES = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS incidentes_busca USING fts5(
+        tipo_incidente, local_ocorrencia, causa_raiz, partes_corpo_atingidas,
+        content = 'incidentes', content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_incidentes_busca_insert AFTER INSERT ON incidentes BEGIN
+        INSERT INTO incidentes_busca (rowid, tipo_incidente, local_ocorrencia, causa_raiz, partes_corpo_atingidas)
+        VALUES (new.id, new.tipo_incidente, new.local_ocorrencia, new.causa_raiz, new.partes_corpo_atingidas);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_incidentes_busca_delete AFTER DELETE ON incidentes BEGIN
+        INSERT INTO incidentes_busca (incidentes_busca, rowid, tipo_incidente, local_ocorrencia, causa_raiz,
+                                      partes_corpo_atingidas)
+        VALUES ('delete', old.id, old.tipo_incidente, old.local_ocorrencia, old.causa_raiz, old.partes_corpo_atingidas);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_incidentes_busca_update
+        AFTER UPDATE OF tipo_incidente, local_ocorrencia, causa_raiz, partes_corpo_atingidas ON incidentes BEGIN
+        INSERT INTO incidentes_busca (incidentes_busca, rowid, tipo_incidente, local_ocorrencia, causa_raiz,
+                                      partes_corpo_atingidas)
+        VALUES ('delete', old.id, old.tipo_incidente, old.local_ocorrencia, old.causa_raiz, old.partes_corpo_atingidas);
+        INSERT INTO incidentes_busca (rowid, tipo_incidente, local_ocorrencia, causa_raiz, partes_corpo_atingidas)
+        VALUES (new.id, new.tipo_incidente, new.local_ocorrencia, new.causa_raiz, new.partes_corpo_atingidas);
+    END
+    """,
+]
+
+# Pesos do bm25 na ordem das colunas do índice: um termo no tipo pesa mais que na descrição
+SQL_BUSCAR_INCIDENTES_TEXTO = """
+    SELECT i.id,
+           i.data_ocorrencia,
+           i.gravidade,
+           COALESCE(f.nome, 'Não se aplica / Terceiro')                AS nome_funcionario,
+           i.dias_perdidos,
+           highlight(incidentes_busca, 0, '**', '**')                  AS tipo_incidente,
+           highlight(incidentes_busca, 1, '**', '**')                  AS local_ocorrencia,
+           snippet(incidentes_busca, 2, '**', '**', '…', 24)           AS causa_raiz,
+           highlight(incidentes_busca, 3, '**', '**')                  AS partes_corpo_atingidas
+    FROM incidentes_busca
+             JOIN incidentes i ON i.id = incidentes_busca.rowid
+             LEFT JOIN funcionarios f ON i.funcionario_id = f.id
+    WHERE incidentes_busca MATCH :busca
+      AND i.data_ocorrencia BETWEEN :inicio AND :fim
+      {filtro_gravidade}
+    ORDER BY bm25(incidentes_busca, 3.0, 2.0, 1.0, 2.0)
+    LIMIT :limite
+"""
+
+LIMITE_RESULTADOS_BUSCA = 50
+
+
+def criar_indice_busca_incidentes(cursor):
+    """Cria o índice de busca dos incidentes e seus triggers. Na primeira vez, indexa os incidentes existentes."""
+    ja_existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'incidentes_busca'").fetchone()
+    for ddl in DDL_BUSCA_INCIDENTES:
+        cursor.execute(ddl)
+    if not ja_existe:
+        cursor.execute("INSERT INTO incidentes_busca (incidentes_busca) VALUES ('rebuild')")
+
+
+def termos_literais(texto):
+    """Consulta FTS5 equivalente ao texto, com cada palavra entre aspas (para quando a sintaxe digitada é inválida)."""
+    return " ".join('"{}"'.format(palavra.replace('"', '""')) for palavra in texto.split())
+
+
+@cache_consulta
+def buscar_incidentes_por_texto(busca, inicio, fim, gravidades=(), limite=LIMITE_RESULTADOS_BUSCA):
+    """Busca incidentes pelos textos livres, do mais relevante para o menos relevante.
+
+    `busca` aceita a sintaxe do FTS5 (ex.: `empilhadeira AND mão`, `"mão direita"`, `queda NOT escada`,
+    `empil*`). Se a sintaxe for inválida, as palavras são buscadas literalmente. Os trechos que casaram
+    vêm marcados com ** (negrito em Markdown).
+    """
+    filtro_gravidade = ""
+    params = {'busca': busca, 'inicio': inicio, 'fim': fim, 'limite': limite}
+    if gravidades:
+        marcadores = ", ".join(f":gravidade_{n}" for n in range(len(gravidades)))
+        filtro_gravidade = f"AND i.gravidade IN ({marcadores})"
+        params.update({f"gravidade_{n}": gravidade for n, gravidade in enumerate(gravidades)})
+    query = SQL_BUSCAR_INCIDENTES_TEXTO.format(filtro_gravidade=filtro_gravidade)
+
+    import pandas as pd
+
+    try:
+        return ler_dataframe(query, params)
+    except (sqlite3.OperationalError, pd.errors.DatabaseError):
+        return ler_dataframe(query, {**params, 'busca': termos_literais(busca)})
+
+
+def adicionar_incidente(funcionario_id, data_ocorrencia, gravidade, tipo_incidente, local_ocorrencia, causa_raiz,
+                        partes_corpo_atingidas, dias_perdidos):
+    """Adiciona um novo incidente ao banco de dados."""
+    conn = get_db_connection()
+    conn.execute("""
+                 INSERT INTO incidentes (funcionario_id, data_ocorrencia, gravidade, tipo_incidente, local_ocorrencia,
+                                         causa_raiz, partes_corpo_atingidas, dias_perdidos)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                 """, (funcionario_id, data_ocorrencia, gravidade, tipo_incidente, local_ocorrencia, causa_raiz,
+                       partes_corpo_atingidas, dias_perdidos))
+    conn.commit()
+    conn.close()
+
+
+@cache_consulta
+def buscar_incidentes():
+    """Busca todos os incidentes registrados."""
+    return ler_dataframe(SQL_LISTA_INCIDENTES + " ORDER BY i.data_ocorrencia DESC")
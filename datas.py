@@ -0,0 +1,105 @@
+import os
+from datetime import date
+
+
+# --- DATAS GRAVADAS COMO NÚMERO DE DIAS ---
+# As colunas DATE guardam o número de dias desde 1970-01-01 (INTEGER) em vez do texto ISO: cada
+# data ocupa 1 a 3 bytes em vez de 10, os índices de validade encolhem junto e os filtros de
+# vencimento viram comparações entre inteiros. O banco.py registra o adaptador (date -> dias) e o
+# conversor (colunas DATE -> date), então o código Python continua lendo e gravando objetos `date`.
+#
+# No SQL, use as expressões abaixo em vez de date()/strftime() direto nas colunas.
+
+ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+JULIANO_EPOCA = 2440587.5  # dia juliano de 1970-01-01 à meia-noite
+
+# Hoje (no fuso da máquina) como número de dias
+HOJE_SQL = f"CAST(julianday('now', 'localtime', 'start of day') - {JULIANO_EPOCA} AS INTEGER)"
+
+# Colunas de data das tabelas principais. As tabelas derivadas (compliance_status, incidentes_resumo)
+# não entram: são recriadas a partir destas.
+COLUNAS_DATA = {
+    'funcionarios': ('cnh_validade',),
+    'treinamentos': ('data_realizacao', 'validade'),
+    'asos': ('data_exame', 'validade_aso'),
+    'incidentes': ('data_ocorrencia',),
+}
+
+
+def para_dias(valor):
+    """date -> número de dias desde 1970-01-01 (adaptador do sqlite3)."""
+    return valor.toordinal() - ORDINAL_EPOCA
+
+
+def de_dias(valor):
+    """Conversor do sqlite3 para colunas DATE: dias -> date. Textos ISO antigos também são aceitos."""
+    try:
+        return date.fromordinal(int(valor) + ORDINAL_EPOCA)
+    except ValueError:
+        texto = valor.decode()
+        try:
+            return date.fromisoformat(texto[:10])
+        except ValueError:
+            return texto
+
+
+def sql_dias(expressao):
+    """Expressão SQL que converte uma data em texto (ex.: parâmetro 'AAAA-MM-DD') para número de dias."""
+    return f"CAST(julianday({expressao}) - {JULIANO_EPOCA} AS INTEGER)"
+
+
+def sql_texto(coluna):
+    """Expressão SQL que mostra uma coluna em dias como texto ISO (AAAA-MM-DD)."""
+    return f"date({coluna} + {JULIANO_EPOCA})"
+
+
+def sql_mes(coluna):
+    """Expressão SQL com o mês (AAAA-MM) de uma coluna em dias."""
+    return f"strftime('%Y-%m', {coluna} + {JULIANO_EPOCA})"
+
+
+def serie_para_dias(datas):
+    """Converte uma Series datetime64 do pandas para dias (objetos int, com None onde não há data)."""
+    import pandas as pd
+
+    dias = (datas.dt.normalize() - pd.Timestamp('1970-01-01')).dt.days
+    return dias.astype('Int64').astype(object).where(datas.notna(), None)
+
+
+def converter_datas_para_dias(cursor):
+    """Converte as datas em texto ISO de um banco antigo para número de dias (passo 1 de migracoes.py).
+
+    Os triggers e as tabelas derivadas das datas (resumo de incidentes e compliance_status) são
+    removidos antes, para não reagirem a cada linha convertida; o passo seguinte os recria e recalcula.
+    Textos que não são datas válidas ficam como estão. Não faz commit.
+    """
+    derivados = cursor.execute("""
+        SELECT type, name FROM sqlite_master
+        WHERE (type = 'trigger' AND (name LIKE 'trg!_compliance!_%' ESCAPE '!' OR name LIKE '%!_resumo!_%' ESCAPE '!'))
+           OR (type = 'table' AND name IN ('compliance_status', 'incidentes_resumo'))
+        ORDER BY type DESC
+    """).fetchall()
+    for tipo, nome in derivados:
+        cursor.execute(f"DROP {tipo.upper()} IF EXISTS {nome}")
+
+    existentes = {linha[0] for linha in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for tabela, colunas in COLUNAS_DATA.items():
+        if tabela not in existentes:
+            continue
+        texto = {coluna: f"typeof({coluna}) = 'text' AND julianday({coluna}) IS NOT NULL" for coluna in colunas}
+        atribuicoes = ", ".join(f"{coluna} = CASE WHEN {cond} THEN {sql_dias(coluna)} ELSE {coluna} END"
+                                for coluna, cond in texto.items())
+        cursor.execute(f"UPDATE {tabela} SET {atribuicoes} WHERE {' OR '.join(f'({c})' for c in texto.values())}")
+
+
+if __name__ == "__main__":
+    # python datas.py  -> migra um banco antigo (se preciso) e compacta o arquivo com VACUUM
+    from banco import DB_FILE, get_db_connection
+    from migracoes import aplicar_migracoes
+
+    tamanho_antes = os.path.getsize(DB_FILE) if os.path.exists(DB_FILE) else 0
+    aplicar_migracoes()
+    conn = get_db_connection()
+    conn.execute("VACUUM")
+    conn.close()
+    print(f"Datas em número de dias. Arquivo: {tamanho_antes / 1e6:.1f} MB -> {os.path.getsize(DB_FILE) / 1e6:.1f} MB")
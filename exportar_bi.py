@@ -1,48 +1,467 @@
-import sqlite3
-import pandas as pd
+import argparse
+import json
 import os
+import shutil
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from banco import get_db_connection
 
-def exportar_tabelas_para_csv():
-    """Lê todas as tabelas do banco e as salva como ficheiros CSV."""
 
-    # Nome do banco de dados
-    db_file = 'controle_empresa.db'
+# Pasta onde os arquivos exportados serão salvos
+OUTPUT_FOLDER = 'dados_bi'
+PASTA_DELTAS = os.path.join(OUTPUT_FOLDER, 'deltas')
 
-    # Pasta onde os CSVs serão salvos
-    output_folder = 'dados_bi'
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+# Tabela de apoio que registra UPDATEs e DELETEs; os INSERTs são detectados pelo id (AUTOINCREMENT)
+TABELA_ALTERACOES = 'exportacao_alteracoes'
 
-    print(f"Conectando ao banco de dados: {db_file}")
-    conn = sqlite3.connect(db_file)
+# Tabelas derivadas, mantidas por triggers a partir das demais: o BI recalcula a partir das originais,
+# e exportá-las faria cada reclassificação diária (compliance.atualizar_status_compliance) virar alteração
+TABELAS_DERIVADAS = ('compliance_status', 'incidentes_resumo')
 
-    # Lista de todas as tabelas no banco de dados
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tabelas = [table[0] for table in cursor.fetchall()]
+# As tabelas são lidas do banco em blocos deste tamanho, para a memória não crescer com a tabela
+TAMANHO_BLOCO = int(os.environ.get('PAINEL_EXPORT_BLOCO', 50_000))
 
-    print(f"Tabelas encontradas: {tabelas}")
 
-    # Loop para exportar cada tabela
-    for tabela in tabelas:
+# --- FORMATOS DE SAÍDA ---
+# Cada formato sabe onde fica o arquivo de uma tabela, como gravá-lo (do zero ou acrescentando
+# linhas) e quais colunas ele já tem. Para um formato novo basta uma classe com a mesma interface
+# registrada em FORMATOS.
+
+class FormatoCSV:
+    """CSV UTF-8 com BOM (abre direto no Excel e no Power BI)."""
+
+    nome = 'csv'
+
+    def caminho_tabela(self, tabela):
+        return os.path.join(OUTPUT_FOLDER, f"{tabela}.csv")
+
+    def colunas_exportadas(self, tabela):
+        """Retorna a lista de colunas do CSV já exportado, ou None se o arquivo não existir."""
+        caminho = self.caminho_tabela(tabela)
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, encoding='utf-8-sig') as f:
+            return f.readline().rstrip('\r\n').split(',')
+
+    def escrever(self, caminho, blocos, tipos, anexar=False):
+        """Grava os blocos (DataFrames) no arquivo e retorna (linhas gravadas, bytes gravados)."""
+        tamanho_anterior = os.path.getsize(caminho) if anexar and os.path.exists(caminho) else 0
+        linhas = 0
+        for bloco in blocos:
+            if anexar:
+                # Append sem BOM: o BOM só pode aparecer no início do arquivo
+                bloco.to_csv(caminho, mode='a', header=False, index=False, encoding='utf-8')
+            else:
+                bloco.to_csv(caminho, index=False, encoding='utf-8-sig')
+                anexar = True
+            linhas += len(bloco)
+        if not anexar:
+            # Consulta sem linhas: grava só o cabeçalho, para não deixar o arquivo anterior no lugar
+            pd.DataFrame(columns=list(tipos)).to_csv(caminho, index=False, encoding='utf-8-sig')
+        return linhas, (os.path.getsize(caminho) if os.path.exists(caminho) else 0) - tamanho_anterior
+
+    def escrever_tabela(self, tabela, blocos, tipos, anexar=False):
+        return self.escrever(self.caminho_tabela(tabela), blocos, tipos, anexar)
+
+    def escrever_delta(self, nome_base, delta, tipos):
+        nome_arquivo = f"{nome_base}.csv"
+        self.escrever(os.path.join(PASTA_DELTAS, nome_arquivo), [delta], tipos)
+        return nome_arquivo
+
+
+class FormatoParquet:
+    """Parquet colunar: datas e inteiros tipados, dicionário nas colunas repetitivas e compressão.
+
+    Cada tabela vira uma pasta `dados_bi/parquet/<tabela>/` com um arquivo por exportação
+    (`parte-00000.parquet`, `parte-00001.parquet`, ...): a exportação completa recria a pasta e a
+    incremental só acrescenta uma parte nova. O Power BI lê a pasta inteira com o conector "Pasta".
+    """
+
+    nome = 'parquet'
+    compressao = os.environ.get('PAINEL_PARQUET_COMPRESSAO', 'zstd')
+    linhas_por_grupo = int(os.environ.get('PAINEL_PARQUET_LINHAS_POR_GRUPO', 128 * 1024))
+
+    # Colunas com poucos valores distintos: a codificação por dicionário reduz muito o tamanho
+    colunas_dicionario = ['gravidade', 'cargo', 'tipo_exame', 'cnh_tipo', 'resultado', 'nome_treinamento',
+                          'tipo_incidente', 'local_ocorrencia', 'partes_corpo_atingidas', 'causa_raiz', '_operacao']
+
+    def __init__(self):
         try:
-            print(f"Exportando a tabela '{tabela}'...")
-            df = pd.read_sql_query(f"SELECT * FROM {tabela}", conn)
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("A exportação em Parquet precisa do pacote 'pyarrow' (`pip install pyarrow`).")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+
+    def caminho_tabela(self, tabela):
+        return os.path.join(OUTPUT_FOLDER, 'parquet', tabela)
+
+    def colunas_exportadas(self, tabela):
+        pasta = self.caminho_tabela(tabela)
+        partes = sorted(os.listdir(pasta)) if os.path.isdir(pasta) else []
+        if not partes:
+            return None
+        return self.pq.read_schema(os.path.join(pasta, partes[0])).names
+
+    def schema(self, tipos):
+        """Monta o schema Arrow a partir dos tipos declarados no SQLite (PRAGMA table_info)."""
+        campos = []
+        for coluna, tipo in tipos.items():
+            tipo = tipo.upper()
+            if 'INT' in tipo:
+                campos.append((coluna, self.pa.int64()))
+            elif tipo in ('DATE', 'DATETIME'):
+                campos.append((coluna, self.pa.date32()))
+            elif tipo in ('REAL', 'FLOAT', 'DOUBLE', 'NUMERIC'):
+                campos.append((coluna, self.pa.float64()))
+            else:
+                campos.append((coluna, self.pa.string()))
+        return self.pa.schema(campos)
+
+    def converter_bloco(self, bloco, tipos, schema):
+        bloco = bloco.copy()
+        for coluna, tipo in tipos.items():
+            if coluna not in bloco.columns:
+                bloco[coluna] = None
+            elif 'INT' in tipo.upper():
+                bloco[coluna] = pd.to_numeric(bloco[coluna], errors='coerce').astype('Int64')
+            elif tipo.upper() in ('DATE', 'DATETIME'):
+                datas = pd.to_datetime(bloco[coluna], errors='coerce')
+                bloco[coluna] = datas.dt.date.astype(object).where(datas.notna(), None)
+        return self.pa.Table.from_pandas(bloco[list(tipos)], schema=schema, preserve_index=False)
+
+    def escrever(self, caminho, blocos, tipos, anexar=False):
+        schema = self.schema(tipos)
+        dicionario = [coluna for coluna in self.colunas_dicionario if coluna in tipos]
+        writer = None
+        linhas = 0
+        try:
+            for bloco in blocos:
+                if writer is None:
+                    writer = self.pq.ParquetWriter(caminho, schema, compression=self.compressao,
+                                                   use_dictionary=dicionario)
+                writer.write_table(self.converter_bloco(bloco, tipos, schema), row_group_size=self.linhas_por_grupo)
+                linhas += len(bloco)
+        finally:
+            if writer is not None:
+                writer.close()
+        return linhas, os.path.getsize(caminho) if os.path.exists(caminho) else 0
+
+    def escrever_tabela(self, tabela, blocos, tipos, anexar=False):
+        pasta = self.caminho_tabela(tabela)
+        if not anexar and os.path.isdir(pasta):
+            shutil.rmtree(pasta)
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"parte-{len(os.listdir(pasta)):05d}.parquet")
+        linhas, tamanho = self.escrever(caminho, blocos, tipos)
+        # Sem linhas, a exportação completa ainda grava uma parte vazia (com o schema); a incremental não grava nada
+        if linhas == 0 and not anexar:
+            self.pq.write_table(self.schema(tipos).empty_table(), caminho)
+            tamanho = os.path.getsize(caminho)
+        return linhas, tamanho
+
+    def escrever_delta(self, nome_base, delta, tipos):
+        nome_arquivo = f"{nome_base}.parquet"
+        self.escrever(os.path.join(PASTA_DELTAS, nome_arquivo), [delta], tipos)
+        return nome_arquivo
+
+
+FORMATOS = {'csv': FormatoCSV, 'parquet': FormatoParquet}
+
+
+# --- FUNÇÕES DE APOIO ---
+
+def arquivo_estado(formato):
+    """Estado da exportação incremental (marca d'água por tabela) de cada formato."""
+    return os.path.join(OUTPUT_FOLDER, f"_estado_exportacao_{formato}.json")
+
+
+def arquivo_manifesto(formato):
+    return os.path.join(PASTA_DELTAS, f"manifesto_{formato}.json")
+
+
+def listar_tabelas(conn):
+    """Lista as tabelas de dados, sem as tabelas internas do SQLite e as de controle (exportação, alertas e tarefas).
+
+    Ficam de fora as TABELAS_DERIVADAS e os índices de busca (FTS5 e suas tabelas internas), e só entram
+    tabelas com chave `id` (usada como marca d'água).
+    """
+    cursor = conn.execute("""
+        SELECT m.name
+        FROM sqlite_master m
+        WHERE m.type = 'table'
+          AND m.name NOT LIKE 'sqlite_%'
+          AND m.name NOT LIKE 'exportacao_%'
+          AND m.name NOT LIKE 'alertas_%'
+          AND m.name NOT LIKE 'tarefas%'
+          AND m.sql NOT LIKE 'CREATE VIRTUAL TABLE%'
+          AND NOT EXISTS (SELECT 1
+                          FROM sqlite_master v
+                          WHERE v.type = 'table'
+                            AND v.sql LIKE 'CREATE VIRTUAL TABLE%'
+                            AND m.name LIKE v.name || '!_%' ESCAPE '!')
+    """)
+    tabelas = [table[0] for table in cursor.fetchall() if table[0] not in TABELAS_DERIVADAS]
+    return [tabela for tabela in tabelas
+            if any(coluna[1] == 'id' and coluna[5] for coluna in conn.execute(f"PRAGMA table_info({tabela})"))]
+
+
+def criar_triggers_exportacao(cursor, tabela):
+    """Triggers que registram em TABELA_ALTERACOES os UPDATEs e DELETEs de `tabela`."""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabela}_exportacao_update AFTER UPDATE ON {tabela}
+        BEGIN
+            INSERT INTO {TABELA_ALTERACOES} (tabela, registro_id, operacao) VALUES ('{tabela}', NEW.id, 'U');
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabela}_exportacao_delete AFTER DELETE ON {tabela}
+        BEGIN
+            INSERT INTO {TABELA_ALTERACOES} (tabela, registro_id, operacao) VALUES ('{tabela}', OLD.id, 'D');
+        END
+    """)
+
+
+def criar_log_alteracoes(cursor):
+    """Tabela de alterações e triggers das tabelas exportadas (passo 6 de migracoes.py).
 
-            # Caminho do arquivo de saída
-            output_path = os.path.join(output_folder, f"{tabela}.csv")
+    Uma migração que criar uma tabela de dados nova deve chamar criar_triggers_exportacao para ela.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_ALTERACOES}
+        (
+            seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabela      TEXT    NOT NULL,
+            registro_id INTEGER NOT NULL,
+            operacao    TEXT    NOT NULL
+        )
+    """)
+    # Bancos exportados antes de as tabelas derivadas saírem da lista ainda têm os triggers delas
+    for tabela in TABELAS_DERIVADAS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_{tabela}_exportacao_update")
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_{tabela}_exportacao_delete")
+    cursor.execute(f"DELETE FROM {TABELA_ALTERACOES} WHERE tabela IN ({', '.join('?' * len(TABELAS_DERIVADAS))})",
+                   TABELAS_DERIVADAS)
+    for tabela in listar_tabelas(cursor):
+        criar_triggers_exportacao(cursor, tabela)
 
-            # Salva o DataFrame como CSV com codificação UTF-8
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            print(f" -> Tabela '{tabela}' exportada com sucesso para '{output_path}'")
-        except Exception as e:
-            print(f"Erro ao exportar a tabela '{tabela}': {e}")
 
+def tabelas_sem_log(conn, tabelas):
+    """Tabelas da lista sem os triggers de alteração (criadas fora das migrações)."""
+    com_log = {linha[0] for linha in conn.execute(
+        "SELECT tbl_name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg!_%!_exportacao!_update' ESCAPE '!'")}
+    return [tabela for tabela in tabelas if tabela not in com_log]
+
+
+def carregar_json(caminho, padrao):
+    if not os.path.exists(caminho):
+        return padrao
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def salvar_json(caminho, dados):
+    # Grava em um arquivo temporário e troca, para não deixar um JSON pela metade se o processo cair
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def tipos_colunas(conn, tabela):
+    """Retorna {coluna: tipo declarado} na ordem da tabela."""
+    return {coluna[1]: coluna[2] for coluna in conn.execute(f"PRAGMA table_info({tabela})")}
+
+
+def ler_em_blocos(conn, query, params=()):
+    """Lê o resultado da consulta em DataFrames de até TAMANHO_BLOCO linhas."""
+    return pd.read_sql_query(query, conn, params=params, chunksize=TAMANHO_BLOCO)
+
+
+def exportar_alteracoes(conn, formato, tabela, tipos, alteracoes, marca_id, seq_inicial, seq_final):
+    """Grava um arquivo de delta com as linhas alteradas (U) e removidas (D) desde a última exportação.
+
+    Linhas inseridas depois da última exportação (id > marca_id) já vão no append do arquivo principal.
+    """
+    # A última operação de cada registro é a que vale (ex.: alterado e depois removido = removido)
+    ultima_operacao = {}
+    for registro_id, operacao in alteracoes:
+        if registro_id <= marca_id:
+            ultima_operacao[registro_id] = operacao
+    if not ultima_operacao:
+        return None
+
+    alterados = [registro_id for registro_id, operacao in ultima_operacao.items() if operacao == 'U']
+    removidos = [registro_id for registro_id, operacao in ultima_operacao.items() if operacao == 'D']
+
+    partes = []
+    # Em blocos para não estourar o limite de parâmetros do SQLite
+    for inicio in range(0, len(alterados), 500):
+        ids = alterados[inicio:inicio + 500]
+        partes.append(pd.read_sql_query(
+            f"SELECT * FROM {tabela} WHERE id IN ({','.join('?' * len(ids))})", conn, params=ids))
+    df_alterados = pd.concat(partes) if partes else pd.DataFrame(columns=list(tipos))
+    df_alterados['_operacao'] = 'U'
+    df_removidos = pd.DataFrame({'id': removidos, '_operacao': 'D'})
+    delta = pd.concat([df_alterados, df_removidos], ignore_index=True)
+
+    nome_arquivo = formato.escrever_delta(f"{tabela}_{seq_inicial}-{seq_final}", delta,
+                                          {**tipos, '_operacao': 'TEXT'})
+    return {
+        'arquivo': nome_arquivo,
+        'tabela': tabela,
+        'seq_inicial': seq_inicial,
+        'seq_final': seq_final,
+        'linhas_alteradas': len(df_alterados),
+        'linhas_removidas': len(df_removidos),
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+# --- EXPORTAÇÃO ---
+
+def exportar_tabela(formato, tabela, marca, seq_atual):
+    """Exporta uma tabela com uma conexão de leitura própria (executada em paralelo pelas threads do pool).
+
+    Retorna um dicionário com as métricas da tabela (linhas, bytes, segundos), a nova marca d'água
+    e, no modo incremental, a entrada do manifesto do delta gerado.
+    """
+    inicio = time.perf_counter()
+    resultado = {'tabela': tabela, 'modo': 'completa' if marca is None else 'incremental', 'linhas': 0,
+                 'bytes': 0, 'delta': None, 'marca': marca, 'erro': None}
+    conn = get_db_connection()
+    try:
+        # Transação de leitura: o arquivo e a marca d'água vêm do mesmo instante da tabela
+        conn.execute("BEGIN")
+        tipos = tipos_colunas(conn, tabela)
+
+        # Exportação completa: primeira vez, modo completo, arquivo apagado ou colunas alteradas
+        if marca is None or formato.colunas_exportadas(tabela) != list(tipos):
+            resultado['modo'] = 'completa'
+            resultado['linhas'], resultado['bytes'] = formato.escrever_tabela(
+                tabela, ler_em_blocos(conn, f"SELECT * FROM {tabela}"), tipos)
+        else:
+            novos = ler_em_blocos(conn, f"SELECT * FROM {tabela} WHERE id > ? ORDER BY id", (marca['id'],))
+            resultado['linhas'], resultado['bytes'] = formato.escrever_tabela(tabela, novos, tipos, anexar=True)
+
+            alteracoes = conn.execute(
+                f"SELECT registro_id, operacao FROM {TABELA_ALTERACOES} WHERE tabela = ? AND seq > ? AND seq <= ? "
+                f"ORDER BY seq", (tabela, marca['seq'], seq_atual)).fetchall()
+            resultado['delta'] = exportar_alteracoes(conn, formato, tabela, tipos, alteracoes, marca['id'],
+                                                     marca['seq'] + 1, seq_atual)
+
+        max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabela}").fetchone()[0]
+        resultado['marca'] = {'id': max_id, 'seq': seq_atual}
+    except Exception as e:
+        # O arquivo pode ter ficado pela metade: sem marca, a próxima execução refaz a tabela completa
+        resultado['erro'] = str(e)
+        resultado['marca'] = None
+    finally:
+        conn.rollback()
+        conn.close()
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def exportar_tabelas(formato='csv', incremental=False, max_workers=None, ao_progredir=None):
+    """Lê todas as tabelas do banco e as salva no formato escolhido ('csv' ou 'parquet').
+
+    As tabelas são exportadas em paralelo (uma thread e uma conexão de leitura por tabela), cada
+    uma lida em blocos de TAMANHO_BLOCO linhas. No modo incremental, só as linhas novas (id acima da
+    marca d'água da última exportação) são acrescentadas aos arquivos; linhas alteradas ou removidas
+    vão para arquivos de delta em `dados_bi/deltas`, listados no manifesto do formato. Sem estado
+    salvo, a primeira execução é completa. `ao_progredir(tabelas_concluidas, total_tabelas)` é chamado
+    a cada tabela terminada. Retorna a lista de métricas por tabela.
+    """
+    formato = FORMATOS[formato]()
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    os.makedirs(PASTA_DELTAS, exist_ok=True)
+
+    conn = get_db_connection()
+    print(f"Conectando ao banco de dados... (formato: {formato.nome})")
+
+    tabelas = listar_tabelas(conn)
+    print(f"Tabelas encontradas: {tabelas}")
+
+    estado = carregar_json(arquivo_estado(formato.nome), {}) if incremental else {}
+    # Sem o log de alterações, o incremental perderia UPDATEs e DELETEs: essas tabelas saem sempre completas
+    for tabela in tabelas_sem_log(conn, tabelas):
+        print(f"A tabela '{tabela}' não tem o log de alterações (criado pelas migrações): exportação completa.")
+        estado.pop(tabela, None)
+    manifesto = carregar_json(arquivo_manifesto(formato.nome), [])
+
+    # As alterações até seq_atual entram nesta exportação; as posteriores ficam para a próxima. Uma
+    # linha alterada depois desse ponto pode sair já atualizada agora e de novo no próximo delta, o
+    # que é inofensivo (o delta só reaplica o mesmo valor).
+    seq_atual = conn.execute(f"SELECT COALESCE(MAX(seq), 0) FROM {TABELA_ALTERACOES}").fetchone()[0]
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(tabelas), 4) or 1) as executor:
+        futuros = [executor.submit(exportar_tabela, formato, tabela, estado.get(tabela), seq_atual)
+                   for tabela in tabelas]
+        resultados = []
+        for futuro in futuros:
+            resultados.append(futuro.result())
+            if ao_progredir:
+                ao_progredir(len(resultados), len(futuros))
+
+    novo_estado = {}
+    for resultado in resultados:
+        tabela = resultado['tabela']
+        if resultado['marca'] is not None:
+            novo_estado[tabela] = resultado['marca']
+        if resultado['erro']:
+            print(f"Erro ao exportar a tabela '{tabela}': {resultado['erro']}")
+            continue
+        if resultado['modo'] == 'completa':
+            # O arquivo completo já contém todas as alterações: os deltas antigos da tabela ficam obsoletos
+            for entrada in [e for e in manifesto if e['tabela'] == tabela]:
+                caminho_delta = os.path.join(PASTA_DELTAS, entrada['arquivo'])
+                if os.path.exists(caminho_delta):
+                    os.remove(caminho_delta)
+            manifesto = [e for e in manifesto if e['tabela'] != tabela]
+        elif resultado['delta']:
+            manifesto.append(resultado['delta'])
+
+    salvar_json(arquivo_manifesto(formato.nome), manifesto)
+    salvar_json(arquivo_estado(formato.nome), novo_estado)
+
+    # Alterações já exportadas por todas as tabelas, em todos os formatos, não são mais necessárias
+    marcas = [marca['seq'] for nome in FORMATOS for marca in carregar_json(arquivo_estado(nome), {}).values()]
+    conn.execute(f"DELETE FROM {TABELA_ALTERACOES} WHERE seq <= ?", (min(marcas, default=seq_atual),))
+    conn.commit()
     conn.close()
-    print(f"\nExportação concluída. {datetime.now()}")
+
+    print(f"\n{'Tabela':<16} {'Modo':<12} {'Linhas':>10} {'Bytes':>14} {'Tempo (s)':>10}  Delta")
+    for resultado in resultados:
+        delta = resultado['delta']
+        descricao_delta = (f"{delta['arquivo']} ({delta['linhas_alteradas']} U / {delta['linhas_removidas']} D)"
+                           if delta else ("ERRO" if resultado['erro'] else "-"))
+        print(f"{resultado['tabela']:<16} {resultado['modo']:<12} {resultado['linhas']:>10,} "
+              f"{resultado['bytes']:>14,} {resultado['segundos']:>10.2f}  {descricao_delta}")
+    print(f"\nExportação concluída em {time.perf_counter() - inicio:.2f} s. {datetime.now()}")
+    return resultados
+
+
+def exportar_tabelas_para_csv(incremental=False):
+    """Lê todas as tabelas do banco e as salva como ficheiros CSV."""
+    return exportar_tabelas('csv', incremental)
 
 
 if __name__ == "__main__":
-    exportar_tabelas_para_csv()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Exporta as tabelas do banco para consumo no Power BI.")
+    parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv', help="formato de saída (padrão: csv)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="exporta só o que mudou desde a última execução")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="quantidade de tabelas exportadas em paralelo (padrão: até 4)")
+    args = parser.parse_args()
+
+    from migracoes import garantir_schema
+
+    garantir_schema()
+    exportar_tabelas(args.formato, args.incremental, args.workers)
@@ -1,161 +1,32 @@
-import sqlite3
-from faker import Faker
+import argparse
 import random
+import time
+from faker import Faker
 from datetime import date, timedelta
+from banco import get_db_connection, configurar_banco
+from datas import para_dias
+from migracoes import aplicar_migracoes
 
 # Inicializa o Faker para gerar dados em português do Brasil
 fake = Faker('pt_BR')
 
 
-def get_db_connection():
-    """Cria e retorna uma conexão com o banco de dados SQLite."""
-    # Conecta ao mesmo banco de dados da sua aplicação principal
-    conn = sqlite3.connect('controle_empresa.db')
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
-
-
-def init_db():
-    """Inicializa o banco de dados e cria as tabelas se não existirem."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+# Listas de amostra para dados mais realistas
+CARGOS = ["Motorista de Caminhão", "Assistente de Logística", "Motorista Carreteiro", "Gerente de Logística",
+          "Analista de Logística"]
+TIPOS_CNH = ["N/A", "A", "B", "C", "D", "E", "AB", "AC", "AD", "AE"]
+NOMES_TREINAMENTO = ["NR-35 Trabalho em Altura", "NR-33 Espaços Confinados", "Direção Defensiva",
+                     "Primeiros Socorros", "Operador de Empilhadeira"]
+TIPOS_EXAME_ASO = ["Admissional", "Periódico", "Demissional", "Mudança de Risco", "Retorno ao Trabalho"]
+RESULTADOS_ASO = ["Apto", "Inapto"]
 
-    # Tabela de Funcionários
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS funcionarios
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       nome
-                       TEXT
-                       NOT
-                       NULL,
-                       matricula
-                       TEXT
-                       UNIQUE,
-                       cargo
-                       TEXT,
-                       cnh_tipo
-                       TEXT,
-                       cnh_validade
-                       DATE
-                   )
-                   ''')
-
-    # Tabela de Treinamentos
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS treinamentos
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       funcionario_id
-                       INTEGER
-                       NOT
-                       NULL,
-                       nome_treinamento
-                       TEXT
-                       NOT
-                       NULL,
-                       data_realizacao
-                       DATE,
-                       validade
-                       DATE,
-                       FOREIGN
-                       KEY
-                   (
-                       funcionario_id
-                   ) REFERENCES funcionarios
-                   (
-                       id
-                   ) ON DELETE CASCADE
-                       )
-                   ''')
-
-    # Tabela de ASOs
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS asos
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       funcionario_id
-                       INTEGER
-                       NOT
-                       NULL,
-                       tipo_exame
-                       TEXT
-                       NOT
-                       NULL,
-                       data_exame
-                       DATE,
-                       resultado
-                       TEXT,
-                       validade_aso
-                       DATE,
-                       FOREIGN
-                       KEY
-                   (
-                       funcionario_id
-                   ) REFERENCES funcionarios
-                   (
-                       id
-                   ) ON DELETE CASCADE
-                       )
-                   ''')
-    # Tabela de Incidentes
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS incidentes
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       funcionario_id
-                       INTEGER,
-                       data_ocorrencia
-                       DATE
-                       NOT
-                       NULL,
-                       gravidade
-                       TEXT
-                       NOT
-                       NULL,
-                       tipo_incidente
-                       TEXT
-                       NOT
-                       NULL,
-                       local_ocorrencia
-                       TEXT,
-                       causa_raiz
-                       TEXT,
-                       partes_corpo_atingidas
-                       TEXT,
-                       dias_perdidos
-                       INTEGER
-                       DEFAULT
-                       0,
-                       FOREIGN
-                       KEY
-                   (
-                       funcionario_id
-                   ) REFERENCES funcionarios
-                   (
-                       id
-                   ) ON DELETE SET NULL
-                       )
-                   ''')
-
-    conn.commit()
-    conn.close()
+# Listas de amostra para incidentes
+TIPOS_INCIDENTE = ["Queda de mesmo nível", "Corte", "Pancada contra", "Esforço excessivo",
+                   "Exposição a produto químico"]
+LOCAIS_OCORRENCIA = ["Pátio", "Oficina", "Almoxarifado", "Escritório", "Doca de Carga"]
+CAUSAS_RAIZ = ["Falta de atenção", "Condição insegura no piso", "Falha de equipamento", "Uso incorreto de EPI",
+               "Falta de treinamento"]
+PARTES_CORPO = ["Mão(s)", "Pé(s)", "Perna(s)", "Braço(s)", "Cabeça", "Olhos", "Costas"]
 
 
 def gerar_data_aleatoria():
@@ -164,122 +35,170 @@ def gerar_data_aleatoria():
     return date.today() + timedelta(days=dias_aleatorios)
 
 
-def criar_dados_em_massa(numero_de_funcionarios):
-    """Cria uma grande quantidade de dados falsos para todas as tabelas."""
+def gerar_pool_nomes(tamanho_pool=400):
+    """Gera nomes e sobrenomes com o Faker uma única vez; os nomes completos são combinações deles.
+
+    Chamar o Faker por funcionário é o gargalo da geração: com um pool, 1 milhão de nomes custa
+    apenas sorteios em listas.
+    """
+    # dict.fromkeys remove os repetidos na ordem do Faker (a ordem de um set muda com o PYTHONHASHSEED)
+    primeiros = list(dict.fromkeys(fake.first_name() for _ in range(tamanho_pool)))
+    sobrenomes = list(dict.fromkeys(fake.last_name() for _ in range(tamanho_pool)))
+    return primeiros, sobrenomes
+
+
+def gerar_matriculas(rng, quantidade, existentes):
+    """Sorteia `quantidade` matrículas numéricas únicas, diferentes das já cadastradas."""
+    digitos = max(6, len(str(quantidade * 10)))
+    inicio, fim = 10 ** (digitos - 1), 10 ** digitos
+    matriculas = []
+    while len(matriculas) < quantidade:
+        faltam = quantidade - len(matriculas)
+        candidatas = rng.sample(range(inicio, fim), min(fim - inicio, faltam + len(existentes)))
+        novas = [str(m) for m in candidatas if str(m) not in existentes][:faltam]
+        existentes.update(novas)
+        matriculas.extend(novas)
+    return matriculas
+
+
+def criar_dados_em_massa(numero_de_funcionarios, seed=None, dias=730, taxa_incidentes=0.25, tamanho_lote=20_000):
+    """Cria uma grande quantidade de dados falsos para todas as tabelas.
+
+    Os dados são gerados em lotes de `tamanho_lote` funcionários e gravados com `executemany`,
+    um commit por lote. Os ids dos funcionários são atribuídos aqui (a partir do maior id existente),
+    então treinamentos, ASOs e incidentes do lote já nascem com o `funcionario_id` certo, sem
+    precisar de `lastrowid`. As datas ficam entre -`dias` e +`dias` a partir de hoje. Com o mesmo
+    `seed`, o banco gerado é o mesmo.
+    """
+    rng = random.Random(seed)
+    if seed is not None:
+        Faker.seed(seed)
+
     conn = get_db_connection()
     cursor = conn.cursor()
+    # Banco de teste: durabilidade não importa durante a carga
+    cursor.execute("PRAGMA synchronous = OFF;")
 
     print(f"Iniciando a criação de {numero_de_funcionarios} funcionários e seus registros...")
 
-    # Listas de amostra para dados mais realistas
-    cargos = ["Motorista de Caminhão", "Assistente de Logística", "Motorista Carreteiro", "Gerente de Logística",
-              "Analista de Logística"]
-    tipos_cnh = ["N/A", "A", "B", "C", "D", "E", "AB", "AC", "AD", "AE"]
-    nomes_treinamento = ["NR-35 Trabalho em Altura", "NR-33 Espaços Confinados", "Direção Defensiva",
-                         "Primeiros Socorros", "Operador de Empilhadeira"]
-    tipos_exame_aso = ["Admissional", "Periódico", "Demissional", "Mudança de Risco", "Retorno ao Trabalho"]
-    resultados_aso = ["Apto", "Inapto"]
-
-    # Listas de amostra para incidentes
-    tipos_incidente = ["Queda de mesmo nível", "Corte", "Pancada contra", "Esforço excessivo",
-                       "Exposição a produto químico"]
-    locais_ocorrencia = ["Pátio", "Oficina", "Almoxarifado", "Escritório", "Doca de Carga"]
-    causas_raiz = ["Falta de atenção", "Condição insegura no piso", "Falha de equipamento", "Uso incorreto de EPI",
-                   "Falta de treinamento"]
-    partes_corpo = ["Mão(s)", "Pé(s)", "Perna(s)", "Braço(s)", "Cabeça", "Olhos", "Costas"]
-
-    # --- Criação de Funcionários ---
-    for i in range(numero_de_funcionarios):
-        nome = fake.name()
-        matricula = str(fake.unique.random_number(digits=6))
-        cargo = random.choice(cargos)
-        cnh_tipo = random.choice(tipos_cnh)
-        cnh_validade = gerar_data_aleatoria()
-
-        try:
-            cursor.execute(
-                "INSERT INTO funcionarios (nome, matricula, cargo, cnh_tipo, cnh_validade) VALUES (?, ?, ?, ?, ?)",
-                (nome, matricula, cargo, cnh_tipo, cnh_validade)
-            )
-            funcionario_id = cursor.lastrowid
-
-            # --- Criação de Treinamentos para o funcionário ---
-            num_treinamentos = random.randint(1, 4)
-            for _ in range(num_treinamentos):
-                nome_treinamento = random.choice(nomes_treinamento)
-                data_realizacao = gerar_data_aleatoria()
-                validade = data_realizacao + timedelta(days=random.randint(180, 730))
-                cursor.execute(
-                    "INSERT INTO treinamentos (funcionario_id, nome_treinamento, data_realizacao, validade) VALUES (?, ?, ?, ?)",
-                    (funcionario_id, nome_treinamento, data_realizacao, validade)
-                )
-
-            # --- Criação de ASOs para o funcionário ---
-            num_asos = random.randint(1, 3)
-            for _ in range(num_asos):
-                tipo_exame = random.choice(tipos_exame_aso)
-                data_exame = gerar_data_aleatoria()
-                resultado = random.choice(resultados_aso)
-                validade_aso = data_exame + timedelta(days=365)
-                cursor.execute(
-                    "INSERT INTO asos (funcionario_id, tipo_exame, data_exame, resultado, validade_aso) VALUES (?, ?, ?, ?, ?)",
-                    (funcionario_id, tipo_exame, data_exame, resultado, validade_aso)
-                )
-
-            # --- Criação de Incidentes (com probabilidade) ---
-            if random.random() < 0.25:  # 25% de chance de ter um incidente
+    primeiros, sobrenomes = gerar_pool_nomes()
+    existentes = {row[0] for row in cursor.execute("SELECT matricula FROM funcionarios")}
+    matriculas = gerar_matriculas(rng, numero_de_funcionarios, existentes)
+    proximo_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM funcionarios").fetchone()[0] + 1
+
+    # Todas as datas possíveis já no formato do banco (número de dias): cada sorteio vira só um acesso à lista
+    hoje = para_dias(date.today())
+    datas = list(range(hoje - dias, hoje + dias + 731))
+    ultimo_dia = 2 * dias  # índice, em `datas`, de hoje + dias
+
+    escolher, sortear, aleatorio = rng.choice, rng.randint, rng.random
+    total = {'funcionarios': 0, 'treinamentos': 0, 'asos': 0, 'incidentes': 0}
+
+    for inicio_lote in range(0, numero_de_funcionarios, tamanho_lote):
+        funcionarios, treinamentos, asos, incidentes = [], [], [], []
+
+        for matricula in matriculas[inicio_lote:inicio_lote + tamanho_lote]:
+            funcionario_id = proximo_id
+            proximo_id += 1
+            nome = f"{escolher(primeiros)} {escolher(sobrenomes)} {escolher(sobrenomes)}"
+            funcionarios.append((funcionario_id, nome, matricula, escolher(CARGOS), escolher(TIPOS_CNH),
+                                 datas[sortear(0, ultimo_dia)]))
+
+            # --- Treinamentos do funcionário ---
+            for _ in range(sortear(1, 4)):
+                realizacao = sortear(0, ultimo_dia)
+                treinamentos.append((funcionario_id, escolher(NOMES_TREINAMENTO), datas[realizacao],
+                                     datas[realizacao + sortear(180, 730)]))
+
+            # --- ASOs do funcionário ---
+            for _ in range(sortear(1, 3)):
+                exame = sortear(0, ultimo_dia)
+                asos.append((funcionario_id, escolher(TIPOS_EXAME_ASO), datas[exame], escolher(RESULTADOS_ASO),
+                             datas[exame + 365]))
+
+            # --- Incidentes (com probabilidade) ---
+            if aleatorio() < taxa_incidentes:
                 dias_perdidos = 0
                 # 20% de chance do incidente ser grave ou fatal
-                if random.random() < 0.20:
-                    gravidade = random.choice(["Grave", "Fatal"])
-                    dias_perdidos = random.randint(15, 90)
+                if aleatorio() < 0.20:
+                    gravidade = escolher(["Grave", "Fatal"])
+                    dias_perdidos = sortear(15, 90)
                 else:
-                    gravidade = random.choice(["Leve", "Moderado", "Quase Acidente"])
+                    gravidade = escolher(["Leve", "Moderado", "Quase Acidente"])
                     if gravidade == "Leve":
-                        dias_perdidos = random.randint(1, 5)
+                        dias_perdidos = sortear(1, 5)
                     elif gravidade == "Moderado":
-                        dias_perdidos = random.randint(5, 15)
-
-                cursor.execute(
-                    """INSERT INTO incidentes (funcionario_id, data_ocorrencia, gravidade, tipo_incidente,
-                                               local_ocorrencia, causa_raiz, partes_corpo_atingidas, dias_perdidos)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        funcionario_id,
-                        gerar_data_aleatoria(),
-                        gravidade,
-                        random.choice(tipos_incidente),
-                        random.choice(locais_ocorrencia),
-                        random.choice(causas_raiz),
-                        random.choice(partes_corpo),
-                        dias_perdidos
-                    )
-                )
-
-        except sqlite3.IntegrityError:
-            print(f"Matrícula {matricula} já existe, pulando funcionário.")
-            continue
-
-        # Exibe o progresso a cada 10 funcionários criados
-        if (i + 1) % 10 == 0:
-            print(f"{i + 1}/{numero_de_funcionarios} funcionários criados...")
-
-    conn.commit()
+                        dias_perdidos = sortear(5, 15)
+                incidentes.append((funcionario_id, datas[sortear(0, ultimo_dia)], gravidade, escolher(TIPOS_INCIDENTE),
+                                   escolher(LOCAIS_OCORRENCIA), escolher(CAUSAS_RAIZ), escolher(PARTES_CORPO),
+                                   dias_perdidos))
+
+        cursor.executemany(
+            "INSERT INTO funcionarios (id, nome, matricula, cargo, cnh_tipo, cnh_validade) VALUES (?, ?, ?, ?, ?, ?)",
+            funcionarios)
+        cursor.executemany(
+            "INSERT INTO treinamentos (funcionario_id, nome_treinamento, data_realizacao, validade) VALUES (?, ?, ?, ?)",
+            treinamentos)
+        # O mesmo exame sorteado duas vezes para o mesmo dia é barrado pelo índice único de ASOs
+        cursor.executemany(
+            "INSERT OR IGNORE INTO asos (funcionario_id, tipo_exame, data_exame, resultado, validade_aso) VALUES (?, ?, ?, ?, ?)",
+            asos)
+        asos_inseridos = cursor.rowcount
+        cursor.executemany(
+            """INSERT INTO incidentes (funcionario_id, data_ocorrencia, gravidade, tipo_incidente,
+                                       local_ocorrencia, causa_raiz, partes_corpo_atingidas, dias_perdidos)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            incidentes)
+        conn.commit()
+
+        total['funcionarios'] += len(funcionarios)
+        total['treinamentos'] += len(treinamentos)
+        total['asos'] += asos_inseridos
+        total['incidentes'] += len(incidentes)
+        print(f"{total['funcionarios']}/{numero_de_funcionarios} funcionários criados...")
+
+    cursor.execute("PRAGMA synchronous = NORMAL;")
     conn.close()
-    print("\nCriação de dados concluída com sucesso!")
+    print(f"\nCriação de dados concluída com sucesso! {total}")
+    return total
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Gera dados fictícios para testes de carga do painel.")
+    parser.add_argument('funcionarios', type=int, nargs='?',
+                        help="quantidade de funcionários (sem este argumento, o script pergunta)")
+    parser.add_argument('--seed', type=int, default=None, help="semente para gerar sempre o mesmo banco")
+    parser.add_argument('--dias', type=int, default=730,
+                        help="as datas ficam entre hoje - DIAS e hoje + DIAS (padrão: 730)")
+    parser.add_argument('--taxa-incidentes', type=float, default=0.25,
+                        help="probabilidade de cada funcionário ter um incidente (padrão: 0.25)")
+    parser.add_argument('--lote', type=int, default=20_000, help="funcionários por transação (padrão: 20000)")
+    parser.add_argument('--db', default=None, help="arquivo do banco (padrão: o mesmo da aplicação)")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    # Garante que as tabelas existem antes de inserir dados
+    args = ler_argumentos()
+    if args.db:
+        configurar_banco(db_file=args.db)
+
+    # Garante que o schema existe (e está na versão atual) antes de inserir dados
     # Isso é útil se você apagar o DB e rodar este script primeiro
     print("Verificando e inicializando o banco de dados...")
-    init_db()
-
-    try:
-        num = int(input("Quantos funcionários de teste você deseja criar? "))
-        if num > 0:
-            criar_dados_em_massa(num)
-        else:
-            print("Por favor, insira um número positivo.")
-    except ValueError:
-        print("Entrada inválida. Por favor, insira um número inteiro.")
+    aplicar_migracoes()
+
+    num = args.funcionarios
+    if num is None:
+        try:
+            num = int(input("Quantos funcionários de teste você deseja criar? "))
+        except ValueError:
+            print("Entrada inválida. Por favor, insira um número inteiro.")
+            raise SystemExit(1)
+
+    if num > 0:
+        inicio = time.perf_counter()
+        criar_dados_em_massa(num, seed=args.seed, dias=args.dias, taxa_incidentes=args.taxa_incidentes,
+                             tamanho_lote=args.lote)
+        print(f"Tempo total: {time.perf_counter() - inicio:.1f} s")
+    else:
+        print("Por favor, insira um número positivo.")
@@ -0,0 +1,293 @@
+import argparse
+import os
+import time
+from io import StringIO
+
+import pandas as pd
+
+from dados_incidentes import GRAVIDADES
+from ingestao import converter_datas, texto_ou_none
+
+
+# --- CARGA EM MASSA DE TREINAMENTOS E INCIDENTES (CSV OU XLSX) ---
+# Mesma abordagem do ingestao.py: o arquivo é lido de uma vez (o CSV pelo parser em C do pandas, bem
+# mais rápido que o XLSX), cada coluna é validada e convertida inteira, as matrículas são resolvidas
+# com um JOIN contra uma tabela temporária (staging) e os registros entram com um único INSERT ... SELECT.
+# Tudo numa transação só: ou o arquivo inteiro (menos as linhas com erro) entra, ou nada entra.
+#
+# Os nomes das colunas no arquivo são configuráveis: LAYOUTS traz o nome padrão de cada campo e
+# `mapeamento` ({campo: coluna do arquivo}) troca os que forem diferentes (None deixa o campo em branco).
+
+# Tipos de campo: 'texto', 'data', 'inteiro' e 'gravidade' (um dos GRAVIDADES, sem diferenciar maiúsculas)
+LAYOUTS = {
+    'treinamentos': {
+        # campo: (coluna padrão no arquivo, obrigatório, tipo)
+        'matricula': ("MATRICULA", True, 'texto'),
+        'nome_treinamento': ("TREINAMENTO", True, 'texto'),
+        'data_realizacao': ("DATA DE REALIZAÇÃO", False, 'data'),
+        'validade': ("VALIDADE", False, 'data'),
+    },
+    'incidentes': {
+        # Sem matrícula, o incidente fica sem funcionário (terceiro / não se aplica)
+        'matricula': ("MATRICULA", False, 'texto'),
+        'data_ocorrencia': ("DATA", True, 'data'),
+        'gravidade': ("GRAVIDADE", True, 'gravidade'),
+        'tipo_incidente': ("TIPO", True, 'texto'),
+        'local_ocorrencia': ("LOCAL", False, 'texto'),
+        'causa_raiz': ("CAUSA RAIZ", False, 'texto'),
+        'partes_corpo_atingidas': ("PARTES DO CORPO", False, 'texto'),
+        'dias_perdidos': ("DIAS PERDIDOS", False, 'inteiro'),
+    },
+}
+
+TIPOS_SQL = {'texto': 'TEXT', 'data': 'DATE', 'inteiro': 'INTEGER', 'gravidade': 'TEXT'}
+
+# Registros iguais aos que já estão no banco são ignorados, para o mesmo arquivo poder ser enviado de novo
+SQL_INSERIR = {
+    'treinamentos': """
+        INSERT INTO treinamentos (funcionario_id, nome_treinamento, data_realizacao, validade)
+        SELECT f.id, s.nome_treinamento, s.data_realizacao, s.validade
+        FROM staging_treinamentos s
+                 JOIN funcionarios f ON f.matricula = s.matricula
+        WHERE NOT EXISTS (SELECT 1
+                          FROM treinamentos t
+                          WHERE t.funcionario_id = f.id
+                            AND t.validade IS s.validade
+                            AND t.nome_treinamento = s.nome_treinamento
+                            AND t.data_realizacao IS s.data_realizacao)
+        ORDER BY s.linha
+    """,
+    'incidentes': """
+        INSERT INTO incidentes (funcionario_id, data_ocorrencia, gravidade, tipo_incidente, local_ocorrencia,
+                                causa_raiz, partes_corpo_atingidas, dias_perdidos)
+        SELECT f.id, s.data_ocorrencia, s.gravidade, s.tipo_incidente, s.local_ocorrencia, s.causa_raiz,
+               s.partes_corpo_atingidas, COALESCE(s.dias_perdidos, 0)
+        FROM staging_incidentes s
+                 LEFT JOIN funcionarios f ON f.matricula = s.matricula
+        WHERE NOT EXISTS (SELECT 1
+                          FROM incidentes i
+                          WHERE i.data_ocorrencia = s.data_ocorrencia
+                            AND i.local_ocorrencia IS s.local_ocorrencia
+                            AND i.funcionario_id IS f.id
+                            AND i.tipo_incidente = s.tipo_incidente
+                            AND i.gravidade = s.gravidade)
+        ORDER BY s.linha
+    """,
+}
+
+# Campos que identificam um registro (os mesmos comparados em SQL_INSERIR). Linhas repetidas no próprio
+# arquivo saem da staging antes do INSERT, ficando só a primeira: enviar um arquivo com duas linhas
+# iguais grava o mesmo que enviá-lo duas vezes.
+CHAVES = {
+    'treinamentos': ('matricula', 'nome_treinamento', 'data_realizacao', 'validade'),
+    'incidentes': ('matricula', 'data_ocorrencia', 'local_ocorrencia', 'tipo_incidente', 'gravidade'),
+}
+
+SQL_REMOVER_REPETIDAS = """
+    DELETE FROM {staging}
+    WHERE linha NOT IN (SELECT MIN(linha) FROM {staging} GROUP BY {chave})
+"""
+
+# Matrículas preenchidas que não existem no cadastro ({staging}: tabela temporária do destino)
+SQL_MATRICULAS_DESCONHECIDAS = """
+    SELECT s.linha, s.matricula
+    FROM {staging} s
+    WHERE s.matricula IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM funcionarios f WHERE f.matricula = s.matricula)
+"""
+
+
+def colunas_padrao(destino):
+    return {campo: coluna for campo, (coluna, _, _) in LAYOUTS[destino].items()}
+
+
+def sugerir_mapeamento(destino, colunas_arquivo):
+    """Liga cada campo à coluna do arquivo com o mesmo nome padrão, sem diferenciar maiúsculas e espaços."""
+    por_nome = {str(coluna).strip().upper(): coluna for coluna in colunas_arquivo}
+    return {campo: por_nome[coluna.upper()] for campo, coluna in colunas_padrao(destino).items()
+            if coluna.upper() in por_nome}
+
+
+# --- LEITURA ---
+
+def detectar_separador(linha):
+    return ';' if linha.count(';') > linha.count(',') else ','
+
+
+def ler_arquivo(arquivo, nome=None, linhas=None):
+    """Lê um .csv ou .xlsx (caminho ou arquivo enviado) como texto/objetos, sem inferir tipos.
+
+    No CSV, o separador (';' ou ',') é detectado pela primeira linha e a codificação pode ser UTF-8
+    ou Latin-1 (a exportação padrão do Excel em português). `linhas` limita a leitura (pré-visualização).
+    """
+    nome = nome or getattr(arquivo, 'name', str(arquivo))
+    if not nome.lower().endswith('.csv'):
+        return pd.read_excel(arquivo, dtype=object, nrows=linhas)
+
+    if hasattr(arquivo, 'getvalue'):
+        conteudo = arquivo.getvalue()
+    else:
+        with open(arquivo, 'rb') as f:
+            conteudo = f.read()
+    try:
+        texto = conteudo.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = conteudo.decode('latin-1')
+    primeira_linha = texto.split('\n', 1)[0]
+    return pd.read_csv(StringIO(texto), sep=detectar_separador(primeira_linha), dtype=str, nrows=linhas,
+                       skipinitialspace=True)
+
+
+# --- VALIDAÇÃO ---
+
+def preparar_registros(df, destino, mapeamento=None, numeros_linha=None):
+    """Converte o arquivo para os campos de `destino` e separa as linhas com erro.
+
+    Retorna (validos, erros), como ingestao.preparar_planilha. Levanta ValueError se faltar no arquivo
+    alguma coluna obrigatória.
+    """
+    layout = LAYOUTS[destino]
+    mapeamento = {**colunas_padrao(destino), **(mapeamento or {})}
+    faltando = [mapeamento[campo] or campo for campo, (_, obrigatorio, _) in layout.items()
+                if obrigatorio and mapeamento[campo] not in df.columns]
+    if faltando:
+        raise ValueError(f"O arquivo precisa conter as colunas {faltando}.")
+
+    df = df.reset_index(drop=True)
+    if numeros_linha is None:
+        numeros_linha = pd.RangeIndex(2, 2 + len(df))
+    preparado = pd.DataFrame({'linha': list(numeros_linha)})
+    motivos = pd.Series(None, index=df.index, dtype=object)
+
+    def marcar(condicao, motivo):
+        motivos[condicao & motivos.isna()] = motivo
+
+    for campo, (_, obrigatorio, tipo) in layout.items():
+        coluna = mapeamento[campo]
+        if coluna not in df.columns:
+            preparado[campo] = None
+            continue
+        valores = df[coluna]
+        if tipo == 'data':
+            preparado[campo], invalidas = converter_datas(valores)
+            marcar(invalidas, f"{campo} inválida")
+        else:
+            texto = valores.astype(str).str.strip().where(valores.notna())
+            texto = texto.where(texto != '')
+            if campo == 'matricula':
+                # Matrículas numéricas em colunas com células vazias chegam como float (123456.0)
+                texto = texto.str.replace(r'\.0$', '', regex=True)
+            if tipo == 'inteiro':
+                numeros = pd.to_numeric(texto, errors='coerce')
+                marcar(texto.notna() & (numeros.isna() | (numeros < 0) | (numeros % 1 != 0)),
+                       f"{campo} deve ser um número inteiro não negativo")
+                texto = numeros.round().astype('Int64')
+            elif tipo == 'gravidade':
+                canonicas = {gravidade.upper(): gravidade for gravidade in GRAVIDADES}
+                normalizadas = texto.str.upper().map(canonicas)
+                marcar(texto.notna() & normalizadas.isna(), f"{campo} deve ser uma de {GRAVIDADES}")
+                texto = normalizadas
+            preparado[campo] = texto_ou_none(texto)
+        if obrigatorio:
+            marcar(preparado[campo].isna(), f"{campo} em branco")
+
+    if destino == 'treinamentos':
+        realizacao, validade = preparado['data_realizacao'], preparado['validade']
+        ambas = realizacao.notna() & validade.notna()
+        marcar(ambas & (validade.where(ambas, 0) < realizacao.where(ambas, 0)), "validade anterior à realização")
+
+    com_erro = motivos.notna()
+    erros = [{'linha': int(linha), 'matricula': matricula, 'erro': motivo}
+             for linha, matricula, motivo in zip(preparado.loc[com_erro, 'linha'], preparado.loc[com_erro, 'matricula'],
+                                                 motivos[com_erro])]
+    return preparado[~com_erro], erros
+
+
+# --- GRAVAÇÃO ---
+
+def criar_staging(conn, destino):
+    """(Re)cria a tabela temporária com os campos de `destino`, indexada pela matrícula. Retorna o nome."""
+    staging = f"staging_{destino}"
+    definicoes = ", ".join(f"{campo} {TIPOS_SQL[tipo]}" for campo, (_, _, tipo) in LAYOUTS[destino].items())
+    conn.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+    conn.execute(f"CREATE TEMP TABLE {staging} (linha INTEGER PRIMARY KEY, {definicoes})")
+    conn.execute(f"CREATE INDEX temp.idx_{staging}_matricula ON {staging} (matricula)")
+    return staging
+
+
+def importar_registros(conn, df, destino, mapeamento=None):
+    """Grava os registros válidos de `df` em `destino` ('treinamentos' ou 'incidentes').
+
+    Não faz commit: quem chama confirma (ou desfaz) a carga inteira. Retorna um dicionário com
+    'processadas', 'inseridos', 'ignorados' (já existiam no banco ou repetiam uma linha anterior do
+    arquivo), 'erros' e 'total_erros'.
+    """
+    validos, erros = preparar_registros(df, destino, mapeamento)
+    campos = list(LAYOUTS[destino])
+
+    staging = criar_staging(conn, destino)
+    conn.executemany(f"INSERT INTO {staging} (linha, {', '.join(campos)}) "
+                     f"VALUES ({', '.join('?' * (len(campos) + 1))})",
+                     validos[['linha'] + campos].itertuples(index=False, name=None))
+
+    desconhecidas = conn.execute(SQL_MATRICULAS_DESCONHECIDAS.format(staging=staging)).fetchall()
+    if desconhecidas:
+        erros += [{'linha': linha, 'matricula': matricula, 'erro': "matrícula não cadastrada"}
+                  for linha, matricula in desconhecidas]
+        conn.executemany(f"DELETE FROM {staging} WHERE linha = ?", ((linha,) for linha, _ in desconhecidas))
+
+    processadas = len(validos) - len(desconhecidas)
+    conn.execute(SQL_REMOVER_REPETIDAS.format(staging=staging, chave=", ".join(CHAVES[destino])))
+    inseridos = conn.execute(SQL_INSERIR[destino]).rowcount
+    conn.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+
+    return {
+        'processadas': processadas,
+        'inseridos': inseridos,
+        'ignorados': processadas - inseridos,
+        'erros': sorted(erros, key=lambda erro: erro['linha']),
+        'total_erros': len(erros),
+    }
+
+
+def importar_arquivo(conn, arquivo, destino, mapeamento=None, nome=None):
+    """Lê o arquivo e importa numa única transação (faz commit ao final, rollback em caso de erro)."""
+    df = ler_arquivo(arquivo, nome)
+    try:
+        resultado = importar_registros(conn, df, destino, mapeamento)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return resultado
+
+
+if __name__ == "__main__":
+    # python importacao.py treinamentos campanha_nr35.csv --coluna nome_treinamento=CURSO
+    from banco import get_db_connection
+    from migracoes import garantir_schema
+
+    parser = argparse.ArgumentParser(description="Importa treinamentos ou incidentes de um arquivo CSV ou XLSX.")
+    parser.add_argument('destino', choices=sorted(LAYOUTS))
+    parser.add_argument('arquivo')
+    parser.add_argument('--coluna', action='append', default=[], metavar='CAMPO=COLUNA',
+                        help="nome da coluna no arquivo para um campo (pode repetir); padrões: "
+                             + "; ".join(f"{d}: " + ", ".join(f"{c}={n}" for c, n in colunas_padrao(d).items())
+                                         for d in sorted(LAYOUTS)))
+    args = parser.parse_args()
+    mapeamento = dict(item.split('=', 1) for item in args.coluna)
+
+    garantir_schema()
+    inicio = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        resultado = importar_arquivo(conn, args.arquivo, args.destino, mapeamento)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        conn.close()
+    print(f"{os.path.basename(args.arquivo)}: {resultado['inseridos']:,} {args.destino} inseridos, "
+          f"{resultado['ignorados']:,} já existentes ou repetidos, {resultado['total_erros']:,} linhas com erro "
+          f"({time.perf_counter() - inicio:.2f} s).")
+    for erro in resultado['erros'][:20]:
+        print(f"  linha {erro['linha']}: {erro['erro']} (matrícula {erro['matricula']})")
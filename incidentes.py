@@ -1,91 +1,64 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
-from datetime import date
+from datetime import date, timedelta
+from tabela_paginada import mostrar_tabela_paginada
+from busca_funcionarios import seletor_funcionario
+from dados_cadastro import existem_funcionarios
+from dados_incidentes import (GRAVIDADES, LIMITE_RESULTADOS_BUSCA, SQL_LISTA_INCIDENTES, adicionar_incidente,
+                              buscar_incidentes_por_texto)
+
+
+# --- FUNÇÕES DA PÁGINA DE INCIDENTES ---
+
+def show_busca_incidentes():
+    """Busca textual nos incidentes com filtro de período e gravidade."""
+    st.header("🔎 Buscar nos Incidentes")
+    busca = st.text_input("Termos da busca", placeholder='Ex: empilhadeira AND mão, "mão direita", queda NOT escada',
+                          key="busca_incidentes").strip()
+    col_periodo, col_gravidade = st.columns([1, 2])
+    periodo = col_periodo.date_input("Período", value=(date.today() - timedelta(days=5 * 365), date.today()),
+                                     key="busca_incidentes_periodo")
+    gravidades = col_gravidade.multiselect("Gravidade", GRAVIDADES, key="busca_incidentes_gravidade")
+    if not busca:
+        return
+    # Enquanto o usuário escolhe o período, o date_input devolve só a data inicial
+    inicio, fim = periodo if len(periodo) == 2 else (periodo[0], date.today())
+
+    resultados = buscar_incidentes_por_texto(busca, inicio, fim, tuple(gravidades))
+    if resultados.empty:
+        st.info("Nenhum incidente encontrado.")
+        return
+    if len(resultados) == LIMITE_RESULTADOS_BUSCA:
+        st.caption(f"Mostrando os {LIMITE_RESULTADOS_BUSCA} resultados mais relevantes.")
+    for incidente in resultados.itertuples():
+        with st.container(border=True):
+            st.markdown(f"**#{incidente.id}** · {incidente.data_ocorrencia} · {incidente.gravidade} · "
+                        f"{incidente.nome_funcionario} · {incidente.dias_perdidos or 0} dia(s) perdido(s)")
+            st.markdown(f"{incidente.tipo_incidente} — {incidente.local_ocorrencia or '-'}"
+                        f" · Partes atingidas: {incidente.partes_corpo_atingidas or '-'}")
+            if incidente.causa_raiz:
+                st.markdown(incidente.causa_raiz)
 
 
-# --- FUNÇÕES DE BANCO DE DADOS ESPECÍFICAS PARA INCIDENTES ---
-
-def get_db_connection():
-    """Cria e retorna uma conexão com o banco de dados SQLite."""
-    conn = sqlite3.connect('controle_empresa.db', check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
-
-
-def buscar_funcionarios_para_incidente():
-    """Busca funcionários para a lista de seleção."""
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT id, nome, matricula FROM funcionarios", conn)
-    conn.close()
-    return df
-
-
-def adicionar_incidente(funcionario_id, data_ocorrencia, gravidade, tipo_incidente, local_ocorrencia, causa_raiz,
-                        partes_corpo_atingidas, dias_perdidos):
-    """Adiciona um novo incidente ao banco de dados."""
-    conn = get_db_connection()
-    conn.execute("""
-                 INSERT INTO incidentes (funcionario_id, data_ocorrencia, gravidade, tipo_incidente, local_ocorrencia,
-                                         causa_raiz, partes_corpo_atingidas, dias_perdidos)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                 """, (funcionario_id, data_ocorrencia, gravidade, tipo_incidente, local_ocorrencia, causa_raiz,
-                       partes_corpo_atingidas, dias_perdidos))
-    conn.commit()
-    conn.close()
-    st.success("✅ Incidente registrado com sucesso!")
-
-
-def buscar_incidentes():
-    """Busca todos os incidentes registrados."""
-    conn = get_db_connection()
-    query = """
-            SELECT i.id,
-                   COALESCE(f.nome, 'Não se aplica / Terceiro') as nome_funcionario,
-                   i.data_ocorrencia,
-                   i.gravidade,
-                   i.tipo_incidente,
-                   i.local_ocorrencia,
-                   i.causa_raiz,
-                   i.partes_corpo_atingidas,
-                   i.dias_perdidos
-            FROM incidentes i
-                     LEFT JOIN funcionarios f ON i.funcionario_id = f.id
-            ORDER BY i.data_ocorrencia DESC
-            """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
-
-
-# --- FUNÇÃO PRINCIPAL DA PÁGINA DE INCIDENTES ---
-
 def show_incidentes_page():
     """Cria a interface da aba de registro de incidentes."""
     st.header("🚨 Registro de Incidentes e Acidentes")
 
-    funcionarios_df = buscar_funcionarios_para_incidente()
-
-    if funcionarios_df.empty:
+    st.subheader("Detalhes da Ocorrência")
+    if existem_funcionarios():
+        # A busca fica fora do formulário para os resultados atualizarem enquanto o usuário digita
+        id_funcionario_incidente = seletor_funcionario("Funcionário Envolvido", "incidente_func",
+                                                       opcao_nenhum="Não se aplica / Terceiro")
+    else:
         st.info(
             "ℹ️ Não há funcionários cadastrados. Para associar um incidente a um funcionário, cadastre um na aba 'Funcionários' primeiro.")
-        map_nome_id_incidentes = {}
-    else:
-        map_nome_id_incidentes = {f"{row['nome']} (Mat: {row['matricula']})": row['id'] for index, row in
-                                  funcionarios_df.iterrows()}
-
-    opcoes_funcionarios = ["Não se aplica / Terceiro"] + list(map_nome_id_incidentes.keys())
+        id_funcionario_incidente = None
 
     with st.form("form_incidentes", clear_on_submit=True):
-        st.subheader("Detalhes da Ocorrência")
-
-        selecao_funcionario_incidente = st.selectbox("Funcionário Envolvido", options=opcoes_funcionarios)
         data_ocorrencia = st.date_input("Data da Ocorrência", value=date.today())
 
         col1, col2 = st.columns(2)
         with col1:
-            gravidade = st.selectbox("Gravidade", ["Leve", "Moderado", "Grave", "Fatal", "Quase Acidente"])
+            gravidade = st.selectbox("Gravidade", GRAVIDADES)
         with col2:
             tipo_incidente = st.text_input("Tipo de Incidente", placeholder="Ex: Queda, corte, esmagamento...")
 
@@ -99,13 +72,16 @@ def show_incidentes_page():
             if not tipo_incidente or not local_ocorrencia:
                 st.warning("Tipo de Incidente e Local da Ocorrência são campos obrigatórios.")
             else:
-                id_funcionario_incidente = None
-                if selecao_funcionario_incidente != "Não se aplica / Terceiro":
-                    id_funcionario_incidente = map_nome_id_incidentes[selecao_funcionario_incidente]
-
                 adicionar_incidente(id_funcionario_incidente, data_ocorrencia, gravidade, tipo_incidente,
                                     local_ocorrencia, causa_raiz, partes_corpo_atingidas, dias_perdidos)
+                st.success("✅ Incidente registrado com sucesso!")
+
+    st.divider()
+    show_busca_incidentes()
 
     st.divider()
     st.header("Histórico de Incidentes Registrados")
-    st.dataframe(buscar_incidentes(), use_container_width=True)
+    mostrar_tabela_paginada("lista_incidentes", SQL_LISTA_INCIDENTES,
+                            ['id', 'nome_funcionario', 'data_ocorrencia', 'gravidade', 'tipo_incidente',
+                             'local_ocorrencia', 'dias_perdidos'],
+                            ordenar_por='data_ocorrencia', decrescente=True)
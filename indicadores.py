@@ -0,0 +1,110 @@
+import os
+
+from banco import cache_consulta, ler_dataframe
+from datas import sql_dias, sql_mes
+
+
+# --- TAXAS DE FREQUÊNCIA (TF) E GRAVIDADE (TG) ---
+# Calculadas no estilo da NBR 14280, por milhão de horas-homem trabalhadas (HHT):
+#   TF = incidentes × 1.000.000 / HHT        TG = dias perdidos × 1.000.000 / HHT
+# Não há registro de ponto no banco, então a HHT é estimada pelo efetivo atual (funcionarios) vezes
+# as horas trabalhadas por mês. Por local de ocorrência a HHT é a da empresa inteira, já que os
+# funcionários não são lotados por local.
+#
+# Tudo é feito em uma consulta: as contagens mensais vêm agregadas (resumo de incidentes por cargo,
+# GROUP BY por local), um calendário completa os meses sem incidentes e as janelas de 12 meses são
+# funções de janela do SQLite. O Python só recebe o resultado.
+
+HORAS_POR_MES = float(os.environ.get('PAINEL_HORAS_POR_MES', 176))
+
+DIMENSOES = ('cargo', 'local_ocorrencia')
+
+# Contagens mensais por grupo, a partir do mês :inicio_janela (11 meses antes do período, para a janela móvel)
+EVENTOS = {
+    'cargo': """
+        SELECT cargo AS grupo, mes, SUM(quantidade) AS incidentes, SUM(dias_perdidos) AS dias_perdidos
+        FROM incidentes_resumo
+        WHERE mes BETWEEN strftime('%Y-%m', :inicio_janela) AND strftime('%Y-%m', :fim)
+        GROUP BY cargo, mes
+    """,
+    'local_ocorrencia': f"""
+        SELECT COALESCE(local_ocorrencia, '') AS grupo, {sql_mes('data_ocorrencia')} AS mes,
+               COUNT(*) AS incidentes, SUM(COALESCE(dias_perdidos, 0)) AS dias_perdidos
+        FROM incidentes
+        WHERE data_ocorrencia >= {sql_dias(':inicio_janela')}
+          AND data_ocorrencia < {sql_dias("date(:fim, '+1 month')")}
+        GROUP BY 1, 2
+    """,
+}
+
+EFETIVO = {
+    'cargo': "SELECT COALESCE(cargo, '') AS grupo, COUNT(*) AS funcionarios FROM funcionarios GROUP BY cargo",
+    'local_ocorrencia': "SELECT grupo, (SELECT COUNT(*) FROM funcionarios) AS funcionarios FROM (SELECT DISTINCT grupo FROM eventos)",
+}
+
+SQL_TAXAS = """
+    WITH RECURSIVE
+        meses(mes) AS (SELECT :inicio_janela
+                       UNION ALL
+                       SELECT date(mes, '+1 month') FROM meses WHERE mes < :fim),
+        eventos AS ({eventos}),
+        efetivo AS ({efetivo}),
+        serie AS (SELECT g.grupo,
+                         strftime('%Y-%m', m.mes)       AS mes,
+                         COALESCE(e.incidentes, 0)      AS incidentes,
+                         COALESCE(e.dias_perdidos, 0)   AS dias_perdidos,
+                         g.funcionarios,
+                         g.funcionarios * :horas_mes    AS hht
+                  FROM efetivo g
+                           CROSS JOIN meses m
+                           LEFT JOIN eventos e ON e.grupo = g.grupo AND e.mes = strftime('%Y-%m', m.mes)),
+        janelas AS (SELECT *,
+                           SUM(incidentes) OVER ultimos_12    AS incidentes_12m,
+                           SUM(dias_perdidos) OVER ultimos_12 AS dias_perdidos_12m,
+                           SUM(hht) OVER ultimos_12           AS hht_12m
+                    FROM serie
+                    WINDOW ultimos_12 AS (PARTITION BY grupo ORDER BY mes ROWS BETWEEN 11 PRECEDING AND CURRENT ROW))
+    SELECT grupo,
+           mes,
+           incidentes,
+           dias_perdidos,
+           funcionarios,
+           hht,
+           incidentes * 1e6 / NULLIF(hht, 0)            AS tf,
+           dias_perdidos * 1e6 / NULLIF(hht, 0)         AS tg,
+           incidentes_12m,
+           dias_perdidos_12m,
+           incidentes_12m * 1e6 / NULLIF(hht_12m, 0)    AS tf_12m,
+           dias_perdidos_12m * 1e6 / NULLIF(hht_12m, 0) AS tg_12m
+    FROM janelas
+    WHERE mes >= strftime('%Y-%m', :inicio)
+    ORDER BY grupo, mes
+"""
+
+
+def montar_consulta_taxas(dimensao, inicio, fim):
+    """Monta a consulta das taxas mensais e de 12 meses por `dimensao` entre os meses `inicio` e `fim`."""
+    if dimensao not in DIMENSOES:
+        raise ValueError(f"Dimensão inválida: {dimensao}. Use uma de {DIMENSOES}.")
+    import pandas as pd
+
+    inicio = pd.Timestamp(inicio).to_period('M').to_timestamp()
+    fim = pd.Timestamp(fim).to_period('M').to_timestamp()
+    params = {
+        'inicio': inicio.strftime('%Y-%m-%d'),
+        'fim': fim.strftime('%Y-%m-%d'),
+        'inicio_janela': (inicio - pd.DateOffset(months=11)).strftime('%Y-%m-%d'),
+        'horas_mes': HORAS_POR_MES,
+    }
+    return SQL_TAXAS.format(eventos=EVENTOS[dimensao], efetivo=EFETIVO[dimensao]), params
+
+
+@cache_consulta
+def buscar_taxas(dimensao, inicio, fim):
+    """Retorna um DataFrame com uma linha por grupo e mês do período, com TF/TG do mês e dos últimos 12 meses.
+
+    `inicio` e `fim` são datas (ou textos AAAA-MM-DD) de qualquer dia do primeiro e do último mês.
+    O resultado fica em cache por dimensão e período até a próxima escrita no banco.
+    """
+    query, params = montar_consulta_taxas(dimensao, inicio, fim)
+    return ler_dataframe(query, params)
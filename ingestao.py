@@ -0,0 +1,444 @@
+import json
+import time
+from datetime import date
+
+import pandas as pd
+
+from datas import serie_para_dias
+
+
+# --- CARGA EM MASSA DA PLANILHA DE FUNCIONÁRIOS E ASOs ---
+# Em vez de percorrer a planilha linha a linha, as datas são convertidas uma vez por coluna,
+# as matrículas são resolvidas com um único JOIN contra uma tabela temporária (staging) e os
+# inserts são feitos com INSERT ... SELECT. A duplicidade de ASO é barrada pelo índice único
+# ux_asos_funcionario_exame (INSERT OR IGNORE), sem consulta prévia.
+#
+# Modo 'atualizar' (cargas recorrentes da planilha completa do RH): cada matrícula recebe um hash do
+# conteúdo das suas linhas na planilha inteira, guardado em ingestao_hashes a cada carga. Na carga
+# seguinte, os hashes do bloco são lidos numa consulta só e comparados no pandas: as matrículas sem
+# mudança nem chegam à staging, então o custo da carga acompanha o número de linhas alteradas. Nas
+# novas e alteradas, nome, função e CNH diferentes do cadastro são atualizados a partir da primeira
+# linha da matrícula, e ASOs já cadastrados recebem a validade da planilha (células em branco não
+# apagam nada). Na leitura em blocos, uma primeira passada calcula o hash, a primeira e a última
+# linha de cada matrícula na planilha toda (resumir_planilha).
+
+MODOS = ('inserir', 'atualizar')
+
+COLUNAS_OBRIGATORIAS = ['NOME', 'FUNÇÃO', 'MATRICULA']
+
+SQL_CRIAR_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS staging_upload
+    (
+        linha        INTEGER PRIMARY KEY,
+        matricula    TEXT NOT NULL,
+        nome         TEXT,
+        cargo        TEXT,
+        cnh_validade DATE,
+        data_exame   DATE,
+        validade_aso DATE,
+        hash         INTEGER,
+        primeira     INTEGER,
+        ultima       INTEGER
+    )
+"""
+
+SQL_INSERIR_STAGING = """
+    INSERT INTO staging_upload (linha, matricula, nome, cargo, cnh_validade, data_exame, validade_aso, hash,
+                                primeira, ultima)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Hash do conteúdo da planilha na última carga em modo 'atualizar', por funcionário
+DDL_HASHES = """
+    CREATE TABLE IF NOT EXISTS ingestao_hashes
+    (
+        funcionario_id INTEGER PRIMARY KEY,
+        hash           INTEGER NOT NULL,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios (id) ON DELETE CASCADE
+    )
+"""
+
+# Hash atual das matrículas do bloco que já estão cadastradas (NULL: nunca vieram numa carga diferencial).
+# As matrículas vão num único parâmetro JSON, sem precisar passar pela staging.
+SQL_HASHES_ATUAIS = """
+    SELECT f.matricula, h.hash
+    FROM json_each(?) j
+             JOIN funcionarios f ON f.matricula = j.value
+             LEFT JOIN ingestao_hashes h ON h.funcionario_id = f.id
+"""
+
+# Um UPDATE por campo, só nas linhas em que o valor mudou: os triggers de cada coluna (busca,
+# resumo por cargo, compliance da CNH) disparam apenas para o que de fato mudou. Os valores vêm da
+# primeira linha da matrícula na planilha (`primeira`), mesmo que as outras caiam em outros blocos.
+SQL_ATUALIZAR_CAMPO = """
+    UPDATE funcionarios
+    SET {campo} = s.{campo}
+    FROM staging_upload s
+    WHERE s.matricula = funcionarios.matricula
+      AND s.primeira = 1
+      AND s.{campo} IS NOT NULL
+      AND funcionarios.{campo} IS NOT s.{campo}
+"""
+
+CAMPOS_ATUALIZAVEIS = ('nome', 'cargo', 'cnh_validade')
+
+# ASO já cadastrado (mesmo funcionário, data e tipo) cuja validade mudou na planilha. Roda antes do
+# INSERT OR IGNORE, que só grava os exames novos; validade em branco não apaga a existente.
+SQL_ATUALIZAR_VALIDADE_ASO = """
+    UPDATE asos
+    SET validade_aso = s.validade_aso
+    FROM staging_upload s
+             JOIN funcionarios f ON f.matricula = s.matricula
+    WHERE asos.funcionario_id = f.id
+      AND asos.data_exame = s.data_exame
+      AND asos.tipo_exame = 'Periódico'
+      AND s.validade_aso IS NOT NULL
+      AND asos.validade_aso IS NOT s.validade_aso
+"""
+
+# O hash só é gravado no bloco da última linha da matrícula (`ultima`): até lá, os blocos seguintes
+# ainda comparam com o hash da carga anterior e gravam as linhas dela que faltam
+SQL_GRAVAR_HASHES = """
+    INSERT INTO ingestao_hashes (funcionario_id, hash)
+    SELECT f.id, s.hash
+    FROM staging_upload s
+             JOIN funcionarios f ON f.matricula = s.matricula
+    WHERE s.ultima = 1
+    ON CONFLICT (funcionario_id) DO UPDATE SET hash = excluded.hash
+"""
+
+# Matrículas da planilha que já existem no banco (uma única consulta para a planilha inteira)
+SQL_RESOLVER_MATRICULAS = """
+    SELECT DISTINCT s.matricula
+    FROM staging_upload s
+             JOIN funcionarios f ON f.matricula = s.matricula
+"""
+
+# Cria os funcionários novos usando a primeira linha de cada matrícula na planilha
+SQL_INSERIR_FUNCIONARIOS = """
+    INSERT INTO funcionarios (nome, matricula, cargo, cnh_tipo, cnh_validade)
+    SELECT s.nome, s.matricula, s.cargo, 'N/A', s.cnh_validade
+    FROM staging_upload s
+    WHERE s.linha IN (SELECT MIN(linha) FROM staging_upload GROUP BY matricula)
+      AND NOT EXISTS (SELECT 1 FROM funcionarios f WHERE f.matricula = s.matricula)
+"""
+
+SQL_INSERIR_ASOS = """
+    INSERT OR IGNORE INTO asos (funcionario_id, tipo_exame, data_exame, resultado, validade_aso)
+    SELECT f.id, 'Periódico', s.data_exame, 'Apto', s.validade_aso
+    FROM staging_upload s
+             JOIN funcionarios f ON f.matricula = s.matricula
+    WHERE s.data_exame IS NOT NULL
+"""
+
+
+# Formatos aceitos nas células de texto, na ordem em que são tentados (ISO primeiro, depois o brasileiro)
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y')
+
+
+def converter_datas(serie):
+    """Converte uma coluna inteira para o formato do banco (número de dias, ver datas.py).
+
+    Células que já são datas (datetime do Excel) são usadas como estão. Nas de texto, cada célula é
+    tentada em FORMATOS_DATA, um formato por vez para a coluna toda: uma coluna pode misturar
+    AAAA-MM-DD e DD/MM/AAAA, e o dia nunca é trocado com o mês. A hora, se houver, é ignorada, e
+    texto em branco conta como célula vazia.
+
+    Retorna (datas, invalidas): `datas` tem None onde não há data e `invalidas` marca as células
+    preenchidas que não puderam ser interpretadas como data.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        convertidas, preenchidas = serie, serie.notna()
+    else:
+        if pd.api.types.is_string_dtype(serie) and not pd.api.types.is_object_dtype(serie):
+            nativas = pd.Series(False, index=serie.index)
+        else:
+            nativas = serie.map(lambda valor: isinstance(valor, date))
+        # Só a primeira palavra do texto (sem a hora); células vazias ou só com espaços ficam NaN
+        texto = serie.where(~nativas & serie.notna(), '').astype(str).str.strip().str.replace(r'\s.*$', '', regex=True)
+        texto = texto.where(texto != '')
+        preenchidas = nativas | texto.notna()
+        convertidas = pd.to_datetime(serie.where(nativas), errors='coerce')
+        for formato in FORMATOS_DATA:
+            pendentes = convertidas.isna() & texto.notna()
+            if not pendentes.any():
+                break
+            convertidas[pendentes] = pd.to_datetime(texto[pendentes], format=formato, errors='coerce')
+        convertidas = convertidas.where(preenchidas)
+    invalidas = preenchidas & convertidas.isna()
+    return serie_para_dias(convertidas), invalidas
+
+
+COLUNAS_HASH = ['matricula', 'nome', 'cargo', 'cnh_validade', 'data_exame', 'validade_aso']
+
+
+def resumir_matriculas(validas):
+    """Resumo por matrícula das linhas válidas: 'hash' (uint64), 'primeira' e 'ultima' (números das linhas).
+
+    Cada linha é reduzida a um hash pelo pandas e as linhas da mesma matrícula são somadas (com estouro
+    em 64 bits), então qualquer célula alterada, acrescentada ou removida muda o hash da matrícula.
+    Como a soma não depende da ordem, resumos de blocos diferentes podem ser somados (juntar_resumos).
+    """
+    linhas = pd.DataFrame({
+        'matricula': validas['matricula'].to_numpy(),
+        'hash': pd.util.hash_pandas_object(validas[COLUNAS_HASH], index=False).to_numpy(),
+        'linha': validas['linha'].to_numpy(),
+    })
+    return juntar_resumos([linhas.rename(columns={'linha': 'primeira'}).assign(ultima=linhas['linha'])])
+
+
+def juntar_resumos(resumos):
+    grupos = pd.concat(resumos).groupby('matricula')
+    return pd.DataFrame({'hash': grupos['hash'].sum(), 'primeira': grupos['primeira'].min(),
+                         'ultima': grupos['ultima'].max()})
+
+
+def criar_hashes(cursor):
+    """Tabela dos hashes da carga diferencial (passo 5 de migracoes.py)."""
+    cursor.execute(DDL_HASHES)
+
+
+def texto_ou_none(serie):
+    """Converte uma coluna para objetos Python, trocando NaN por None (NULL no SQLite)."""
+    return serie.astype(object).where(serie.notna(), None)
+
+
+def preparar_planilha(df, numeros_linha=None):
+    """Normaliza o DataFrame da planilha e separa as linhas com erro.
+
+    Retorna (validas, erros): `validas` tem as colunas da staging e `erros` é uma lista de
+    dicionários {'linha', 'matricula', 'erro'}. `numeros_linha` são os números das linhas no Excel
+    (padrão: 2, 3, ..., já que o cabeçalho ocupa a linha 1).
+    """
+    df = df.reset_index(drop=True)
+    if numeros_linha is None:
+        numeros_linha = pd.RangeIndex(2, 2 + len(df))
+    # Matrículas numéricas em colunas com células vazias chegam como float (123456.0)
+    matricula = df['MATRICULA'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    preparado = pd.DataFrame({
+        'linha': list(numeros_linha),
+        'matricula': texto_ou_none(matricula.where(df['MATRICULA'].notna())),
+        'nome': texto_ou_none(df['NOME']),
+        'cargo': texto_ou_none(df['FUNÇÃO']),
+    })
+
+    motivos = pd.Series(None, index=preparado.index, dtype=object)
+    motivos[preparado['matricula'].isna()] = "matrícula em branco"
+
+    if 'CNH' in df.columns:
+        preparado['cnh_validade'], invalidas = converter_datas(df['CNH'])
+        motivos[invalidas & motivos.isna()] = "data da CNH inválida"
+    else:
+        preparado['cnh_validade'] = None
+
+    # O ASO só é importado quando a planilha tem as duas colunas (mesma regra de antes)
+    if 'ASO' in df.columns and 'VALIDADE DO ASO' in df.columns:
+        preparado['data_exame'], invalidas = converter_datas(df['ASO'])
+        motivos[invalidas & motivos.isna()] = "data do ASO inválida"
+        preparado['validade_aso'], invalidas = converter_datas(df['VALIDADE DO ASO'])
+        motivos[invalidas & motivos.isna()] = "validade do ASO inválida"
+    else:
+        preparado['data_exame'] = None
+        preparado['validade_aso'] = None
+
+    com_erro = motivos.notna()
+    erros = [{'linha': int(linha), 'matricula': matricula, 'erro': motivo}
+             for linha, matricula, motivo in zip(preparado.loc[com_erro, 'linha'], preparado.loc[com_erro, 'matricula'],
+                                                 motivos[com_erro])]
+    return preparado[~com_erro], erros
+
+
+def ingerir_planilha(conn, df, numeros_linha=None, modo='inserir', resumo=None):
+    """Grava funcionários e ASOs da planilha em uma única transação.
+
+    Com modo='inserir', matrículas já cadastradas só recebem os ASOs novos. Com modo='atualizar',
+    as matrículas cujo conteúdo não mudou desde a última carga são puladas e, nas demais, nome,
+    função e CNH diferentes do cadastro são atualizados, assim como a validade dos ASOs já cadastrados. Quando `df` é só um bloco da planilha, `resumo`
+    (de resumir_planilha) traz o hash, a primeira e a última linha de cada matrícula na planilha inteira;
+    sem ele, `df` é tratado como a planilha completa.
+
+    Não faz commit: quem chama decide quando confirmar (ou desfazer) a carga.
+    Retorna um dicionário com 'processadas', 'funcionarios_novos', 'asos_novos' e 'erros'; no modo
+    'atualizar', também 'funcionarios_alterados', 'funcionarios_inalterados' e 'alteracoes'
+    ({campo: funcionários em que ele mudou}, e em 'validade_aso' os ASOs com validade nova).
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de carga desconhecido: {modo}. Use um de {MODOS}.")
+    validas, erros = preparar_planilha(df, numeros_linha)
+    processadas = len(validas)
+
+    diferenca = {}
+    if modo == 'atualizar':
+        resumo = resumir_matriculas(validas) if resumo is None else resumo
+        # dtype object: os hashes usam os 64 bits e não podem passar por float
+        hashes = pd.Series(resumo['hash'].to_numpy().view('int64'), index=resumo.index).astype(object)
+        validas = validas.assign(hash=validas['matricula'].map(hashes),
+                                 primeira=(validas['linha'] == validas['matricula'].map(resumo['primeira'])).astype(int),
+                                 ultima=(validas['linha'] == validas['matricula'].map(resumo['ultima'])).astype(int))
+        matriculas = validas['matricula'].unique()
+        atuais = dict(conn.execute(SQL_HASHES_ATUAIS, (json.dumps(matriculas.tolist()),)).fetchall())
+        cadastradas = validas['matricula'].isin(list(atuais))
+        inalteradas = cadastradas & (validas['matricula'].map(pd.Series(atuais, dtype=object)) == validas['hash'])
+        # Cada funcionário é contado uma vez, no bloco da sua primeira linha
+        primeiras = validas['primeira'] == 1
+        diferenca = {'funcionarios_alterados': int((primeiras & cadastradas & ~inalteradas).sum()),
+                     'funcionarios_inalterados': int((primeiras & inalteradas).sum())}
+        validas = validas[~inalteradas]
+    else:
+        validas = validas.assign(hash=None, primeira=None, ultima=None)
+
+    conn.execute(SQL_CRIAR_STAGING)
+    conn.execute("DELETE FROM staging_upload")
+    colunas = ['linha', 'matricula', 'nome', 'cargo', 'cnh_validade', 'data_exame', 'validade_aso', 'hash',
+               'primeira', 'ultima']
+    conn.executemany(SQL_INSERIR_STAGING, validas[colunas].itertuples(index=False, name=None))
+
+    # Funcionários novos precisam de nome (coluna NOT NULL). Como o funcionário é criado pela primeira
+    # linha da matrícula, uma linha sem nome só é erro se for essa primeira linha.
+    existentes = {row[0] for row in conn.execute(SQL_RESOLVER_MATRICULAS)}
+    primeiras = ~validas['matricula'].duplicated()
+    sem_nome = validas[primeiras & validas['nome'].isna() & ~validas['matricula'].isin(existentes)]
+    if not sem_nome.empty:
+        invalidas = validas['matricula'].isin(sem_nome['matricula'])
+        erros += [{'linha': int(linha), 'matricula': matricula, 'erro': "funcionário novo sem nome"}
+                  for linha, matricula in zip(validas.loc[invalidas, 'linha'], validas.loc[invalidas, 'matricula'])]
+        conn.executemany("DELETE FROM staging_upload WHERE matricula = ?",
+                         ((matricula,) for matricula in sem_nome['matricula']))
+        processadas -= int(invalidas.sum())
+
+    if modo == 'atualizar':
+        diferenca['alteracoes'] = {campo: conn.execute(SQL_ATUALIZAR_CAMPO.format(campo=campo)).rowcount
+                                   for campo in CAMPOS_ATUALIZAVEIS}
+        diferenca['alteracoes']['validade_aso'] = conn.execute(SQL_ATUALIZAR_VALIDADE_ASO).rowcount
+    funcionarios_novos = conn.execute(SQL_INSERIR_FUNCIONARIOS).rowcount
+    asos_novos = conn.execute(SQL_INSERIR_ASOS).rowcount
+    if modo == 'atualizar':
+        conn.execute(SQL_GRAVAR_HASHES)
+    conn.execute("DROP TABLE IF EXISTS temp.staging_upload")
+
+    return {
+        'processadas': processadas,
+        'funcionarios_novos': funcionarios_novos,
+        'asos_novos': asos_novos,
+        **diferenca,
+        'erros': sorted(erros, key=lambda erro: erro['linha']),
+        'total_erros': len(erros),
+    }
+
+
+# --- LEITURA EM STREAMING PARA PLANILHAS MUITO GRANDES ---
+# O openpyxl em modo read-only lê a planilha linha a linha direto do XML, sem montar o workbook
+# inteiro na memória. Cada bloco vira um DataFrame pequeno, é gravado e confirmado, e descartado.
+
+TAMANHO_BLOCO = 5000
+LIMITE_ERROS = 1000  # erros guardados para exibição; o total continua sendo contado
+
+
+def ler_planilha_em_blocos(arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """Lê a primeira aba de um .xlsx em blocos de `tamanho_bloco` linhas.
+
+    Gera tuplas (DataFrame do bloco, números das linhas no Excel). Linhas totalmente vazias,
+    comuns no fim das planilhas, são descartadas.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = workbook.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = [str(coluna).strip() if coluna is not None else f"COLUNA_{i}" for i, coluna in enumerate(cabecalho)]
+
+        bloco, numeros_linha = [], []
+        for numero_linha, valores in enumerate(linhas, start=2):
+            if all(valor is None for valor in valores):
+                continue
+            bloco.append(valores)
+            numeros_linha.append(numero_linha)
+            if len(bloco) >= tamanho_bloco:
+                yield pd.DataFrame.from_records(bloco, columns=colunas, coerce_float=False), numeros_linha
+                bloco, numeros_linha = [], []
+        if bloco:
+            yield pd.DataFrame.from_records(bloco, columns=colunas, coerce_float=False), numeros_linha
+    finally:
+        workbook.close()
+
+
+def ler_previa_planilha(arquivo, linhas=5):
+    """Lê só as primeiras linhas da planilha (para a pré-visualização) e volta o arquivo ao início."""
+    blocos = ler_planilha_em_blocos(arquivo, linhas)
+    try:
+        previa, _ = next(blocos, (pd.DataFrame(), []))
+    finally:
+        blocos.close()
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    return previa
+
+
+def contar_linhas_planilha(arquivo):
+    """Retorna o número de linhas de dados declarado no .xlsx (sem ler as linhas), ou None se não houver."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(arquivo, read_only=True)
+    try:
+        max_row = workbook.worksheets[0].max_row
+    finally:
+        workbook.close()
+    return max_row - 1 if max_row else None
+
+
+def resumir_planilha(arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """Primeira passada do modo 'atualizar': resumir_matriculas da planilha inteira, lida em blocos.
+
+    Guarda só o resumo (uma linha por matrícula), não as linhas da planilha.
+    """
+    resumos = []
+    for bloco, numeros_linha in ler_planilha_em_blocos(arquivo, tamanho_bloco):
+        if not all(col in bloco.columns for col in COLUNAS_OBRIGATORIAS):
+            raise ValueError(f"O arquivo precisa conter as colunas {COLUNAS_OBRIGATORIAS}.")
+        validas, _ = preparar_planilha(bloco, numeros_linha)
+        resumos.append(resumir_matriculas(validas))
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    return juntar_resumos(resumos) if resumos else None
+
+
+def ingerir_planilha_em_blocos(conn, arquivo, tamanho_bloco=TAMANHO_BLOCO, ao_progredir=None, ao_registrar_erros=None,
+                               modo='inserir'):
+    """Grava uma planilha .xlsx bloco a bloco, com um commit por bloco e memória constante (`modo` como em ingerir_planilha).
+
+    `ao_progredir(linhas_lidas, total_linhas, segundos)` é chamado após cada bloco; `total_linhas`
+    pode ser None quando a planilha não informa suas dimensões. `ao_registrar_erros(erros)` recebe os
+    erros de cada bloco assim que ele é gravado (ex.: para persistir o andamento de uma tarefa).
+    No modo 'atualizar', a planilha é lida duas vezes: a primeira só calcula o resumo por matrícula.
+    """
+    total_linhas = contar_linhas_planilha(arquivo)
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    resumo = resumir_planilha(arquivo, tamanho_bloco) if modo == 'atualizar' else None
+
+    resultado = {'processadas': 0, 'funcionarios_novos': 0, 'asos_novos': 0, 'erros': [], 'total_erros': 0}
+    inicio = time.perf_counter()
+    for bloco, numeros_linha in ler_planilha_em_blocos(arquivo, tamanho_bloco):
+        if not all(col in bloco.columns for col in COLUNAS_OBRIGATORIAS):
+            raise ValueError(f"O arquivo precisa conter as colunas {COLUNAS_OBRIGATORIAS}.")
+        parcial = ingerir_planilha(conn, bloco, numeros_linha, modo, resumo)
+        conn.commit()
+
+        for chave in ('processadas', 'funcionarios_novos', 'asos_novos', 'total_erros',
+                      'funcionarios_alterados', 'funcionarios_inalterados'):
+            if chave in parcial:
+                resultado[chave] = resultado.get(chave, 0) + parcial[chave]
+        for campo, quantidade in parcial.get('alteracoes', {}).items():
+            resultado.setdefault('alteracoes', {}).setdefault(campo, 0)
+            resultado['alteracoes'][campo] += quantidade
+        resultado['erros'].extend(parcial['erros'][:LIMITE_ERROS - len(resultado['erros'])])
+        if ao_registrar_erros and parcial['erros']:
+            ao_registrar_erros(parcial['erros'])
+
+        linhas_lidas = numeros_linha[-1] - 1
+        if ao_progredir:
+            ao_progredir(linhas_lidas, total_linhas, time.perf_counter() - inicio)
+    return resultado
@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+# --- INSTRUMENTAÇÃO DAS CONSULTAS AO BANCO ---
+# Com PAINEL_DEBUG_SQL=1, as conexões do pool (banco.py) usam um cursor que mede cada comando:
+# texto do SQL, formato dos parâmetros (nunca os valores, que podem ter dados pessoais), linhas
+# lidas ou alteradas e tempo total, incluindo a leitura das linhas. Os comandos mais lentos que
+# PAINEL_SQL_LENTA_MS vão para um log JSONL, com o EXPLAIN QUERY PLAN, e cada rerun do Streamlit
+# mostra na sidebar o resumo das consultas que executou.
+#
+# Desligada (o padrão), a conexão é a de sempre e não há custo nenhum.
+
+ATIVA = os.environ.get('PAINEL_DEBUG_SQL', '').lower() in ('1', 'true', 'sim')
+LIMITE_LENTA_MS = float(os.environ.get('PAINEL_SQL_LENTA_MS', 100))
+ARQUIVO_LOG = os.environ.get('PAINEL_SQL_LOG', 'consultas_lentas.jsonl')
+CAPTURAR_PLANO = os.environ.get('PAINEL_SQL_EXPLAIN', '1').lower() in ('1', 'true', 'sim')
+
+_PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+_ARQUIVOS_IGNORADOS = {os.path.abspath(__file__), os.path.join(_PASTA_PROJETO, 'banco.py')}
+
+_coleta = threading.local()
+_log_lock = threading.Lock()
+
+
+def forma_parametros(params, lote=None):
+    """Descreve os parâmetros sem expor os valores: quantidade, nomes ou tamanho do lote."""
+    if lote is not None:
+        return f"lote de {lote}"
+    if not params:
+        return "sem parâmetros"
+    if isinstance(params, dict):
+        return "nomeados: " + ", ".join(sorted(params))
+    return f"{len(params)} posicional(is)"
+
+
+def origem_chamada():
+    """Primeira função do projeto na pilha fora do banco/instrumentação (ex.: 'app.py:123 buscar_dados_dashboard')."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        arquivo = os.path.abspath(frame.f_code.co_filename)
+        if arquivo.startswith(_PASTA_PROJETO) and arquivo not in _ARQUIVOS_IGNORADOS:
+            return f"{os.path.basename(arquivo)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def plano_consulta(conn, sql, params):
+    """EXPLAIN QUERY PLAN do comando, como lista de linhas 'detail' (vazia se não for possível)."""
+    try:
+        linhas = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+    except sqlite3.Error:
+        return []
+    return [linha[3] for linha in linhas]
+
+
+def registrar(conn, consulta):
+    """Guarda a medição na coleta do rerun atual e, se for lenta, no log JSONL."""
+    # Os valores dos parâmetros só servem para o EXPLAIN e não ficam guardados em lugar nenhum
+    params, lote = consulta.pop('params'), consulta.pop('lote')
+    consultas = getattr(_coleta, 'consultas', None)
+    if consultas is not None:
+        consultas.append(consulta)
+    if consulta['ms'] < LIMITE_LENTA_MS:
+        return
+    if CAPTURAR_PLANO and lote is None:
+        consulta['plano'] = plano_consulta(conn, consulta['sql'], params)
+    registro = {'quando': datetime.now().isoformat(timespec='milliseconds'), **consulta}
+    with _log_lock:
+        with open(ARQUIVO_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que mede cada execute/executemany, somando o tempo das leituras até o fim do resultado."""
+
+    _consulta = None
+
+    def _iniciar(self, sql, params, lote=None):
+        self._finalizar()
+        self._consulta = {
+            'sql': " ".join(sql.split()),
+            'parametros': forma_parametros(params, lote),
+            'origem': origem_chamada(),
+            'linhas': 0,
+            'ms': 0.0,
+            'params': params,
+            'lote': lote,
+        }
+
+    def _medir(self, inicio):
+        if self._consulta is not None:
+            self._consulta['ms'] += (time.perf_counter() - inicio) * 1000
+
+    def _finalizar(self):
+        consulta, self._consulta = self._consulta, None
+        if consulta is not None:
+            consulta['ms'] = round(consulta['ms'], 3)
+            registrar(self.connection, consulta)
+
+    def execute(self, sql, params=()):
+        self._iniciar(sql, params)
+        inicio = time.perf_counter()
+        try:
+            super().execute(sql, params)
+        finally:
+            self._medir(inicio)
+        if self.description is None:
+            # Comando sem resultado (INSERT/UPDATE/DELETE/DDL): já terminou
+            self._consulta['linhas'] = max(self.rowcount, 0)
+            self._finalizar()
+        return self
+
+    def executemany(self, sql, seq_params):
+        seq_params = list(seq_params)
+        self._iniciar(sql, None, lote=len(seq_params))
+        inicio = time.perf_counter()
+        try:
+            super().executemany(sql, seq_params)
+        finally:
+            self._medir(inicio)
+        self._consulta['linhas'] = max(self.rowcount, 0)
+        self._finalizar()
+        return self
+
+    def _ler(self, leitura, *args):
+        inicio = time.perf_counter()
+        resultado = leitura(*args)
+        self._medir(inicio)
+        if self._consulta is not None:
+            if isinstance(resultado, list):
+                self._consulta['linhas'] += len(resultado)
+                # fetchall, ou fetchmany que não completou o bloco: acabou o resultado
+                if leitura.__name__ == 'fetchall' or not resultado or (args and len(resultado) < args[0]):
+                    self._finalizar()
+            elif resultado is None:
+                self._finalizar()
+            else:
+                self._consulta['linhas'] += 1
+        return resultado
+
+    def fetchone(self):
+        return self._ler(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._ler(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._ler(super().fetchall)
+
+    def __next__(self):
+        linha = self._ler(super().fetchone)
+        if linha is None:
+            raise StopIteration
+        return linha
+
+    def close(self):
+        self._finalizar()
+        super().close()
+
+    def __del__(self):
+        # Cursor abandonado sem ler tudo (ex.: conn.execute(...).fetchone())
+        try:
+            self._finalizar()
+        except Exception:
+            # No encerramento do interpretador a conexão ou o arquivo de log podem já não existir
+            pass
+
+
+def iniciar_coleta():
+    """Começa a guardar as consultas executadas por esta thread (uma coleta por rerun do Streamlit)."""
+    _coleta.consultas = []
+
+
+def consultas_coletadas():
+    """Consultas medidas desde `iniciar_coleta` nesta thread."""
+    return list(getattr(_coleta, 'consultas', None) or [])
+
+
+def resumir_consultas(consultas):
+    """Totais da coleta: quantidade, tempo, linhas e quantas passaram do limite de lentidão."""
+    return {
+        'consultas': len(consultas),
+        'ms': round(sum(c['ms'] for c in consultas), 1),
+        'linhas': sum(c['linhas'] for c in consultas),
+        'lentas': sum(1 for c in consultas if c['ms'] >= LIMITE_LENTA_MS),
+    }
+
+
+def mostrar_painel_depuracao():
+    """Painel da sidebar com as consultas deste rerun, as mais demoradas primeiro."""
+    import pandas as pd
+    import streamlit as st
+
+    consultas = consultas_coletadas()
+    totais = resumir_consultas(consultas)
+    with st.sidebar.expander(f"🐞 SQL: {totais['consultas']} consultas, {totais['ms']:.0f} ms"):
+        st.caption(f"{totais['linhas']} linhas lidas/alteradas; {totais['lentas']} acima de "
+                   f"{LIMITE_LENTA_MS:.0f} ms (registradas em {ARQUIVO_LOG}). Consultas servidas pelo cache "
+                   f"não aparecem.")
+        if consultas:
+            df = pd.DataFrame(consultas, columns=['ms', 'linhas', 'origem', 'parametros', 'sql'])
+            st.dataframe(df.sort_values('ms', ascending=False), hide_index=True, use_container_width=True)
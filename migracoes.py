@@ -0,0 +1,266 @@
+import threading
+
+from banco import get_db_connection
+import banco
+from datas import converter_datas_para_dias
+
+
+# --- MIGRAÇÕES VERSIONADAS DO SCHEMA ---
+# O schema inteiro (tabelas, índices, busca, resumos) é montado por uma lista ordenada de passos.
+# O número do último passo aplicado fica em PRAGMA user_version, no próprio arquivo do banco: cada
+# passo roda uma única vez por banco, e `garantir_schema` só consulta a versão uma vez por processo.
+# Assim a aplicação, o uploader, o gerador de dados e os scripts usam o mesmo schema, e os reruns do
+# Streamlit não executam DDL nenhum.
+#
+# Para mudar o schema, acrescente um passo no fim de MIGRACOES (nunca altere um passo já publicado).
+# Os passos usam IF NOT EXISTS sempre que possível, para também funcionarem em bancos criados antes
+# deste controle.
+
+DDL_TABELAS = [
+    """
+    CREATE TABLE IF NOT EXISTS funcionarios
+    (
+        id           INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome         TEXT NOT NULL,
+        matricula    TEXT UNIQUE,
+        cargo        TEXT,
+        cnh_tipo     TEXT,
+        cnh_validade DATE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS treinamentos
+    (
+        id               INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id   INTEGER NOT NULL,
+        nome_treinamento TEXT    NOT NULL,
+        data_realizacao  DATE,
+        validade         DATE,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios (id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS asos
+    (
+        id             INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        tipo_exame     TEXT    NOT NULL,
+        data_exame     DATE,
+        resultado      TEXT,
+        validade_aso   DATE,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios (id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS incidentes
+    (
+        id                     INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id         INTEGER,
+        data_ocorrencia        DATE NOT NULL,
+        gravidade              TEXT NOT NULL,
+        tipo_incidente         TEXT NOT NULL,
+        local_ocorrencia       TEXT,
+        causa_raiz             TEXT,
+        partes_corpo_atingidas TEXT,
+        dias_perdidos          INTEGER DEFAULT 0,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios (id) ON DELETE SET NULL
+    )
+    """,
+]
+
+# Índices secundários: filtros de vencimento, filtro por cargo e joins por funcionario_id.
+# Os índices compostos cobrem as consultas do dashboard sem precisar ler a linha da tabela.
+INDICES = [
+    "CREATE INDEX IF NOT EXISTS idx_funcionarios_cargo ON funcionarios (cargo, cnh_validade)",
+    "CREATE INDEX IF NOT EXISTS idx_funcionarios_cnh_validade ON funcionarios (cnh_validade)",
+    "CREATE INDEX IF NOT EXISTS idx_treinamentos_funcionario ON treinamentos (funcionario_id, validade)",
+    "CREATE INDEX IF NOT EXISTS idx_treinamentos_validade ON treinamentos (validade, funcionario_id)",
+    # Também impede ASO duplicado (mesmo funcionário, data e tipo de exame) no upload
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_asos_funcionario_exame ON asos (funcionario_id, data_exame, tipo_exame)",
+    "CREATE INDEX IF NOT EXISTS idx_asos_validade ON asos (validade_aso, funcionario_id)",
+    "CREATE INDEX IF NOT EXISTS idx_incidentes_funcionario ON incidentes (funcionario_id)",
+    "CREATE INDEX IF NOT EXISTS idx_incidentes_data ON incidentes (data_ocorrencia)",
+    # Cobre a contagem mensal por local das taxas de frequência/gravidade (indicadores.py)
+    "CREATE INDEX IF NOT EXISTS idx_incidentes_data_local ON incidentes (data_ocorrencia, local_ocorrencia, dias_perdidos)",
+]
+
+
+def corrigir_asos_invertidos(cursor):
+    """Desfaz a troca de data_exame e resultado dos ASOs gravados pelo uploader antigo.
+
+    O upload antigo gravava 'Apto' em data_exame e a data do exame em resultado. Precisa rodar antes
+    de remover_asos_duplicados e do índice único, que usam data_exame na chave.
+    """
+    cursor.execute("""
+                   UPDATE asos
+                   SET data_exame = resultado,
+                       resultado  = data_exame
+                   WHERE data_exame IN ('Apto', 'Inapto')
+                     AND julianday(resultado) IS NOT NULL
+                   """)
+
+
+def remover_asos_duplicados(cursor):
+    """Prepara bancos antigos para o índice único de ASOs.
+
+    Só remove cópias idênticas (mesmos valores em todas as colunas), mantendo o registro mais antigo.
+    ASOs com a mesma chave (funcionário, data e tipo de exame) mas resultado ou validade diferentes
+    não são apagados: a migração para com ValueError listando os conflitos, para serem corrigidos à mão.
+    Exames sem data não entram na comparação, já que o índice único aceita vários NULLs.
+    """
+    ja_existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_asos_funcionario_exame'").fetchone()
+    if ja_existe:
+        return
+    cursor.execute("DROP INDEX IF EXISTS idx_asos_funcionario")
+    cursor.execute("""
+                   DELETE FROM asos
+                   WHERE data_exame IS NOT NULL
+                     AND id NOT IN (SELECT MIN(id)
+                                    FROM asos
+                                    WHERE data_exame IS NOT NULL
+                                    GROUP BY funcionario_id, data_exame, tipo_exame, resultado, validade_aso)
+                   """)
+    conflitos = cursor.execute("""
+                               SELECT funcionario_id, data_exame, tipo_exame, GROUP_CONCAT(id, ', ')
+                               FROM asos
+                               WHERE data_exame IS NOT NULL
+                               GROUP BY funcionario_id, data_exame, tipo_exame
+                               HAVING COUNT(*) > 1
+                               """).fetchall()
+    if conflitos:
+        detalhes = "; ".join(f"funcionário {funcionario_id}, {tipo_exame} em {data_exame}: ids {ids}"
+                             for funcionario_id, data_exame, tipo_exame, ids in conflitos[:20])
+        raise ValueError(f"{len(conflitos)} ASO(s) com mesmo funcionário, data e tipo de exame, mas resultado ou "
+                         f"validade diferentes. Mantenha só o correto de cada um e rode a migração de novo. "
+                         f"{detalhes}")
+
+
+def criar_tabelas(cursor):
+    """Tabelas principais e índices; corrige os ASOs antigos e converte as datas (texto ISO) para número de dias."""
+    for ddl in DDL_TABELAS:
+        cursor.execute(ddl)
+    corrigir_asos_invertidos(cursor)
+    remover_asos_duplicados(cursor)
+    for ddl in INDICES:
+        cursor.execute(ddl)
+    converter_datas_para_dias(cursor)
+
+
+def criar_busca_e_resumos(cursor):
+    """Índices FTS5 de busca, resumo de incidentes e compliance_status, com seus triggers."""
+    from compliance import criar_compliance_status
+    from dados_cadastro import criar_indice_busca
+    from dados_incidentes import criar_indice_busca_incidentes
+    from resumo_incidentes import criar_resumo_incidentes
+
+    criar_indice_busca(cursor)
+    criar_indice_busca_incidentes(cursor)
+    criar_resumo_incidentes(cursor)
+    criar_compliance_status(cursor)
+
+
+def criar_caixa_alertas(cursor):
+    """Caixa de saída e registro de execuções dos alertas de vencimento."""
+    from alertas import criar_alertas
+
+    criar_alertas(cursor)
+
+
+def criar_fila_tarefas(cursor):
+    """Fila de tarefas em segundo plano e erros por linha."""
+    from tarefas import criar_tarefas
+
+    criar_tarefas(cursor)
+
+
+def criar_hashes_ingestao(cursor):
+    """Hash do conteúdo da planilha do RH por funcionário (carga em modo 'atualizar')."""
+    from ingestao import criar_hashes
+
+    criar_hashes(cursor)
+
+
+def criar_log_exportacao(cursor):
+    """Registro de UPDATEs e DELETEs para a exportação incremental ao BI, com os triggers das tabelas exportadas."""
+    from exportar_bi import criar_log_alteracoes
+
+    criar_log_alteracoes(cursor)
+
+
+# (versão, descrição, passo). A versão de cada passo é a que fica em user_version depois dele.
+MIGRACOES = [
+    (1, "tabelas, índices e datas em número de dias", criar_tabelas),
+    (2, "busca FTS5, resumo de incidentes e compliance_status", criar_busca_e_resumos),
+    (3, "caixa de saída dos alertas de vencimento", criar_caixa_alertas),
+    (4, "fila de tarefas em segundo plano", criar_fila_tarefas),
+    (5, "hashes da planilha do RH para a carga diferencial", criar_hashes_ingestao),
+    (6, "registro de alterações da exportação incremental para BI", criar_log_exportacao),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+def versao_banco(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migracoes(conn=None):
+    """Aplica, em ordem, os passos com versão maior que a do banco. Retorna as versões aplicadas.
+
+    Cada passo roda em sua própria transação (BEGIN IMMEDIATE), junto com a troca de user_version:
+    se falhar, o banco fica na versão anterior. Com dois processos subindo ao mesmo tempo, o segundo
+    espera o lock e, ao reler a versão, encontra o passo já aplicado.
+    """
+    fechar = conn is None
+    conn = conn or get_db_connection()
+    aplicadas = []
+    try:
+        for versao, descricao, passo in MIGRACOES:
+            if versao <= versao_banco(conn):
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if versao > versao_banco(conn):
+                    passo(conn.cursor())
+                    conn.execute(f"PRAGMA user_version = {versao}")
+                    aplicadas.append(versao)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        if aplicadas:
+            conn.execute("PRAGMA optimize;")
+    finally:
+        if fechar:
+            conn.close()
+    return aplicadas
+
+
+_verificados = set()
+_lock = threading.Lock()
+
+
+def garantir_schema():
+    """Deixa o banco configurado em banco.DB_FILE na versão atual, uma única vez por processo e arquivo."""
+    chave = banco.DB_FILE
+    if chave in _verificados:
+        return []
+    with _lock:
+        if chave in _verificados:
+            return []
+        aplicadas = aplicar_migracoes()
+        _verificados.add(chave)
+    return aplicadas
+
+
+if __name__ == "__main__":
+    # python migracoes.py  -> aplica as migrações pendentes e mostra a versão do banco
+    aplicadas = aplicar_migracoes()
+    conn = get_db_connection()
+    versao = versao_banco(conn)
+    conn.close()
+    descricoes = {v: d for v, d, _ in MIGRACOES}
+    for v in aplicadas:
+        print(f"Aplicada a versão {v}: {descricoes[v]}")
+    print(f"Banco {banco.DB_FILE} na versão {versao} (atual: {VERSAO_ATUAL}).")
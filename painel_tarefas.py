@@ -0,0 +1,72 @@
+import streamlit as st
+from tarefas import buscar_erros_tarefa, listar_tarefas
+
+
+# --- ANDAMENTO DAS TAREFAS EM SEGUNDO PLANO ---
+# A lista é um fragmento: enquanto houver tarefa na fila ou em execução, só ele é refeito a cada
+# INTERVALO_ATUALIZACAO segundos (uma consulta na tabela `tarefas`), sem rodar a página inteira.
+# Quando a última termina, a página é recarregada uma vez para mostrar os dados novos.
+
+INTERVALO_ATUALIZACAO = 2
+
+ROTULOS_STATUS = {'pendente': "⏳ Na fila", 'executando': "⚙️ Executando", 'concluida': "✅ Concluída",
+                  'erro': "❌ Erro"}
+
+ROTULOS_CAMPOS = {'nome': "nome", 'cargo': "função", 'cnh_validade': "CNH", 'validade_aso': "validade do ASO"}
+
+
+def descrever_resultado(tarefa):
+    resultado = tarefa['resultado'] or {}
+    if tarefa['tipo'] == 'upload_planilha':
+        texto = (f"{resultado.get('processadas', 0):,} linhas processadas ({resultado.get('funcionarios_novos', 0):,} "
+                 f"funcionários novos, {resultado.get('asos_novos', 0):,} ASOs novos).")
+        if 'funcionarios_alterados' in resultado:
+            alteracoes = ", ".join(f"{ROTULOS_CAMPOS[campo]} {quantidade:,}"
+                                   for campo, quantidade in resultado.get('alteracoes', {}).items() if quantidade)
+            texto += (f" {resultado['funcionarios_alterados']:,} alterados{f' ({alteracoes})' if alteracoes else ''}, "
+                      f"{resultado['funcionarios_inalterados']:,} sem mudança.")
+        return texto
+    if tarefa['tipo'] == 'importacao_registros':
+        return (f"{resultado.get('inseridos', 0):,} {resultado.get('destino', 'registros')} inseridos, "
+                f"{resultado.get('ignorados', 0):,} já existentes ou repetidos.")
+    if tarefa['tipo'] == 'exportacao_bi':
+        return f"{resultado.get('tabelas', 0)} tabelas, {resultado.get('linhas', 0):,} linhas exportadas."
+    return ""
+
+
+def mostrar_tarefa(tarefa):
+    with st.container(border=True):
+        st.markdown(f"**#{tarefa['id']} {tarefa['descricao'] or tarefa['tipo']}** — {ROTULOS_STATUS[tarefa['status']]}")
+        if tarefa['status'] == 'executando':
+            linhas, total = tarefa['linhas_processadas'], tarefa['total_linhas']
+            if total:
+                st.progress(min(linhas / total, 1.0), text=f"{linhas:,} de {total:,}")
+            else:
+                st.caption(f"{linhas:,} processadas até agora")
+        elif tarefa['status'] == 'concluida':
+            st.caption(f"{descrever_resultado(tarefa)} Concluída em {tarefa['concluida_em']}.")
+        elif tarefa['status'] == 'erro':
+            st.error(tarefa['erro'])
+        else:
+            st.caption(f"Enviada em {tarefa['criada_em']}.")
+
+        if tarefa['total_erros']:
+            with st.expander(f"{tarefa['total_erros']:,} linhas não puderam ser processadas"):
+                st.dataframe(buscar_erros_tarefa(tarefa['id']), use_container_width=True)
+
+
+def mostrar_tarefas(tipo=None, limite=5):
+    """Mostra as tarefas mais recentes (de um tipo ou todas), atualizando sozinho enquanto alguma estiver ativa."""
+    ativas = any(t['status'] in ('pendente', 'executando') for t in listar_tarefas(tipo, limite))
+
+    @st.fragment(run_every=INTERVALO_ATUALIZACAO if ativas else None)
+    def lista():
+        tarefas = listar_tarefas(tipo, limite)
+        if not tarefas:
+            st.info("Nenhuma tarefa enviada ainda.")
+        for tarefa in tarefas:
+            mostrar_tarefa(tarefa)
+        if ativas and not any(t['status'] in ('pendente', 'executando') for t in tarefas):
+            st.rerun()
+
+    lista()
@@ -0,0 +1,151 @@
+from banco import get_db_connection
+from datas import sql_mes
+
+
+# --- RESUMO DE INCIDENTES MANTIDO POR TRIGGERS ---
+# Os gráficos do dashboard não leem a tabela incidentes: leem incidentes_resumo, com uma linha por
+# (cargo, mês, gravidade, tipo) e as contagens já somadas. Os triggers atualizam o resumo a cada
+# INSERT/UPDATE/DELETE em incidentes e quando o cargo de um funcionário muda, então o custo dos
+# gráficos depende do número de categorias, não do número de incidentes.
+#
+# Incidentes sem funcionário (terceiros) ou de funcionário sem cargo ficam com cargo = ''.
+
+DDL_RESUMO = """
+    CREATE TABLE IF NOT EXISTS incidentes_resumo
+    (
+        cargo          TEXT    NOT NULL,
+        mes            TEXT    NOT NULL,
+        gravidade      TEXT    NOT NULL,
+        tipo_incidente TEXT    NOT NULL,
+        quantidade     INTEGER NOT NULL,
+        dias_perdidos  INTEGER NOT NULL,
+        PRIMARY KEY (cargo, mes, gravidade, tipo_incidente)
+    ) WITHOUT ROWID
+"""
+
+# Chave de resumo de um incidente (i) e do cargo do seu funcionário
+CARGO_INCIDENTE = "COALESCE((SELECT cargo FROM funcionarios WHERE id = {i}.funcionario_id), '')"
+MES_INCIDENTE = sql_mes("{i}.data_ocorrencia")
+
+SOMAR_INCIDENTE = f"""
+        INSERT INTO incidentes_resumo (cargo, mes, gravidade, tipo_incidente, quantidade, dias_perdidos)
+        VALUES ({CARGO_INCIDENTE.format(i='new')}, {MES_INCIDENTE.format(i='new')}, new.gravidade,
+                new.tipo_incidente, 1, COALESCE(new.dias_perdidos, 0))
+        ON CONFLICT (cargo, mes, gravidade, tipo_incidente) DO UPDATE
+            SET quantidade    = quantidade + 1,
+                dias_perdidos = dias_perdidos + excluded.dias_perdidos;
+"""
+
+SUBTRAIR_INCIDENTE = f"""
+        UPDATE incidentes_resumo
+        SET quantidade    = quantidade - 1,
+            dias_perdidos = dias_perdidos - COALESCE(old.dias_perdidos, 0)
+        WHERE cargo = {CARGO_INCIDENTE.format(i='old')}
+          AND mes = {MES_INCIDENTE.format(i='old')}
+          AND gravidade = old.gravidade
+          AND tipo_incidente = old.tipo_incidente;
+"""
+
+REMOVER_ZERADOS = "DELETE FROM incidentes_resumo WHERE quantidade <= 0;"
+
+
+def mover_incidentes_funcionario(cargo_antigo, cargo_novo, funcionario):
+    """Corpo de trigger que transfere os incidentes de um funcionário de um cargo para outro no resumo."""
+    agrupados = f"""
+        SELECT {sql_mes('data_ocorrencia')} AS mes, gravidade, tipo_incidente,
+               COUNT(*) AS quantidade, SUM(COALESCE(dias_perdidos, 0)) AS dias_perdidos
+        FROM incidentes
+        WHERE funcionario_id = {funcionario}.id
+        GROUP BY 1, 2, 3
+    """
+    return f"""
+        UPDATE incidentes_resumo
+        SET quantidade    = incidentes_resumo.quantidade - m.quantidade,
+            dias_perdidos = incidentes_resumo.dias_perdidos - m.dias_perdidos
+        FROM ({agrupados}) AS m
+        WHERE incidentes_resumo.cargo = COALESCE({cargo_antigo}, '')
+          AND incidentes_resumo.mes = m.mes
+          AND incidentes_resumo.gravidade = m.gravidade
+          AND incidentes_resumo.tipo_incidente = m.tipo_incidente;
+        INSERT INTO incidentes_resumo (cargo, mes, gravidade, tipo_incidente, quantidade, dias_perdidos)
+        SELECT COALESCE({cargo_novo}, ''), mes, gravidade, tipo_incidente, quantidade, dias_perdidos
+        FROM ({agrupados})
+        WHERE true
+        ON CONFLICT (cargo, mes, gravidade, tipo_incidente) DO UPDATE
+            SET quantidade    = quantidade + excluded.quantidade,
+                dias_perdidos = dias_perdidos + excluded.dias_perdidos;
+        {REMOVER_ZERADOS}
+    """
+
+
+TRIGGERS_RESUMO = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_incidentes_resumo_insert AFTER INSERT ON incidentes BEGIN
+        {SOMAR_INCIDENTE}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_incidentes_resumo_delete AFTER DELETE ON incidentes BEGIN
+        {SUBTRAIR_INCIDENTE}
+        {REMOVER_ZERADOS}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_incidentes_resumo_update
+        AFTER UPDATE OF funcionario_id, data_ocorrencia, gravidade, tipo_incidente, dias_perdidos ON incidentes BEGIN
+        {SUBTRAIR_INCIDENTE}
+        {SOMAR_INCIDENTE}
+        {REMOVER_ZERADOS}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_funcionarios_resumo_cargo
+        AFTER UPDATE OF cargo ON funcionarios WHEN old.cargo IS NOT new.cargo BEGIN
+        {mover_incidentes_funcionario('old.cargo', 'new.cargo', 'new')}
+    END
+    """,
+    # Ao remover um funcionário, o ON DELETE SET NULL dos incidentes dispara o trigger de UPDATE acima
+    # quando o funcionário já não existe (cargo ''). Por isso os incidentes são movidos para '' antes.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_funcionarios_resumo_delete BEFORE DELETE ON funcionarios BEGIN
+        {mover_incidentes_funcionario('old.cargo', 'NULL', 'old')}
+    END
+    """,
+]
+
+SQL_RECONSTRUIR = f"""
+    INSERT INTO incidentes_resumo (cargo, mes, gravidade, tipo_incidente, quantidade, dias_perdidos)
+    SELECT COALESCE(f.cargo, ''), {MES_INCIDENTE.format(i='i')}, i.gravidade, i.tipo_incidente,
+           COUNT(*), SUM(COALESCE(i.dias_perdidos, 0))
+    FROM incidentes i
+             LEFT JOIN funcionarios f ON i.funcionario_id = f.id
+    GROUP BY 1, 2, 3, 4
+"""
+
+
+def criar_resumo_incidentes(cursor):
+    """Cria a tabela de resumo e seus triggers. Na primeira vez, calcula o resumo dos incidentes existentes."""
+    ja_existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'incidentes_resumo'").fetchone()
+    cursor.execute(DDL_RESUMO)
+    for ddl in TRIGGERS_RESUMO:
+        cursor.execute(ddl)
+    if not ja_existe:
+        reconstruir_resumo(cursor)
+
+
+def reconstruir_resumo(cursor):
+    """Recalcula o resumo do zero a partir da tabela incidentes (não faz commit)."""
+    cursor.execute("DELETE FROM incidentes_resumo")
+    cursor.execute(SQL_RECONSTRUIR)
+
+
+if __name__ == "__main__":
+    # python resumo_incidentes.py  -> recalcula incidentes_resumo a partir dos incidentes
+    conn = get_db_connection()
+    criar_resumo_incidentes(conn)
+    reconstruir_resumo(conn)
+    conn.commit()
+    total = conn.execute("SELECT COUNT(*), COALESCE(SUM(quantidade), 0) FROM incidentes_resumo").fetchone()
+    conn.close()
+    print(f"Resumo reconstruído: {total[0]} linhas, {total[1]} incidentes.")
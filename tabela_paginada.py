@@ -0,0 +1,134 @@
+import streamlit as st
+import pandas as pd
+from banco import get_db_connection, cache_consulta
+from datas import COLUNAS_DATA, sql_texto
+
+
+# --- TABELA PAGINADA NO SERVIDOR ---
+# Em vez de mandar a tabela inteira para o navegador, cada página é buscada no SQLite com
+# paginação por chave (keyset): a próxima página começa logo depois da (coluna de ordenação, id)
+# da última linha mostrada, então ir para a página 500 custa o mesmo que ir para a página 2.
+# Ordenação e filtro viram ORDER BY e WHERE na consulta; o total vem de um COUNT em cache.
+#
+# O SQLite ordena NULL antes de qualquer valor. Para o keyset funcionar com NULLs, cada página é
+# buscada em dois "segmentos" (linhas com a coluna NULL e linhas com valor), na ordem em que
+# aparecem na ordenação escolhida.
+
+TAMANHOS_PAGINA = [25, 50, 100, 500]
+
+# Datas ficam gravadas em número de dias: o filtro "contém" compara com o texto AAAA-MM-DD
+_COLUNAS_DATA = {coluna for colunas in COLUNAS_DATA.values() for coluna in colunas}
+
+
+def montar_filtro(filtros):
+    """Converte ((coluna, texto), ...) em (cláusula WHERE, parâmetros). Os textos são buscados com LIKE."""
+    condicoes, params = [], []
+    for coluna, texto in filtros:
+        expressao = sql_texto(f"q.{coluna}") if coluna in _COLUNAS_DATA else f"CAST(q.{coluna} AS TEXT)"
+        condicoes.append(f"{expressao} LIKE ?")
+        params.append(f"%{texto}%")
+    return " AND ".join(condicoes) or "1 = 1", params
+
+
+@cache_consulta
+def contar_registros(base_query, filtros=()):
+    """Total de linhas da consulta com os filtros aplicados."""
+    where, params = montar_filtro(filtros)
+    conn = get_db_connection()
+    total = conn.execute(f"SELECT COUNT(*) FROM ({base_query}) AS q WHERE {where}", params).fetchone()[0]
+    conn.close()
+    return total
+
+
+@cache_consulta
+def buscar_pagina(base_query, ordenar_por='id', decrescente=False, filtros=(), cursor=None, tamanho=50):
+    """Busca uma página da consulta `base_query` (que precisa ter uma coluna `id`).
+
+    `cursor` é None para a primeira página ou o valor retornado para a página anterior. Retorna
+    (DataFrame da página, cursor da próxima página ou None se esta for a última).
+    """
+    where, params_filtro = montar_filtro(filtros)
+    direcao, comparacao = ("DESC", "<") if decrescente else ("ASC", ">")
+    segmentos = ['valores', 'nulos'] if decrescente else ['nulos', 'valores']
+    if ordenar_por == 'id':
+        segmentos = ['valores']
+
+    if cursor is not None:
+        segmentos = segmentos[segmentos.index(cursor[0]):]
+
+    conn = get_db_connection()
+    partes = []
+    # Uma linha a mais que o tamanho da página indica se existe próxima página, sem outro COUNT
+    restante = tamanho + 1
+    for segmento in segmentos:
+        condicoes, params = [where], list(params_filtro)
+        if ordenar_por != 'id':
+            condicoes.append(f"q.{ordenar_por} IS NULL" if segmento == 'nulos' else f"q.{ordenar_por} IS NOT NULL")
+        if cursor is not None and cursor[0] == segmento:
+            _, valor, ultimo_id = cursor
+            if segmento == 'nulos' or ordenar_por == 'id':
+                condicoes.append(f"q.id {comparacao} ?")
+                params.append(ultimo_id)
+            else:
+                # "coluna >= valor" deixa o SQLite começar a leitura do índice direto no ponto certo
+                condicoes.append(f"q.{ordenar_por} {comparacao}= ? AND (q.{ordenar_por} {comparacao} ? OR q.id {comparacao} ?)")
+                params.extend([valor, valor, ultimo_id])
+
+        ordem = "q.id" if ordenar_por == 'id' else f"q.{ordenar_por} {direcao}, q.id"
+        query = f"SELECT * FROM ({base_query}) AS q WHERE {' AND '.join(condicoes)} ORDER BY {ordem} {direcao} LIMIT ?"
+        parte = pd.read_sql_query(query, conn, params=params + [restante])
+        if not parte.empty:
+            partes.append(parte.assign(_segmento=segmento))
+        restante -= len(parte)
+        if restante == 0:
+            break
+    conn.close()
+
+    pagina = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    proximo = None
+    if len(pagina) > tamanho:
+        pagina = pagina.iloc[:tamanho]
+        ultima = pagina.iloc[-1]
+        valor = None if ordenar_por == 'id' else ultima[ordenar_por]
+        # Tipos do numpy viram parâmetros inválidos no sqlite3; .item() devolve o valor Python
+        proximo = (ultima['_segmento'], valor.item() if hasattr(valor, 'item') else valor, int(ultima['id']))
+    return pagina.drop(columns='_segmento', errors='ignore'), proximo
+
+
+def mostrar_tabela_paginada(chave, base_query, colunas, ordenar_por='id', decrescente=False):
+    """Mostra `base_query` em uma tabela paginada, com ordenação e filtro executados no banco.
+
+    `chave` identifica a tabela no st.session_state e `colunas` são as colunas que o usuário pode
+    usar para ordenar e filtrar (os nomes entram no SQL, então nunca devem vir do usuário).
+    """
+    col_ordem, col_direcao, col_filtro, col_texto, col_tamanho = st.columns([2, 1, 2, 3, 1])
+    ordenar_por = col_ordem.selectbox("Ordenar por", colunas, index=colunas.index(ordenar_por),
+                                      key=f"{chave}_ordem")
+    decrescente = col_direcao.toggle("Decrescente", value=decrescente, key=f"{chave}_desc")
+    coluna_filtro = col_filtro.selectbox("Filtrar coluna", colunas, key=f"{chave}_coluna_filtro")
+    texto_filtro = col_texto.text_input("Contém", key=f"{chave}_texto_filtro").strip()
+    tamanho = col_tamanho.selectbox("Linhas", TAMANHOS_PAGINA, index=1, key=f"{chave}_tamanho")
+    filtros = ((coluna_filtro, texto_filtro),) if texto_filtro else ()
+
+    # Trocar ordenação, filtro ou tamanho volta para a primeira página
+    assinatura = (ordenar_por, decrescente, filtros, tamanho)
+    if st.session_state.get(f"{chave}_assinatura") != assinatura:
+        st.session_state[f"{chave}_assinatura"] = assinatura
+        st.session_state[f"{chave}_cursores"] = [None]
+    cursores = st.session_state[f"{chave}_cursores"]
+
+    pagina, proximo = buscar_pagina(base_query, ordenar_por, decrescente, filtros, cursores[-1], tamanho)
+    total = contar_registros(base_query, filtros)
+    st.dataframe(pagina, use_container_width=True, hide_index=True)
+
+    col_anterior, col_info, col_proxima = st.columns([1, 4, 1])
+    if col_anterior.button("◀ Anterior", key=f"{chave}_anterior", disabled=len(cursores) == 1,
+                           use_container_width=True):
+        cursores.pop()
+        st.rerun()
+    total_paginas = max(1, -(-total // tamanho))
+    col_info.caption(f"Página {len(cursores)} de {total_paginas} — {total} registros")
+    if col_proxima.button("Próxima ▶", key=f"{chave}_proxima", disabled=proximo is None,
+                          use_container_width=True):
+        cursores.append(proximo)
+        st.rerun()
@@ -0,0 +1,385 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from banco import get_db_connection, ler_dataframe
+
+
+# --- TAREFAS EM SEGUNDO PLANO (UPLOADS E EXPORTAÇÕES) ---
+# Trabalhos longos não rodam mais no rerun do Streamlit: a tela grava a tarefa na tabela `tarefas`
+# (e o arquivo enviado em PASTA_ARQUIVOS) e volta na hora. Um pool de threads do próprio servidor,
+# ou um processo separado (python tarefas.py), pega as tarefas pendentes em ordem e grava o andamento
+# (linhas, total, erros por linha) enquanto executa; a tela só consulta a tabela. Assim a carga
+# continua mesmo que o navegador seja recarregado, não trava as outras telas e várias pessoas podem
+# enfileirar trabalhos ao mesmo tempo.
+#
+# Quem executa uma tarefa marca nela um identificador do processo e renova `atualizada_em` a cada
+# BATIMENTO_SEGUNDOS. Se o processo morrer no meio, a tarefa para de ser renovada e, depois de
+# ABANDONO_SEGUNDOS, volta para a fila: os três tipos de tarefa (upload da planilha, importação de
+# registros e exportação para BI) podem ser repetidos sem duplicar dados.
+
+PASTA_ARQUIVOS = os.environ.get('PAINEL_TAREFAS_PASTA', 'tarefas_arquivos')
+NUM_WORKERS = int(os.environ.get('PAINEL_TAREFAS_WORKERS', 2))
+ESPERA_SEGUNDOS = float(os.environ.get('PAINEL_TAREFAS_ESPERA', 2))
+BATIMENTO_SEGUNDOS = 30
+ABANDONO_SEGUNDOS = int(os.environ.get('PAINEL_TAREFAS_ABANDONO', 300))
+LIMITE_ERROS = 1000  # erros por linha guardados por tarefa; o total continua sendo contado
+
+# Identifica este processo nas tarefas que ele executa
+EXECUTOR = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+DDL_TAREFAS = [
+    """
+    CREATE TABLE IF NOT EXISTS tarefas
+    (
+        id                 INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo               TEXT    NOT NULL,
+        descricao          TEXT,
+        parametros         TEXT    NOT NULL DEFAULT '{}',
+        arquivo            TEXT,
+        status             TEXT    NOT NULL DEFAULT 'pendente',
+        executor           TEXT,
+        criada_em          TEXT    NOT NULL,
+        iniciada_em        TEXT,
+        atualizada_em      TEXT,
+        concluida_em       TEXT,
+        linhas_processadas INTEGER NOT NULL DEFAULT 0,
+        total_linhas       INTEGER,
+        total_erros        INTEGER NOT NULL DEFAULT 0,
+        resultado          TEXT,
+        erro               TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (status, tipo)",
+    """
+    CREATE TABLE IF NOT EXISTS tarefas_erros
+    (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        tarefa_id INTEGER NOT NULL,
+        linha     INTEGER,
+        matricula TEXT,
+        erro      TEXT    NOT NULL,
+        FOREIGN KEY (tarefa_id) REFERENCES tarefas (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tarefas_erros_tarefa ON tarefas_erros (tarefa_id, linha)",
+]
+
+# Reserva a próxima tarefa pendente em um único comando (seguro com vários workers e processos).
+# Tipos exclusivos não rodam duas vezes ao mesmo tempo (a exportação grava sempre os mesmos arquivos).
+SQL_RESERVAR_TAREFA = """
+    UPDATE tarefas
+    SET status        = 'executando',
+        executor      = :executor,
+        iniciada_em   = datetime('now', 'localtime'),
+        atualizada_em = datetime('now', 'localtime')
+    WHERE id = (SELECT t.id
+                FROM tarefas t
+                WHERE t.status = 'pendente'
+                  AND NOT (t.tipo IN ({exclusivos})
+                      AND EXISTS (SELECT 1 FROM tarefas e WHERE e.status = 'executando' AND e.tipo = t.tipo))
+                ORDER BY t.id
+                LIMIT 1)
+    RETURNING id, tipo, parametros, arquivo
+"""
+
+SQL_LISTAR_TAREFAS = """
+    SELECT id, tipo, descricao, status, criada_em, iniciada_em, concluida_em, linhas_processadas, total_linhas,
+           total_erros, resultado, erro
+    FROM tarefas
+    {filtro}
+    ORDER BY id DESC
+    LIMIT :limite
+"""
+
+
+def criar_tarefas(cursor):
+    """Cria a fila de tarefas e a tabela de erros por linha (passo 4 de migracoes.py)."""
+    for ddl in DDL_TAREFAS:
+        cursor.execute(ddl)
+
+
+# --- TIPOS DE TAREFA ---
+# Cada tipo é uma função (tarefa, progresso, registrar_erros) -> dicionário com o resumo do resultado.
+# `tarefa` traz 'id', 'parametros' (dict) e 'arquivo'; `progresso(linhas, total)` e
+# `registrar_erros([{'linha', 'matricula', 'erro'}, ...])` gravam o andamento na hora.
+
+def executar_upload_planilha(tarefa, progresso, registrar_erros):
+    """Carga da planilha de funcionários e ASOs em blocos (um commit por bloco, ver ingestao.py)."""
+    from ingestao import ingerir_planilha_em_blocos
+
+    conn = get_db_connection()
+    try:
+        resultado = ingerir_planilha_em_blocos(
+            conn, tarefa['arquivo'], ao_progredir=lambda lidas, total, _segundos: progresso(lidas, total),
+            ao_registrar_erros=registrar_erros, modo=tarefa['parametros'].get('modo', 'inserir'))
+    finally:
+        conn.close()
+    del resultado['erros']
+    return resultado
+
+
+def executar_exportacao_bi(tarefa, progresso, registrar_erros):
+    """Exportação para BI (exportar_bi.py), com o andamento contado em tabelas exportadas."""
+    from exportar_bi import exportar_tabelas
+
+    parametros = tarefa['parametros']
+    resultados = exportar_tabelas(parametros.get('formato', 'csv'), parametros.get('incremental', False),
+                                  ao_progredir=progresso)
+    registrar_erros([{'linha': None, 'matricula': None, 'erro': f"{r['tabela']}: {r['erro']}"}
+                     for r in resultados if r['erro']])
+    return {'tabelas': len(resultados), 'linhas': sum(r['linhas'] for r in resultados),
+            'bytes': sum(r['bytes'] for r in resultados)}
+
+
+def executar_importacao_registros(tarefa, progresso, registrar_erros):
+    """Carga em massa de treinamentos ou incidentes (importacao.py), numa única transação."""
+    from importacao import importar_registros, ler_arquivo
+
+    parametros = tarefa['parametros']
+    df = ler_arquivo(tarefa['arquivo'])
+    progresso(0, len(df))
+    conn = get_db_connection()
+    try:
+        resultado = importar_registros(conn, df, parametros['destino'], parametros.get('mapeamento'))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    registrar_erros(resultado.pop('erros'))
+    progresso(len(df), len(df))
+    return {'destino': parametros['destino'], **resultado}
+
+
+TIPOS = {'upload_planilha': executar_upload_planilha, 'exportacao_bi': executar_exportacao_bi,
+         'importacao_registros': executar_importacao_registros}
+TIPOS_EXCLUSIVOS = ('exportacao_bi',)
+
+
+# --- FILA ---
+
+def enfileirar(tipo, descricao, parametros=None, conteudo=None, extensao=''):
+    """Grava uma tarefa pendente (e o arquivo enviado, se houver) e acorda os workers. Retorna o id."""
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de tarefa desconhecido: {tipo}. Use um de {sorted(TIPOS)}.")
+    arquivo = None
+    if conteudo is not None:
+        os.makedirs(PASTA_ARQUIVOS, exist_ok=True)
+        arquivo = os.path.abspath(os.path.join(PASTA_ARQUIVOS, f"{uuid.uuid4().hex}{extensao}"))
+        with open(arquivo, 'wb') as f:
+            f.write(conteudo)
+    conn = get_db_connection()
+    try:
+        id_tarefa = conn.execute(
+            "INSERT INTO tarefas (tipo, descricao, parametros, arquivo, criada_em) "
+            "VALUES (?, ?, ?, ?, datetime('now', 'localtime'))",
+            (tipo, descricao, json.dumps(parametros or {}), arquivo)).lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    _acordar.set()
+    return id_tarefa
+
+
+def reservar_proxima(conn):
+    """Marca a próxima tarefa pendente como 'executando' por este processo e a retorna (ou None)."""
+    # Leitura antes do UPDATE: com a fila vazia (o caso comum) o worker não chega a pedir o lock de escrita
+    if conn.execute("SELECT 1 FROM tarefas WHERE status = 'pendente' LIMIT 1").fetchone() is None:
+        return None
+    exclusivos = ", ".join(f"'{tipo}'" for tipo in TIPOS_EXCLUSIVOS)
+    linhas = conn.execute(SQL_RESERVAR_TAREFA.format(exclusivos=exclusivos), {'executor': EXECUTOR}).fetchall()
+    conn.commit()
+    if not linhas:
+        return None
+    linha = linhas[0]
+    return {'id': linha['id'], 'tipo': linha['tipo'], 'parametros': json.loads(linha['parametros']),
+            'arquivo': linha['arquivo']}
+
+
+def atualizar_tarefa(id_tarefa, **campos):
+    conn = get_db_connection()
+    try:
+        atribuicoes = ", ".join(f"{campo} = :{campo}" for campo in campos)
+        conn.execute(f"UPDATE tarefas SET {atribuicoes}, atualizada_em = datetime('now', 'localtime') "
+                     f"WHERE id = :id", {**campos, 'id': id_tarefa})
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def executar_tarefa(tarefa):
+    """Executa uma tarefa já reservada, gravando andamento, erros por linha e o resultado final."""
+    erros_gravados = 0
+    total_erros = 0
+
+    def progresso(linhas, total=None):
+        atualizar_tarefa(tarefa['id'], linhas_processadas=linhas, total_linhas=total)
+
+    def registrar_erros(erros):
+        nonlocal erros_gravados, total_erros
+        total_erros += len(erros)
+        novos = erros[:max(LIMITE_ERROS - erros_gravados, 0)]
+        erros_gravados += len(novos)
+        conn = get_db_connection()
+        try:
+            conn.executemany("INSERT INTO tarefas_erros (tarefa_id, linha, matricula, erro) VALUES (?, ?, ?, ?)",
+                             [(tarefa['id'], erro.get('linha'), erro.get('matricula'), erro['erro']) for erro in novos])
+            conn.execute("UPDATE tarefas SET total_erros = ? WHERE id = ?", (total_erros, tarefa['id']))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # Uma tarefa devolvida à fila recomeça do zero
+    conn = get_db_connection()
+    conn.execute("DELETE FROM tarefas_erros WHERE tarefa_id = ?", (tarefa['id'],))
+    conn.commit()
+    conn.close()
+
+    try:
+        resultado = TIPOS[tarefa['tipo']](tarefa, progresso, registrar_erros)
+        atualizar_tarefa(tarefa['id'], status='concluida', resultado=json.dumps(resultado),
+                         concluida_em=time.strftime('%Y-%m-%d %H:%M:%S'), erro=None)
+    except Exception as e:
+        atualizar_tarefa(tarefa['id'], status='erro', erro=str(e) or type(e).__name__,
+                         concluida_em=time.strftime('%Y-%m-%d %H:%M:%S'))
+    if tarefa['arquivo'] and os.path.exists(tarefa['arquivo']):
+        os.remove(tarefa['arquivo'])
+
+
+def devolver_abandonadas(conn):
+    """Devolve à fila as tarefas 'executando' cujo processo parou de renovar `atualizada_em`."""
+    devolvidas = conn.execute("""
+        UPDATE tarefas
+        SET status = 'pendente', executor = NULL, linhas_processadas = 0, total_erros = 0
+        WHERE status = 'executando'
+          AND atualizada_em < datetime('now', 'localtime', ?)
+    """, (f"-{ABANDONO_SEGUNDOS} seconds",)).rowcount
+    conn.commit()
+    return devolvidas
+
+
+def renovar_tarefas(conn):
+    """Batimento: mostra que as tarefas em execução neste processo continuam vivas e recupera as abandonadas.
+
+    Só renova as tarefas que um worker deste processo está executando agora (`_em_execucao`): uma
+    tarefa cujo status final não pôde ser gravado deixa de ser renovada e volta para a fila depois
+    de ABANDONO_SEGUNDOS.
+    """
+    with _lock_execucao:
+        em_execucao = sorted(_em_execucao)
+    if em_execucao:
+        conn.execute("UPDATE tarefas SET atualizada_em = datetime('now', 'localtime') "
+                     "WHERE status = 'executando' AND executor = ? AND id IN (SELECT value FROM json_each(?))",
+                     (EXECUTOR, json.dumps(em_execucao)))
+        conn.commit()
+    if devolver_abandonadas(conn):
+        _acordar.set()
+
+
+# --- WORKERS ---
+
+_acordar = threading.Event()
+_parar = None
+_lock = threading.Lock()
+_em_execucao = set()  # ids das tarefas que os workers deste processo estão executando
+_lock_execucao = threading.Lock()
+
+
+def laco_worker(parar):
+    """Executa tarefas enquanto houver; sem tarefas, espera ser acordado ou ESPERA_SEGUNDOS."""
+    while not parar.is_set():
+        conn = get_db_connection()
+        try:
+            tarefa = reservar_proxima(conn)
+        except sqlite3.OperationalError:
+            # Banco ocupado: tenta de novo na próxima volta
+            conn.rollback()
+            tarefa = None
+        finally:
+            conn.close()
+        if tarefa is None:
+            _acordar.wait(ESPERA_SEGUNDOS)
+            _acordar.clear()
+            continue
+        with _lock_execucao:
+            _em_execucao.add(tarefa['id'])
+        try:
+            executar_tarefa(tarefa)
+        except sqlite3.Error as e:
+            # Não deu para gravar o status final: o batimento para e a tarefa volta para a fila depois
+            print(f"Tarefa #{tarefa['id']} interrompida: {e}", flush=True)
+        finally:
+            with _lock_execucao:
+                _em_execucao.discard(tarefa['id'])
+
+
+def laco_batimento(parar):
+    while not parar.wait(BATIMENTO_SEGUNDOS):
+        conn = get_db_connection()
+        try:
+            renovar_tarefas(conn)
+        except sqlite3.OperationalError:
+            conn.rollback()
+        finally:
+            conn.close()
+
+
+def iniciar_workers(quantidade=NUM_WORKERS):
+    """Sobe (uma vez por processo) `quantidade` threads de execução e a de batimento. Retorna o evento de parada."""
+    global _parar
+    with _lock:
+        if _parar is not None or quantidade <= 0:
+            return _parar
+        _parar = threading.Event()
+        conn = get_db_connection()
+        devolver_abandonadas(conn)
+        conn.close()
+        threading.Thread(target=laco_batimento, args=(_parar,), name="tarefas-batimento", daemon=True).start()
+        for i in range(quantidade):
+            threading.Thread(target=laco_worker, args=(_parar,), name=f"tarefas-{i}", daemon=True).start()
+        return _parar
+
+
+# --- CONSULTAS PARA A TELA ---
+
+def listar_tarefas(tipo=None, limite=10):
+    """As `limite` tarefas mais recentes (opcionalmente de um tipo), como dicionários. Sem cache: a tela consulta o andamento."""
+    filtro = "WHERE tipo = :tipo" if tipo else ""
+    conn = get_db_connection()
+    linhas = conn.execute(SQL_LISTAR_TAREFAS.format(filtro=filtro), {'tipo': tipo, 'limite': limite}).fetchall()
+    conn.close()
+    tarefas = []
+    for linha in linhas:
+        tarefa = dict(linha)
+        tarefa['resultado'] = json.loads(tarefa['resultado']) if tarefa['resultado'] else None
+        tarefas.append(tarefa)
+    return tarefas
+
+
+def buscar_erros_tarefa(id_tarefa):
+    return ler_dataframe("SELECT linha, matricula, erro FROM tarefas_erros WHERE tarefa_id = ? ORDER BY linha, id",
+                         (id_tarefa,))
+
+
+if __name__ == "__main__":
+    # python tarefas.py [--workers N]  -> processo dedicado que executa as tarefas enfileiradas pelas telas
+    from migracoes import garantir_schema
+
+    parser = argparse.ArgumentParser(description="Executa as tarefas em segundo plano (uploads e exportações).")
+    parser.add_argument('--workers', type=int, default=max(NUM_WORKERS, 1), help="tarefas executadas em paralelo")
+    args = parser.parse_args()
+    garantir_schema()
+    parar = iniciar_workers(args.workers)
+    print(f"Executando tarefas com {args.workers} worker(s) ({EXECUTOR}). Ctrl+C para sair.", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        parar.set()
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import pytest
+
+import banco
+from alertas import executar_ciclo
+from dados_dashboard import buscar_detalhes_pendencias, calcular_kpis
+from migracoes import aplicar_migracoes
+
+
+@pytest.fixture
+def conn(tmp_path):
+    original = banco.DB_FILE
+    banco.configurar_banco(db_file=str(tmp_path / "teste.db"))
+    aplicar_migracoes()
+    conexao = banco.get_db_connection()
+    yield conexao
+    conexao.close()
+    banco.configurar_banco(db_file=original)
+
+
+def test_situacao_calculada_na_leitura_sem_escrever(conn):
+    hoje = date.today()
+    conn.executemany("INSERT INTO funcionarios (nome, matricula, cargo, cnh_validade) VALUES (?, ?, 'Motorista', ?)",
+                     [('Ana', '1', hoje + timedelta(days=10)), ('Bia', '2', hoje - timedelta(days=1)),
+                      ('Caio', '3', hoje + timedelta(days=90))])
+    # Situação gravada de dias atrás: a CNH da Ana ainda consta como válida
+    conn.execute("UPDATE compliance_status SET status = 'valido' WHERE funcionario_id = 1")
+    conn.commit()
+
+    # Uma carga segurando o lock de escrita não atrasa nem bloqueia as leituras
+    escrita = banco.get_db_connection()
+    escrita.execute("BEGIN IMMEDIATE")
+    try:
+        kpis = calcular_kpis()
+        detalhes = buscar_detalhes_pendencias()
+    finally:
+        escrita.rollback()
+        escrita.close()
+
+    assert (kpis['cnh_venc'], kpis['cnh_prox']) == (1, 1)
+    assert detalhes['cnh_prox']['nome'].tolist() == ['Ana']
+    assert detalhes['cnh_venc']['nome'].tolist() == ['Bia']
+    assert conn.execute("SELECT status FROM compliance_status WHERE funcionario_id = 1").fetchone()[0] == 'valido'
+
+    executar_ciclo()
+    assert conn.execute("SELECT status FROM compliance_status WHERE funcionario_id = 1").fetchone()[0] == 'a_vencer'
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+import pytest
+
+import banco
+from exportar_bi import TABELA_ALTERACOES, criar_triggers_exportacao, listar_tabelas, tabelas_sem_log
+from migracoes import aplicar_migracoes
+
+
+@pytest.fixture
+def conn(tmp_path):
+    original = banco.DB_FILE
+    banco.configurar_banco(db_file=str(tmp_path / "teste.db"))
+    aplicar_migracoes()
+    conexao = banco.get_db_connection()
+    yield conexao
+    conexao.close()
+    banco.configurar_banco(db_file=original)
+
+
+def test_tabelas_derivadas_ficam_fora_da_exportacao(conn):
+    tabelas = listar_tabelas(conn)
+    assert {'funcionarios', 'treinamentos', 'asos', 'incidentes'} <= set(tabelas)
+    assert 'compliance_status' not in tabelas
+    assert 'incidentes_resumo' not in tabelas
+
+
+def test_log_de_alteracoes_criado_pelas_migracoes(conn):
+    assert tabelas_sem_log(conn, listar_tabelas(conn)) == []
+
+    # Alterações feitas antes da primeira exportação também ficam registradas
+    conn.execute("INSERT INTO funcionarios (nome, matricula, cargo) VALUES ('Ana', '1', 'Motorista')")
+    conn.execute("UPDATE funcionarios SET cargo = 'Gerente' WHERE matricula = '1'")
+    conn.commit()
+    assert [tuple(linha) for linha in conn.execute(f"SELECT tabela, operacao FROM {TABELA_ALTERACOES}")] == [
+        ('funcionarios', 'U')]
+
+
+def test_reclassificacao_do_compliance_nao_gera_alteracoes(conn):
+    # Simula um banco exportado quando compliance_status ainda estava na lista, antes do passo do log
+    criar_triggers_exportacao(conn, 'compliance_status')
+    conn.execute("PRAGMA user_version = 5")
+    conn.commit()
+    aplicar_migracoes(conn)
+
+    conn.execute("INSERT INTO funcionarios (nome, matricula, cargo, cnh_validade) VALUES ('Ana', '1', 'Motorista', ?)",
+                 (date.today() + timedelta(days=365),))
+    conn.execute("UPDATE funcionarios SET cnh_validade = ? WHERE matricula = '1'", (date.today() - timedelta(days=1),))
+    conn.commit()
+
+    assert conn.execute("SELECT status FROM compliance_status WHERE tipo_documento = 'cnh'").fetchone()[0] == 'vencido'
+    alteradas = {row[0] for row in conn.execute(f"SELECT DISTINCT tabela FROM {TABELA_ALTERACOES}")}
+    assert alteradas == {'funcionarios'}
@@ -0,0 +1,60 @@
+import io
+from datetime import date
+
+import pytest
+
+import banco
+from importacao import importar_arquivo
+from migracoes import aplicar_migracoes
+
+
+@pytest.fixture
+def conn(tmp_path):
+    original = banco.DB_FILE
+    banco.configurar_banco(db_file=str(tmp_path / "teste.db"))
+    aplicar_migracoes()
+    conexao = banco.get_db_connection()
+    conexao.execute("INSERT INTO funcionarios (nome, matricula, cargo) VALUES ('Ana', '1', 'Motorista')")
+    conexao.commit()
+    yield conexao
+    conexao.close()
+    banco.configurar_banco(db_file=original)
+
+
+def csv(texto):
+    return io.BytesIO(texto.encode('utf-8'))
+
+
+def test_treinamentos_repetidos_no_arquivo(conn):
+    arquivo = ("MATRICULA;TREINAMENTO;DATA DE REALIZAÇÃO;VALIDADE\n"
+               "1;NR-35;10/01/2025;10/01/2027\n"
+               "1;NR-35;10/01/2025;10/01/2027\n"
+               "1;NR-35;2026-01-12;2028-01-12\n"
+               "1;NR-10;10/01/2025;31/12/2024\n"
+               "9;NR-35;10/01/2025;10/01/2027\n")
+
+    resultado = importar_arquivo(conn, csv(arquivo), 'treinamentos', nome='treinamentos.csv')
+
+    assert (resultado['processadas'], resultado['inseridos'], resultado['ignorados']) == (3, 2, 1)
+    assert [(erro['linha'], erro['erro']) for erro in resultado['erros']] == [
+        (5, "validade anterior à realização"), (6, "matrícula não cadastrada")]
+    assert conn.execute("SELECT COUNT(*) FROM treinamentos").fetchone()[0] == 2
+
+    # Reenviar o mesmo arquivo não grava nada e dá o mesmo total de ignorados + inseridos
+    reenvio = importar_arquivo(conn, csv(arquivo), 'treinamentos', nome='treinamentos.csv')
+    assert (reenvio['inseridos'], reenvio['ignorados']) == (0, 3)
+
+
+def test_incidentes_repetidos_e_mapeamento(conn):
+    arquivo = ("MAT,DATA,GRAVIDADE,TIPO,LOCAL,DIAS PERDIDOS\n"
+               "1,05/03/2026,leve,Queda,Pátio,2\n"
+               "1,05/03/2026,Leve,Queda,Pátio,2\n"
+               ",2026-03-06,Grave,Choque,Oficina,\n")
+
+    resultado = importar_arquivo(conn, csv(arquivo), 'incidentes', {'matricula': 'MAT'}, nome='incidentes.csv')
+
+    assert (resultado['inseridos'], resultado['ignorados'], resultado['total_erros']) == (2, 1, 0)
+    incidentes = conn.execute("SELECT funcionario_id, data_ocorrencia, gravidade, dias_perdidos FROM incidentes "
+                              "ORDER BY data_ocorrencia").fetchall()
+    assert [tuple(incidente) for incidente in incidentes] == [(1, date(2026, 3, 5), 'Leve', 2),
+                                                              (None, date(2026, 3, 6), 'Grave', 0)]
@@ -0,0 +1,101 @@
+import io
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+import banco
+from datas import para_dias
+from ingestao import converter_datas, ingerir_planilha, ingerir_planilha_em_blocos
+from migracoes import aplicar_migracoes
+
+
+@pytest.fixture
+def conn(tmp_path):
+    original = banco.DB_FILE
+    banco.configurar_banco(db_file=str(tmp_path / "teste.db"))
+    aplicar_migracoes()
+    conexao = banco.get_db_connection()
+    yield conexao
+    conexao.close()
+    banco.configurar_banco(db_file=original)
+
+
+def dias(*args):
+    return para_dias(date(*args))
+
+
+def test_datas_iso_e_brasileiras():
+    serie = pd.Series(['2027-02-05', '05/02/2027', '01/02/2027 08:30', '31/12/2027', '  ', None, 'amanhã',
+                       datetime(2027, 3, 1)], dtype=object)
+
+    convertidas, invalidas = converter_datas(serie)
+
+    assert convertidas.tolist() == [dias(2027, 2, 5), dias(2027, 2, 5), dias(2027, 2, 1), dias(2027, 12, 31),
+                                    None, None, None, dias(2027, 3, 1)]
+    assert invalidas.tolist() == [False, False, False, False, False, False, True, False]
+
+
+def test_datas_em_coluna_de_texto_ou_datetime():
+    texto, invalidas = converter_datas(pd.Series(['05/02/2027', None, ' 2027-02-05 '], dtype='string'))
+    assert texto.tolist() == [dias(2027, 2, 5), None, dias(2027, 2, 5)]
+    assert not invalidas.any()
+
+    nativas, invalidas = converter_datas(pd.Series([datetime(2027, 1, 1), None]))
+    assert nativas.tolist() == [dias(2027, 1, 1), None]
+    assert not invalidas.any()
+
+
+def test_linhas_com_data_invalida_viram_erro(conn):
+    planilha = pd.DataFrame({'NOME': ['Ana', 'Bia'], 'FUNÇÃO': ['Motorista', 'Operadora'], 'MATRICULA': ['1', '2'],
+                             'ASO': ['10/01/2025', '2025-13-01'], 'VALIDADE DO ASO': ['10/01/2026', '2026-01-01']})
+
+    resultado = ingerir_planilha(conn, planilha)
+
+    assert (resultado['processadas'], resultado['funcionarios_novos'], resultado['asos_novos']) == (1, 1, 1)
+    assert resultado['erros'] == [{'linha': 3, 'matricula': '2', 'erro': "data do ASO inválida"}]
+    assert conn.execute("SELECT data_exame FROM asos").fetchone()[0] == date(2025, 1, 10)
+
+
+def planilha_xlsx(linhas):
+    arquivo = io.BytesIO()
+    pd.DataFrame(linhas, columns=['NOME', 'FUNÇÃO', 'MATRICULA', 'ASO', 'VALIDADE DO ASO']).to_excel(arquivo, index=False)
+    arquivo.seek(0)
+    return arquivo
+
+
+def test_modo_atualizar_com_matricula_em_varios_blocos(conn):
+    linhas = [['Ana', 'Motorista', '1', '2025-01-10', '2026-01-10'],
+              ['Bia', 'Operadora', '2', '2025-02-01', '2026-02-01'],
+              ['Ana', 'Gerente', '1', '2026-01-12', '2027-01-12']]  # segunda linha da Ana, no outro bloco
+
+    primeira = ingerir_planilha_em_blocos(conn, planilha_xlsx(linhas), tamanho_bloco=2, modo='atualizar')
+    assert (primeira['funcionarios_novos'], primeira['asos_novos']) == (2, 3)
+
+    reenvio = ingerir_planilha_em_blocos(conn, planilha_xlsx(linhas), tamanho_bloco=2, modo='atualizar')
+    assert (reenvio['funcionarios_alterados'], reenvio['funcionarios_inalterados']) == (0, 2)
+
+    linhas[2][4] = '2026-07-12'
+    alterada = ingerir_planilha_em_blocos(conn, planilha_xlsx(linhas), tamanho_bloco=2, modo='atualizar')
+    assert (alterada['funcionarios_alterados'], alterada['funcionarios_inalterados']) == (1, 1)
+    assert alterada['alteracoes'] == {'nome': 0, 'cargo': 0, 'cnh_validade': 0, 'validade_aso': 1}
+    assert alterada['asos_novos'] == 0
+    # Nome e função vêm da primeira linha da matrícula, não da que estava no bloco alterado
+    assert tuple(conn.execute("SELECT nome, cargo FROM funcionarios WHERE matricula = '1'").fetchone()) == ('Ana', 'Motorista')
+    assert conn.execute("SELECT validade_aso FROM asos WHERE data_exame = ?",
+                        (date(2026, 1, 12),)).fetchone()[0] == date(2026, 7, 12)
+
+    # A nova validade foi gravada junto com o hash: o próximo reenvio não tem nada a fazer
+    reenvio = ingerir_planilha_em_blocos(conn, planilha_xlsx(linhas), tamanho_bloco=2, modo='atualizar')
+    assert (reenvio['funcionarios_alterados'], reenvio['funcionarios_inalterados']) == (0, 2)
+
+
+def test_modo_inserir_nao_altera_validade_do_aso(conn):
+    planilha = pd.DataFrame({'NOME': ['Ana'], 'FUNÇÃO': ['Motorista'], 'MATRICULA': ['1'],
+                             'ASO': ['10/01/2025'], 'VALIDADE DO ASO': ['10/01/2026']})
+    ingerir_planilha(conn, planilha)
+
+    resultado = ingerir_planilha(conn, planilha.assign(**{'VALIDADE DO ASO': ['10/07/2026']}))
+
+    assert resultado['asos_novos'] == 0
+    assert conn.execute("SELECT validade_aso FROM asos").fetchone()[0] == date(2026, 1, 10)
@@ -0,0 +1,98 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import banco
+from ingestao import ingerir_planilha
+from migracoes import DDL_TABELAS, VERSAO_ATUAL, aplicar_migracoes, versao_banco
+
+
+@pytest.fixture
+def conn(tmp_path):
+    original = banco.DB_FILE
+    banco.configurar_banco(db_file=str(tmp_path / "teste.db"))
+    conexao = banco.get_db_connection()
+    yield conexao
+    conexao.close()
+    banco.configurar_banco(db_file=original)
+
+
+def criar_banco_antigo(conn, asos):
+    """Banco como o deixado pelo uploader antigo: datas em texto ISO e 'Apto' em data_exame."""
+    for ddl in DDL_TABELAS:
+        conn.execute(ddl)
+    conn.executemany("INSERT INTO funcionarios (id, nome, matricula, cargo, cnh_tipo, cnh_validade) VALUES (?, ?, ?, ?, 'N/A', ?)",
+                     [(1, 'Ana', '1', 'Motorista', '2027-03-01'), (2, 'Bia', '2', 'Operadora', None)])
+    conn.execute("INSERT INTO treinamentos (funcionario_id, nome_treinamento, data_realizacao, validade) "
+                 "VALUES (1, 'NR-35', '2025-01-10', '2027-01-10')")
+    conn.executemany("INSERT INTO asos (funcionario_id, tipo_exame, data_exame, resultado, validade_aso) "
+                     "VALUES (?, 'Periódico', ?, ?, ?)", asos)
+    conn.commit()
+
+
+def test_banco_antigo_com_asos_invertidos(conn):
+    criar_banco_antigo(conn, [
+        (1, 'Apto', '2025-01-10', '2026-01-10'),
+        (1, 'Apto', '2025-01-10', '2026-01-10'),  # mesma planilha enviada duas vezes
+        (1, 'Apto', '2026-01-12', '2027-01-12'),
+        (2, 'Apto', '2025-06-01', '2026-06-01'),
+    ])
+
+    aplicar_migracoes(conn)
+
+    assert versao_banco(conn) == VERSAO_ATUAL
+    asos = conn.execute("SELECT funcionario_id, data_exame, resultado, validade_aso FROM asos ORDER BY id").fetchall()
+    assert [tuple(aso) for aso in asos] == [
+        (1, date(2025, 1, 10), 'Apto', date(2026, 1, 10)),
+        (1, date(2026, 1, 12), 'Apto', date(2027, 1, 12)),
+        (2, date(2025, 6, 1), 'Apto', date(2026, 6, 1)),
+    ]
+    assert tuple(conn.execute("SELECT typeof(data_realizacao), validade FROM treinamentos").fetchone()) == ('integer', date(2027, 1, 10))
+    assert conn.execute("SELECT cnh_validade FROM funcionarios WHERE id = 1").fetchone()[0] == date(2027, 3, 1)
+
+    # O reenvio da planilha não cria uma segunda cópia do exame já migrado
+    planilha = pd.DataFrame({'NOME': ['Ana'], 'FUNÇÃO': ['Motorista'], 'MATRICULA': ['1'],
+                             'ASO': ['10/01/2025'], 'VALIDADE DO ASO': ['10/01/2026']})
+    assert ingerir_planilha(conn, planilha)['asos_novos'] == 0
+
+
+def test_asos_em_conflito_param_a_migracao(conn):
+    criar_banco_antigo(conn, [
+        (1, 'Apto', '2025-01-10', '2026-01-10'),
+        (1, 'Apto', '2025-01-10', '2025-07-10'),
+    ])
+
+    with pytest.raises(ValueError, match="funcionário 1"):
+        aplicar_migracoes(conn)
+
+    assert versao_banco(conn) == 0
+    assert conn.execute("SELECT COUNT(*) FROM asos WHERE data_exame = 'Apto'").fetchone()[0] == 2
+
+
+def test_migracoes_rodam_uma_vez(conn):
+    assert aplicar_migracoes(conn) == list(range(1, VERSAO_ATUAL + 1))
+    assert aplicar_migracoes(conn) == []
+
+
+def test_datas_em_texto_viram_numero_de_dias(conn):
+    criar_banco_antigo(conn, [(1, 'Apto', '2025-01-10', '2026-01-10')])
+    conn.execute("INSERT INTO incidentes (funcionario_id, data_ocorrencia, gravidade, tipo_incidente, local_ocorrencia) "
+                 "VALUES (1, '2026-03-05', 'Leve', 'Queda', 'Pátio')")
+    conn.execute("INSERT INTO treinamentos (funcionario_id, nome_treinamento, validade) VALUES (2, 'NR-10', 'sem data')")
+    conn.commit()
+
+    aplicar_migracoes(conn)
+
+    tipos = conn.execute("""
+        SELECT (SELECT typeof(cnh_validade) FROM funcionarios WHERE id = 1),
+               (SELECT typeof(validade_aso) FROM asos),
+               (SELECT typeof(data_ocorrencia) FROM incidentes),
+               (SELECT validade FROM treinamentos WHERE funcionario_id = 2)
+    """).fetchone()
+    # Textos que não são datas ficam como estão
+    assert tuple(tipos) == ('integer', 'integer', 'integer', 'sem data')
+    # As tabelas derivadas são recalculadas a partir das datas já convertidas
+    assert conn.execute("SELECT validade FROM compliance_status WHERE funcionario_id = 1 AND tipo_documento = 'cnh'"
+                        ).fetchone()[0] == date(2027, 3, 1)
+    assert conn.execute("SELECT SUM(quantidade) FROM incidentes_resumo").fetchone()[0] == 1
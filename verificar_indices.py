@@ -0,0 +1,102 @@
+import re
+import sys
+from datetime import date
+
+from banco import get_db_connection
+from dados_dashboard import montar_consulta_kpis, montar_consultas_detalhes
+from migracoes import INDICES, aplicar_migracoes
+from dados_cadastro import montar_consulta_fts
+from dados_incidentes import SQL_BUSCAR_INCIDENTES_TEXTO
+from alertas import SQL_GERAR_ALERTAS, SQL_ALERTAS_PENDENTES
+from ingestao import (SQL_CRIAR_STAGING, SQL_RESOLVER_MATRICULAS, SQL_INSERIR_FUNCIONARIOS, SQL_INSERIR_ASOS,
+                      SQL_HASHES_ATUAIS, SQL_ATUALIZAR_CAMPO, SQL_GRAVAR_HASHES)
+from importacao import LAYOUTS, SQL_INSERIR, SQL_MATRICULAS_DESCONHECIDAS, criar_staging
+
+
+def listar_consultas(cargo_exemplo):
+    """Retorna as consultas críticas como (descrição, sql, parâmetros, tabelas que podem ser varridas).
+
+    As tabelas listadas no último item precisam ser lidas inteiras de qualquer forma (ex.: o resumo de
+    incidentes sem filtro de cargo, a tabela temporária do upload), então um SCAN nelas não indica índice faltando.
+    """
+    consultas = []
+    for cargo in (None, cargo_exemplo):
+        sufixo = f" (cargo = {cargo})" if cargo else " (todos os cargos)"
+        query, params = montar_consulta_kpis(cargo)
+        consultas.append(("KPIs do dashboard" + sufixo, query, params, {'r'}))
+        detalhes, params = montar_consultas_detalhes(cargo)
+        for chave, query in detalhes.items():
+            consultas.append((f"Detalhes '{chave}'" + sufixo, query, params, set()))
+
+    consultas.append(("Treinamentos por funcionário",
+                      "SELECT id, nome_treinamento, data_realizacao, validade FROM treinamentos WHERE funcionario_id = ?",
+                      (1,), set()))
+    consultas.append(("ASOs por funcionário",
+                      "SELECT id, tipo_exame, data_exame, resultado, validade_aso FROM asos WHERE funcionario_id = ?",
+                      (1,), set()))
+    consultas.append(("Busca de funcionário por nome/matrícula",
+                      "SELECT f.id, f.nome, f.matricula FROM funcionarios_busca b JOIN funcionarios f ON f.id = b.rowid "
+                      "WHERE funcionarios_busca MATCH ? ORDER BY b.rank LIMIT 20",
+                      (montar_consulta_fts("jo si"),), set()))
+    consultas.append(("Busca textual nos incidentes",
+                      SQL_BUSCAR_INCIDENTES_TEXTO.format(filtro_gravidade="AND i.gravidade IN (:gravidade_0)"),
+                      {'busca': "empilhadeira AND mão", 'inicio': date(2000, 1, 1), 'fim': date(2100, 1, 1), 'limite': 50,
+                       'gravidade_0': "Grave"}, set()))
+    consultas.append(("Alertas: varredura diária de vencimentos", SQL_GERAR_ALERTAS,
+                      {'hoje': date.today(), 'inicio': date.today(), 'fim': date.today()}, set()))
+    consultas.append(("Alertas: lote pendente de entrega", SQL_ALERTAS_PENDENTES,
+                      {'max_tentativas': 5, 'lote': 200}, set()))
+    consultas.append(("Upload: resolução das matrículas", SQL_RESOLVER_MATRICULAS, (), {'s'}))
+    consultas.append(("Upload: inserção de funcionários", SQL_INSERIR_FUNCIONARIOS, (), {'s', 'staging_upload'}))
+    consultas.append(("Upload: inserção de ASOs", SQL_INSERIR_ASOS, (), {'s'}))
+    consultas.append(("Upload diferencial: hashes atuais", SQL_HASHES_ATUAIS, ('["1", "2"]',), set()))
+    consultas.append(("Upload diferencial: atualização da função", SQL_ATUALIZAR_CAMPO.format(campo='cargo'), (),
+                      {'s', 'staging_upload'}))
+    consultas.append(("Upload diferencial: gravação dos hashes", SQL_GRAVAR_HASHES, (), {'s', 'staging_upload'}))
+    for destino in LAYOUTS:
+        consultas.append((f"Importação de {destino}: matrículas desconhecidas",
+                          SQL_MATRICULAS_DESCONHECIDAS.format(staging=f"staging_{destino}"), (), {'s'}))
+        consultas.append((f"Importação de {destino}: inserção", SQL_INSERIR[destino], (), {'s'}))
+    return consultas
+
+
+def verificar_indices():
+    """Executa EXPLAIN QUERY PLAN nas consultas do dashboard e do upload e aponta varreduras completas."""
+    aplicar_migracoes()
+    conn = get_db_connection()
+    conn.execute(SQL_CRIAR_STAGING)
+    staging_importacao = [criar_staging(conn, destino) for destino in LAYOUTS]
+
+    print(f"Índices esperados: {len(INDICES)}")
+    existentes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    faltando = [nome for ddl in INDICES for nome in re.findall(r"IF NOT EXISTS (\w+)", ddl) if nome not in existentes]
+    if faltando:
+        print(f"⚠️ Índices ausentes no banco: {faltando}")
+
+    cargo_exemplo = conn.execute("SELECT cargo FROM funcionarios WHERE cargo IS NOT NULL LIMIT 1").fetchone()
+    cargo_exemplo = cargo_exemplo[0] if cargo_exemplo else "Motorista de Caminhão"
+
+    problemas = 0
+    for descricao, query, params, scans_permitidos in listar_consultas(cargo_exemplo):
+        plano = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+        # "SCAN tabela" sem "USING ... INDEX" é uma leitura completa da tabela ("CONSTANT ROWS" é uma lista VALUES)
+        scans = [linha for linha in plano
+                 if linha.startswith("SCAN") and "INDEX" not in linha and "CONSTANT ROWS" not in linha
+                 and linha.split()[1] not in scans_permitidos]
+        status = "SCAN COMPLETO" if scans else "OK"
+        if scans:
+            problemas += 1
+        print(f"\n[{status}] {descricao}")
+        for linha in plano:
+            print(f"    {linha}")
+
+    conn.execute("DROP TABLE IF EXISTS temp.staging_upload")
+    for staging in staging_importacao:
+        conn.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+    conn.close()
+    print(f"\nVerificação concluída: {problemas} consulta(s) sem uso de índice.")
+    return problemas
+
+
+if __name__ == "__main__":
+    sys.exit(1 if verificar_indices() else 0)